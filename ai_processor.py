@@ -3,13 +3,45 @@
 AI Processor für PhotoBox
 Ruft externe SD1.5 Pipeline auf ohne Library-Konflikte
 """
+import logging
+import os
 import subprocess
 import shutil
+import threading
 from pathlib import Path
 import time
+import metrics
+import tracing
+from image_pool import crop_face
+
+log = logging.getLogger(__name__)
+
+# Wartezeit und Laufzeit liegen im Bereich Sekunden bis Minuten
+AI_BUCKETS = (0.1, 0.5, 1, 5, 10, 20, 30, 45, 60, 90, 120, 180)
+AI_QUEUE_SECONDS = metrics.Histogram(
+    'photobox_ai_queue_seconds',
+    'Wartezeit auf den SD1.5-Worker (immer nur ein Job gleichzeitig)',
+    buckets=AI_BUCKETS
+)
+AI_RUN_SECONDS = metrics.Histogram(
+    'photobox_ai_run_seconds',
+    'Laufzeit der SD1.5-Pipeline (Subprocess inkl. Modell laden)',
+    buckets=AI_BUCKETS
+)
 
 class AIProcessor:
-    def __init__(self):
+    def __init__(self, image_pool=None):
+        """
+        AI Processor initialisieren
+        
+        Args:
+            image_pool: Optionaler ImageWorkerPool - dann wird das Gesicht
+                        schon hier im Worker-Prozess zugeschnitten (512x512).
+                        Ohne wird das Foto unverändert kopiert (Standard, die
+                        SD-Pipeline schneidet selbst zu)
+        """
+        self.image_pool = image_pool
+        
         # Pfade zur SD1.5 Installation
         self.sd_project_dir = Path("/media/user/SSD/sdxl-project")
         self.sd_venv_python = self.sd_project_dir / "venv/bin/python"
@@ -21,45 +53,100 @@ class AIProcessor:
         self.input_filename = "photobox_input.jpg"
         self.output_filename = "photobox_output.jpg"
         
-        print(f"🎨 AI Processor initialisiert")
-        print(f"   SD Project: {self.sd_project_dir}")
-        print(f"   Input: {self.sd_input_dir / self.input_filename}")
-        print(f"   Output: {self.sd_output_dir / self.output_filename}")
+        # Feste Dateinamen → immer nur ein Job gleichzeitig
+        self._lock = threading.Lock()
+        self._waiting_lock = threading.Lock()
+        self.waiting = 0   # Jobs, die auf den Lock warten
+        self.busy = False
+        self.last_duration = None
+        
+        log.info(f"AI Processor initialisiert: SD Project {self.sd_project_dir}, "
+                 f"Input {self.sd_input_dir / self.input_filename}, "
+                 f"Output {self.sd_output_dir / self.output_filename}")
     
-    def process_image(self, input_image_path):
+    def process_image(self, input_image_path, trace_id=None):
         """
         Verarbeitet ein Bild mit SD1.5
         
         Args:
             input_image_path: Pfad zum Original-Foto
+            trace_id: Trace der Session (Spans 'ai_queue' und 'ai_run',
+                      an den Worker als PHOTOBOX_TRACE_ID)
             
         Returns:
-            dict: {'success': bool, 'output_path': str, 'message': str, 'theme': str}
+            dict: {'success': bool, 'output_path': str, 'message': str, 'theme': str,
+                   'seed': int, 'duration': float}
         """
+        submitted_wall = time.time()
+        submitted_at = time.perf_counter()
+        with self._waiting_lock:
+            self.waiting += 1
+        try:
+            self._lock.acquire()
+        finally:
+            with self._waiting_lock:
+                self.waiting -= 1
         try:
-            # 1. Input-Bild kopieren (überschreibt altes)
+            waited = time.perf_counter() - submitted_at
+            AI_QUEUE_SECONDS.observe(waited)
+            tracing.tracer.record(trace_id, 'ai_queue', submitted_wall, waited)
+            self.busy = True
+            with tracing.tracer.span(trace_id, 'ai_run') as span:
+                result = self._process_image(input_image_path, trace_id)
+                if not result['success']:
+                    span['status'] = 'error'
+            if not result['success']:
+                metrics.FAILURES.labels('ai').inc()
+            return result
+        finally:
+            self.busy = False
+            self._lock.release()
+    
+    def queue_depth(self):
+        """Wartende + laufende AI-Jobs"""
+        return self.waiting + (1 if self.busy else 0)
+    
+    def _process_image(self, input_image_path, trace_id=None):
+        """Eigentliche Verarbeitung (Aufruf nur mit gehaltenem Lock)"""
+        try:
+            # 1. Input-Bild bereitstellen (überschreibt altes)
             input_dest = self.sd_input_dir / self.input_filename
-            print(f"📋 Kopiere Input: {input_image_path} → {input_dest}")
-            shutil.copy2(input_image_path, input_dest)
+            if self.image_pool is not None:
+                # Gesicht im Worker-Prozess zuschneiden → SD-Pipeline überspringt den Crop
+                log.debug(f"Schneide Gesicht zu: {input_image_path} → {input_dest}")
+                face_found = self.image_pool.run(
+                    crop_face, str(input_image_path), str(input_dest)
+                )
+                if not face_found:
+                    log.info("Kein Gesicht gefunden, nutze ganzes Bild", extra={'trace_id': trace_id})
+            else:
+                log.debug(f"Kopiere Input: {input_image_path} → {input_dest}")
+                shutil.copy2(input_image_path, input_dest)
             
             # 2. SD1.5 Pipeline aufrufen
-            print(f"🚀 Starte SD1.5 Pipeline...")
+            log.info("Starte SD1.5 Pipeline", extra={'trace_id': trace_id, 'stage': 'ai_run'})
             start_time = time.time()
             
+            env = dict(os.environ)
+            if trace_id:
+                env[tracing.TRACE_ENV] = trace_id
             result = subprocess.run(
                 [str(self.sd_venv_python), str(self.sd_script)],
                 cwd=str(self.sd_project_dir),
+                env=env,
                 capture_output=True,
                 text=True,
                 timeout=120  # 2 Minuten Timeout
             )
             
             elapsed = time.time() - start_time
-            print(f"⏱️  Verarbeitung dauerte {elapsed:.1f} Sekunden")
+            self.last_duration = elapsed
+            AI_RUN_SECONDS.observe(elapsed)
             
             # 3. Output checken
             if result.returncode != 0:
-                print(f"❌ SD1.5 Fehler:\n{result.stderr}")
+                log.error(f"SD1.5 Fehler:\n{result.stderr}",
+                          extra={'trace_id': trace_id, 'stage': 'ai_run', 'duration_ms': round(elapsed * 1000)})
                 return {
                     'success': False,
                     'message': f'SD1.5 Fehler: {result.stderr[:200]}',
@@ -79,20 +166,26 @@ class AIProcessor:
             
             # 5. Theme aus stdout extrahieren (falls vorhanden)
             theme = "Unknown"
+            seed = None
             for line in result.stdout.split('\n'):
-                if "Theme:" in line:
+                if "Theme:" in line and theme == "Unknown":
                     theme = line.split("Theme:")[-1].strip()
-                    break
+                elif "Seed:" in line and seed is None:
+                    try:
+                        seed = int(line.split("Seed:")[-1].strip())
+                    except ValueError:
+                        pass
             
-            print(f"✅ AI-Verarbeitung erfolgreich!")
-            print(f"   Theme: {theme}")
-            print(f"   Output: {output_path}")
+            log.info(f"AI-Verarbeitung erfolgreich: Theme {theme}",
+                     extra={'trace_id': trace_id, 'stage': 'ai_run', 'duration_ms': round(elapsed * 1000)})
             
             return {
                 'success': True,
                 'message': 'Bild erfolgreich verarbeitet',
                 'output_path': str(output_path),
-                'theme': theme
+                'theme': theme,
+                'seed': seed,
+                'duration': elapsed
             }
             
         except subprocess.TimeoutExpired:
@@ -103,7 +196,7 @@ class AIProcessor:
                 'theme': None
             }
         except Exception as e:
-            print(f"❌ Unerwarteter Fehler: {e}")
+            log.exception(f"Unerwarteter Fehler: {e}", extra={'trace_id': trace_id, 'stage': 'ai_run'})
             return {
                 'success': False,
                 'message': f'Fehler: {str(e)}',
@@ -145,10 +238,23 @@ class AIProcessor:
             'available': True,
             'message': 'SD1.5 bereit'
         }
+    
+    def get_status(self):
+        """
+        Status für den Status-Service (Verfügbarkeit + Worker-Zustand)
+        
+        Returns:
+            dict: {'available': bool, 'message': str, 'busy': bool, 'last_duration': float oder None}
+        """
+        status = self.check_availability()
+        status['busy'] = self.busy
+        status['last_duration'] = round(self.last_duration, 1) if self.last_duration else None
+        return status
 
 
 # Test-Funktion
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     processor = AIProcessor()
     
     # Status prüfen
@@ -1,10 +1,37 @@
-from flask import Flask, render_template, jsonify, send_file
+# Async-Modus (PHOTOBOX_ASYNC_MODE) - Patchen muss vor allen anderen Imports passieren
+import async_support
+async_support.monkey_patch()
+
+# Logging direkt danach: auch Import-Meldungen gehen schon über die Queue
+import logging
+import logging_setup
+logging_setup.configure()
+
+from flask import Flask, render_template, jsonify, send_file, request
 from camera import Camera
 from printer import Printer
 from ai_processor import AIProcessor  # NEU
+from status_service import StatusService
+from image_branding import LAYOUTS
+from image_pool import ImageWorkerPool, encode_jpeg, write_jpeg
+from photo_catalog import KIND_AI, KIND_ORIGINAL, PhotoCatalog, parse_cursor
+from derivatives import DerivativeGenerator
+from http_cache import ETagCache, add_static_photo_route, is_immutable_name, send_cached
+from share_supervisor import ShareServerSupervisor
+from retention import GB, RetentionEngine
+from session_store import SessionStore, session_id_for
+from export import EXPORT_FORMATS, export_files, stream_tar, stream_zip
+from qr_codes import QRCodeCache
+from capture_countdown import CaptureCountdown
+from idempotency import DuplicateCounter, IdempotencyCache, InFlight
+import metrics
+import profiling
+import tracing
+import functools
 import os
 from datetime import datetime
 from pathlib import Path
+import time
 import uuid
 import threading
 from flask_socketio import SocketIO
@@ -16,14 +43,40 @@ app = Flask(__name__)
 socketio = SocketIO(
     app, 
     cors_allowed_origins="*",
-    async_mode='threading',
-    logger=True,
-    engineio_logger=True
+    async_mode=async_support.active_mode(),
+    **logging_setup.socketio_loggers()
 )
 
+log = logging.getLogger("photobox")
+
 # Konfiguration
 PHOTO_DIR = Path("static/photos")
 PHOTO_DIR.mkdir(exist_ok=True)
+PRINT_CACHE_DIR = Path("static/print_cache")
+QR_DIR = Path("static/qr")
+STATUS_INTERVAL = float(os.environ.get("PHOTOBOX_STATUS_INTERVAL", "5"))  # Sekunden
+IMAGE_WORKERS = int(os.environ.get("PHOTOBOX_IMAGE_WORKERS", "2"))  # Prozesse für Bildarbeit
+IMAGE_QUEUE = int(os.environ.get("PHOTOBOX_IMAGE_QUEUE", "16"))     # max. wartende Bild-Jobs
+# Aufnahme wartet so lange auf einen Pool-Slot, danach JPEG-Encoding im eigenen Prozess
+CAPTURE_SLOT_TIMEOUT = float(os.environ.get("PHOTOBOX_CAPTURE_SLOT_S", "0.5"))
+# Gesicht schon in der PhotoBox zuschneiden - nur mit einem generate_from_photobox.py,
+# das 512x512-Eingaben nicht erneut zuschneidet (siehe static/examples/example_pipeline.py)
+AI_PRECROP = os.environ.get("PHOTOBOX_AI_PRECROP", "0") == "1"
+PHOTO_PAGE_SIZE = 50    # Standard-Seitengröße für /api/photos
+PHOTO_PAGE_MAX = 500    # Maximale Seitengröße für /api/photos
+# Retention (Alter in Stunden, Größen in GB, 0 = Regel aus)
+RETENTION_MAX_AGE = float(os.environ.get("PHOTOBOX_RETENTION_MAX_AGE_H", "24")) * 3600
+RETENTION_AI_MAX_AGE = float(os.environ.get("PHOTOBOX_RETENTION_AI_MAX_AGE_H", "48")) * 3600
+RETENTION_MAX_BYTES = float(os.environ.get("PHOTOBOX_RETENTION_MAX_GB", "0")) * GB
+RETENTION_MIN_FREE = float(os.environ.get("PHOTOBOX_RETENTION_MIN_FREE_GB", "2")) * GB
+RETENTION_INTERVAL = float(os.environ.get("PHOTOBOX_RETENTION_INTERVAL", "60"))  # Sekunden
+ARCHIVE_DIR = os.environ.get("PHOTOBOX_ARCHIVE_DIR") or None  # Tages-ZIPs vor dem Löschen
+DB_PATH = Path(os.environ.get("PHOTOBOX_DB", "data/photobox.db"))  # Session-Store (SQLite)
+SHARE_SERVER_LOG = Path(os.environ.get("PHOTOBOX_SHARE_LOG", "logs/image_server.log"))
+COUNTDOWN_SECONDS = int(os.environ.get("PHOTOBOX_COUNTDOWN", "5"))  # Sekunden bis zur Aufnahme
+BUTTON_DEBOUNCE = float(os.environ.get("PHOTOBOX_BUTTON_DEBOUNCE_MS", "300")) / 1000  # Prellen ignorieren
+IDEMPOTENCY_TTL = 600  # Sekunden, so lange werden Antworten je Idempotency-Key gemerkt
+PRINT_REPEAT_WINDOW = float(os.environ.get("PHOTOBOX_PRINT_REPEAT_S", "120"))  # gleicher Bogen → 409
 
 # Kamera-Instanz (wird lazy initialisiert)
 camera = None
@@ -34,6 +87,109 @@ printer = None
 # AI Processor-Instanz (wird lazy initialisiert) - NEU
 ai_processor = None
 
+# Status-Service (wird lazy initialisiert)
+status_service = None
+
+# Prozess-Pool für Bildarbeit (wird lazy initialisiert)
+image_pool = None
+
+# Foto-Katalog (wird lazy initialisiert)
+catalog = None
+
+# Derivat-Generator (wird lazy initialisiert)
+derivatives = None
+
+# Session-Store (wird lazy initialisiert)
+store = None
+
+# Retention-Engine (wird lazy initialisiert)
+retention = None
+
+# QR-Codes der Share-Seiten (wird lazy initialisiert)
+qr_codes = None
+
+# Server-seitiger Countdown (wird lazy initialisiert)
+countdown = None
+
+# Supervisor des Image-Share-Servers (nur im Hauptprozess)
+share_server = None
+
+# Inhalts-ETags der Fotos (jede Datei wird nur einmal gehasht)
+etags = ETagCache()
+add_static_photo_route(app, PHOTO_DIR, etags)
+
+# Duplikat-Schutz für Aufnahme, Druck und AI (Prellen, Doppelklicks, Wiederholungen)
+duplicates = DuplicateCounter()
+idempotency = IdempotencyCache(ttl=IDEMPOTENCY_TTL, counter=duplicates)
+in_flight = InFlight(counter=duplicates)
+
+# Metriken unter /metrics: HTTP-Latenz je Endpunkt, Aufnahme-Zeiten, Zustände
+# (Viewer, Warteschlangen, Plattenplatz) werden erst beim Abruf gelesen
+metrics.install(app)
+# Opt-in: cProfile für einzelne Requests (PHOTOBOX_PROFILE oder X-Profile von localhost)
+profiling.install(app)
+CAPTURE_SECONDS = metrics.Histogram(
+    'photobox_capture_seconds',
+    'Aufnahme je Schritt: Frame holen (grab), JPEG kodieren (encode), gesamt (total)',
+    ['stage']
+)
+metrics.Gauge('photobox_stream_viewers', 'Aktive MJPEG-Streams (/api/video_feed)').set_function(
+    lambda: camera.get_stats()['viewers'] if camera is not None else None
+)
+QUEUE_DEPTH = metrics.Gauge('photobox_queue_depth', 'Wartende und laufende Aufträge je Warteschlange', ['queue'])
+QUEUE_DEPTH.labels('camera').set_function(
+    lambda: camera.get_stats()['pending'] if camera is not None else None
+)
+QUEUE_DEPTH.labels('image_pool').set_function(
+    lambda: image_pool.stats()['queue_depth'] if image_pool is not None else None
+)
+QUEUE_DEPTH.labels('ai').set_function(
+    lambda: ai_processor.queue_depth() if ai_processor is not None else None
+)
+QUEUE_DEPTH.labels('print_render').set_function(
+    lambda: printer.print_cache.pending() if printer is not None and printer.print_cache is not None else None
+)
+metrics.Gauge('photobox_disk_free_bytes', 'Freier Platz auf dem Foto-Laufwerk').set_function(
+    lambda: shutil.disk_usage(PHOTO_DIR).free
+)
+metrics.Gauge(
+    'photobox_storage_used_bytes',
+    'Belegt durch Fotos, Derivate und Druckversionen (letzter Retention-Lauf)'
+).set_function(
+    lambda: retention.last_report['usage_bytes'] if retention is not None and retention.last_report else None
+)
+
+def idempotent(scope):
+    """
+    Endpunkt über den Header 'Idempotency-Key' absichern
+    
+    Ein wiederholter Request mit demselben Key bekommt die gespeicherte Antwort,
+    statt ein zweites Foto aufzunehmen oder einen zweiten Bogen zu drucken.
+    Serverfehler werden nicht gemerkt - eine Wiederholung führt dann neu aus.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if not key:
+                return view(*args, **kwargs)
+            
+            def execute():
+                response = app.make_response(view(*args, **kwargs))
+                return response.get_data(), response.status_code, response.mimetype
+            
+            cache_key = f"{request.path}:{key}"
+            (body, status, mimetype), replayed = idempotency.run(scope, cache_key, execute)
+            if not replayed and status >= 500:
+                idempotency.discard(scope, cache_key)
+            response = app.response_class(body, status=status, mimetype=mimetype)
+            if replayed:
+                metrics.RETRIES.labels(scope).inc()
+                response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        return wrapper
+    return decorator
+
 def get_camera():
     """Kamera lazy initialisieren"""
     global camera
@@ -41,49 +197,247 @@ def get_camera():
         camera = Camera()
     return camera
 
+def get_image_pool():
+    """Prozess-Pool für Bildarbeit lazy initialisieren"""
+    global image_pool
+    if image_pool is None:
+        image_pool = ImageWorkerPool(max_workers=IMAGE_WORKERS, max_pending=IMAGE_QUEUE)
+    return image_pool
+
+def get_catalog():
+    """Foto-Katalog lazy initialisieren"""
+    global catalog
+    if catalog is None:
+        catalog = PhotoCatalog(PHOTO_DIR)
+        catalog.start_watching()
+    return catalog
+
+def get_store():
+    """Session-Store lazy initialisieren und mit den Dateien abgleichen"""
+    global store
+    if store is None:
+        store = SessionStore(DB_PATH)
+        store.sync(get_catalog().list())
+    return store
+
+def get_derivatives():
+    """Derivat-Generator lazy initialisieren"""
+    global derivatives
+    if derivatives is None:
+        derivatives = DerivativeGenerator(PHOTO_DIR, pool=get_image_pool())
+    return derivatives
+
+def get_retention():
+    """Retention-Engine lazy initialisieren und starten"""
+    global retention
+    if retention is None:
+        retention = RetentionEngine(
+            get_catalog(),
+            get_derivatives(),
+            print_cache_dir=PRINT_CACHE_DIR,
+            max_age=RETENTION_MAX_AGE,
+            ai_max_age=RETENTION_AI_MAX_AGE,
+            max_bytes=RETENTION_MAX_BYTES,
+            min_free_bytes=RETENTION_MIN_FREE,
+            archive_dir=ARCHIVE_DIR,
+            interval=RETENTION_INTERVAL,
+            on_delete=forget_photo
+        )
+        retention.start()
+    return retention
+
+def forget_photo(entry):
+    """Caches eines gelöschten Fotos leeren (Callback der Retention-Engine)"""
+    etags.discard(entry.path)
+    get_store().remove_photo(entry.id)
+    if printer is not None:
+        printer.evict(str(entry.path))
+    if entry.kind == KIND_ORIGINAL:
+        get_qr_codes().remove(entry.id)
+
+def get_qr_codes():
+    """QR-Code-Cache lazy initialisieren"""
+    global qr_codes
+    if qr_codes is None:
+        qr_codes = QRCodeCache(QR_DIR)
+    return qr_codes
+
 def get_printer():
     """Drucker lazy initialisieren"""
     global printer
     if printer is None:
-        printer = Printer()
+        printer = Printer(
+            image_pool=get_image_pool(),
+            qr_for=lambda path: get_qr_codes().ensure(Path(path).stem)
+        )
     return printer
 
 def get_ai_processor():
     """AI Processor lazy initialisieren"""
     global ai_processor
     if ai_processor is None:
-        ai_processor = AIProcessor()
+        ai_processor = AIProcessor(image_pool=get_image_pool() if AI_PRECROP else None)
     return ai_processor
 
+def get_status_service():
+    """Status-Service lazy initialisieren und starten"""
+    global status_service
+    if status_service is None:
+        status_service = StatusService(
+            interval=STATUS_INTERVAL,
+            on_change=lambda name, status: socketio.emit("status_update", {name: status})
+        )
+        status_service.register('camera', lambda: get_camera().get_status())
+        status_service.register('printer', lambda: get_printer().get_printer_status())
+        status_service.register('ai', lambda: get_ai_processor().get_status())
+        status_service.start()
+    return status_service
+
+def share_info(photo_id):
+    """
+    QR-Code der Session einmalig rendern (vor dem Vorrendern des Drucks)
+    
+    Returns:
+        dict: {'share_url', 'qr_url'} für die Antwort an die Kiosk-Oberfläche
+              (qr_url ist None, wenn kein QR-Code erzeugt werden kann)
+    """
+    qr = get_qr_codes()
+    try:
+        qr_path = qr.ensure(photo_id)
+    except Exception as e:
+        log.warning(f"QR-Code konnte nicht erzeugt werden: {e}", extra={'photo_id': photo_id})
+        qr_path = None
+    return {
+        'share_url': qr.share_url(photo_id),
+        'qr_url': f'/api/qr/{photo_id}' if qr_path else None,
+    }
+
+def prerender_print(filepath):
+    """Druckversion im Hintergrund vorrendern (Fehler blockieren nie die Aufnahme)"""
+    try:
+        get_printer().prerender(str(filepath))
+    except Exception as e:
+        log.warning(f"Vorrendern fehlgeschlagen: {e}", extra={'stage': 'prerender'})
+
+def generate_derivatives(filepath):
+    """Thumbnail-/Handy-/Full-Versionen im Hintergrund erzeugen und im Session-Store vermerken"""
+    def _record(future):
+        try:
+            outputs = []
+            for path in future.result():
+                _, size, fmt = DerivativeGenerator.describe(path)
+                outputs.append((size, fmt, path, os.path.getsize(path)))
+            get_store().add_derivatives(Path(filepath).stem, outputs)
+        except Exception as e:
+            log.warning(f"Derivate konnten nicht erzeugt werden: {e}", extra={'stage': 'derivatives'})
+    
+    try:
+        get_derivatives().submit(filepath).add_done_callback(_record)
+    except Exception as e:
+        log.warning(f"Derivate konnten nicht erzeugt werden: {e}", extra={'stage': 'derivatives'})
+
 @app.route('/')
 def index():
     """Hauptseite laden"""
     return render_template('index.html')
 
+def take_photo(trace_id=None):
+    """
+    Foto aufnehmen (für /api/capture und den server-seitigen Countdown)
+    
+    Args:
+        trace_id: Trace des Knopfdrucks bzw. Requests (None → neuer Trace)
+    
+    Returns:
+        dict: {'success': True, 'photo_id', 'url', 'timestamp', 'share_url', 'qr_url',
+               'trace_id', 'shutter_at'} oder {'success': False, 'error', 'trace_id'}
+               shutter_at ist time.monotonic() direkt nach dem Frame-Grab
+    """
+    # Eindeutigen Dateinamen generieren
+    photo_id = str(uuid.uuid4())
+    filename = f"{photo_id}.jpg"
+    filepath = PHOTO_DIR / filename
+    
+    # AI und Druck dieser Session finden den Trace über die Session-ID
+    trace_id = trace_id or tracing.new_trace_id()
+    session_id = session_id_for(photo_id)
+    tracing.tracer.bind(session_id, trace_id)
+    
+    with tracing.tracer.span(trace_id, 'capture', session_id=session_id, photo_id=photo_id) as span:
+        # Foto aufnehmen, JPEG-Encoding im Worker-Prozess
+        started = time.perf_counter()
+        frame = get_camera().grab_frame()
+        shutter_at = time.monotonic()
+        grabbed = time.perf_counter()
+        if frame is None:
+            metrics.FAILURES.labels('capture').inc()
+            span['status'] = 'error'
+            return {
+                'success': False,
+                'error': 'Kamera konnte kein Foto aufnehmen',
+                'trace_id': trace_id
+            }
+        
+        try:
+            try:
+                future = get_image_pool().submit_frame(encode_jpeg, frame, str(filepath), 95,
+                                                       timeout=CAPTURE_SLOT_TIMEOUT)
+            except TimeoutError:
+                # Pool voll mit Derivaten/Vorrendern → nicht dahinter anstellen
+                log.warning("Image Worker Pool ausgelastet, kodiere Aufnahme im Server-Prozess",
+                            extra={'trace_id': trace_id, 'stage': 'capture'})
+                async_support.run_blocking(write_jpeg, frame, str(filepath), 95)
+            else:
+                future.result(timeout=10)
+        except Exception:
+            metrics.FAILURES.labels('capture').inc()
+            raise
+        encoded = time.perf_counter()
+        CAPTURE_SECONDS.labels('grab').observe(grabbed - started)
+        CAPTURE_SECONDS.labels('encode').observe(encoded - grabbed)
+        span['grab_ms'] = round((grabbed - started) * 1000, 1)
+        span['encode_ms'] = round((encoded - grabbed) * 1000, 1)
+        entry = get_catalog().add(filepath)
+        get_store().add_photo(
+            entry,
+            grab_ms=(grabbed - started) * 1000,
+            encode_ms=(encoded - grabbed) * 1000
+        )
+        
+        share = share_info(photo_id)
+        prerender_print(filepath)
+        generate_derivatives(filepath)
+        total = time.perf_counter() - started
+        CAPTURE_SECONDS.labels('total').observe(total)
+    
+    log.info("Foto aufgenommen", extra={'session': session_id, 'photo_id': photo_id, 'trace_id': trace_id,
+                                        'stage': 'capture', 'duration_ms': round(total * 1000, 1)})
+    
+    return {
+        'success': True,
+        'photo_id': photo_id,
+        'url': f'/static/photos/{filename}',
+        'timestamp': datetime.now().isoformat(),
+        'trace_id': trace_id,
+        'shutter_at': shutter_at,
+        **share
+    }
+
+def get_countdown():
+    """Server-seitigen Countdown lazy initialisieren"""
+    global countdown
+    if countdown is None:
+        countdown = CaptureCountdown(take_photo, socketio.emit, seconds=COUNTDOWN_SECONDS)
+    return countdown
+
 @app.route('/api/capture', methods=['POST'])
+@idempotent('capture')
 def capture_photo():
-    """Foto aufnehmen"""
+    """Foto sofort aufnehmen (ohne Countdown)"""
     try:
-        # Eindeutigen Dateinamen generieren
-        photo_id = str(uuid.uuid4())
-        filename = f"{photo_id}.jpg"
-        filepath = PHOTO_DIR / filename
-        
-        # Foto aufnehmen und speichern
-        success = get_camera().capture(str(filepath))
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'photo_id': photo_id,
-                'url': f'/static/photos/{filename}',
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Kamera konnte kein Foto aufnehmen'
-            }), 500
+        result = take_photo(request.headers.get(tracing.TRACE_HEADER))
+        result.pop('shutter_at', None)
+        return jsonify(result), 200 if result['success'] else 500
             
     except Exception as e:
         return jsonify({
@@ -91,6 +445,30 @@ def capture_photo():
             'error': str(e)
         }), 500
 
+@app.route('/api/capture/countdown', methods=['POST'])
+def start_countdown():
+    """
+    Countdown im Server starten (Bildschirm-Button, gleicher Ablauf wie der Hardware-Button)
+    
+    Returns:
+        202 wenn gestartet, 409 wenn bereits ein Countdown läuft.
+        Fortschritt und Ergebnis kommen per Socket.IO.
+    """
+    if get_countdown().trigger(source='ui'):
+        return jsonify({'success': True, 'seconds': COUNTDOWN_SECONDS}), 202
+    duplicates.add('countdown_coalesced')
+    return jsonify({'success': False, 'error': 'Countdown läuft bereits'}), 409
+
+@app.route('/api/capture/stats')
+def capture_stats():
+    """Latenz Knopfdruck → Auslöser der letzten Countdown-Aufnahmen"""
+    return jsonify(get_countdown().get_stats())
+
+@app.route('/api/duplicates/stats')
+def duplicate_stats():
+    """Vermiedene doppelte Aufnahmen, Drucke und AI-Läufe (je Grund)"""
+    return jsonify(duplicates.snapshot())
+
 @app.route('/api/preview')
 def get_preview():
     """Live-Preview Frame holen"""
@@ -103,14 +481,10 @@ def get_preview():
 def video_feed():
     """Video-Stream für Live-Preview"""
     def generate():
-        camera_instance = get_camera()
-        while True:
-            frame = camera_instance.get_frame()
-            if frame:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame.getvalue() + b'\r\n')
-            else:
-                break
+        # Jedes Kamera-Frame höchstens einmal, kodiert einmal für alle Viewer
+        for _, jpeg in get_camera().stream():
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
     
     from flask import Response
     return Response(generate(),
@@ -118,34 +492,86 @@ def video_feed():
 
 @app.route('/api/photos')
 def list_photos():
-    """Alle verfügbaren Fotos auflisten"""
+    """
+    Fotos seitenweise auflisten (neueste zuerst, aus dem Katalog-Index)
+    
+    Query-Parameter:
+        limit: Anzahl Fotos pro Seite (Standard: 50, max. PHOTO_PAGE_MAX)
+        before: Cursor - nur ältere Fotos (nächste Seite: next_before)
+        since: Cursor - nur neuere Fotos (neue Aufnahmen: next_since)
+        type: 'original' oder 'ai' (Standard: alle)
+        size: 'thumb', 'screen' oder 'full' → URL zeigt auf das Derivat (sonst Original)
+        format: 'webp' oder 'jpeg' (Standard: per Accept-Header)
+    
+    Returns:
+        JSON: {'photos', 'has_more', 'next_before', 'next_since'}
+    """
+    kind = request.args.get('type')
+    if kind not in (None, KIND_ORIGINAL, KIND_AI):
+        return jsonify({'error': f'Unbekannter Typ: {kind}'}), 400
+    
+    try:
+        limit = int(request.args.get('limit', PHOTO_PAGE_SIZE))
+        before = request.args.get('before')
+        since = request.args.get('since')
+        before = parse_cursor(before) if before else None
+        since = parse_cursor(since) if since else None
+    except ValueError as e:
+        return jsonify({'error': f'Ungültiger Parameter: {e}'}), 400
+    limit = max(1, min(limit, PHOTO_PAGE_MAX))
+    
+    entries, has_more = get_store().page(kind=kind, limit=limit, before=before, since=since)
+    
+    size = request.args.get('size')
+    fmt = request.args.get('format')
+    accept = request.headers.get('Accept', '')
+    
     photos = []
-    for photo in PHOTO_DIR.glob("*.jpg"):
-        photos.append({
-            'id': photo.stem,
-            'filename': photo.name,
-            'url': f'/static/photos/{photo.name}',
-            'timestamp': photo.stat().st_mtime
-        })
+    for entry in entries:
+        photo = entry.to_dict()
+        photo['cursor'] = entry.cursor
+        if size:
+            path, _ = get_derivatives().pick(entry.id, size, fmt, accept)
+            if path is not None:
+                photo['url'] = f'/static/photos/derivatives/{path.name}'
+        photos.append(photo)
     
-    # Nach Zeitstempel sortieren (neueste zuerst)
-    photos.sort(key=lambda x: x['timestamp'], reverse=True)
-    return jsonify(photos)
+    return jsonify({
+        'photos': photos,
+        'has_more': has_more,
+        'next_before': entries[-1].cursor if entries else None,
+        'next_since': entries[0].cursor if entries else None
+    })
 
 @app.route('/download/<photo_id>')
 def download_photo(photo_id):
-    """Foto zum Download bereitstellen"""
-    filepath = PHOTO_DIR / f"{photo_id}.jpg"
-    if filepath.exists():
-        return send_file(
-            filepath,
+    """Foto zum Download bereitstellen (UUID-URL, unveränderlich → langes Caching, außer AI-Ergebnisse)"""
+    entry = get_store().get_photo(photo_id)
+    if entry is not None:
+        get_retention().touch(photo_id)
+        return send_cached(
+            entry.path,
+            etags,
+            mimetype='image/jpeg',
+            immutable=is_immutable_name(Path(entry.path).name),
             as_attachment=True,
             download_name=f"photobox_{photo_id}.jpg"
         )
     return jsonify({'error': 'Foto nicht gefunden'}), 404
 
+@app.route('/api/qr/<photo_id>')
+def qr_code(photo_id):
+    """QR-Code zur Share-Seite der Session eines Fotos (für die Kiosk-Oberfläche)"""
+    if get_store().get_photo(photo_id) is None:
+        return jsonify({'error': 'Foto nicht gefunden'}), 404
+    qr_path = get_qr_codes().ensure(photo_id)
+    if qr_path is None:
+        return jsonify({'error': "QR-Codes nicht verfügbar ('qrcode' nicht installiert)"}), 404
+    return send_cached(qr_path, etags, mimetype='image/png')
+
 # NEU: AI-Processing Endpunkt
 @app.route('/api/process-ai/<photo_id>', methods=['POST'])
+@idempotent('ai')
 def process_ai(photo_id):
     """
     Verarbeitet ein Foto mit AI
@@ -154,7 +580,8 @@ def process_ai(photo_id):
         photo_id: ID des zu verarbeitenden Fotos
         
     Returns:
-        {'success': bool, 'ai_photo_id': str, 'url': str, 'theme': str}
+        {'success': bool, 'ai_photo_id': str, 'url': str, 'theme': str,
+         'share_url': str, 'qr_url': str, 'trace_id': str}
     """
     try:
         input_filepath = PHOTO_DIR / f"{photo_id}.jpg"
@@ -165,16 +592,37 @@ def process_ai(photo_id):
                 'error': 'Foto nicht gefunden'
             }), 404
         
-        print(f"\n🎨 Starte AI-Verarbeitung für {photo_id}")
-        
-        # AI Processor holen und verarbeiten
-        processor = get_ai_processor()
-        result = processor.process_image(str(input_filepath))
+        # Pro Session läuft höchstens eine AI-Verarbeitung
+        session_id = session_id_for(photo_id)
+        trace_id = tracing.tracer.trace_for(session_id, request.headers.get(tracing.TRACE_HEADER))
+        with in_flight.claim('ai', session_id) as claimed:
+            if not claimed:
+                return jsonify({
+                    'success': False,
+                    'error': 'AI-Verarbeitung für dieses Foto läuft bereits'
+                }), 409
+            
+            log.info("Starte AI-Verarbeitung", extra={'session': session_id, 'photo_id': photo_id,
+                                                      'trace_id': trace_id, 'stage': 'ai'})
+            get_retention().touch(photo_id)
+            
+            # AI Processor holen und verarbeiten
+            with tracing.tracer.span(trace_id, 'ai', session_id=session_id, photo_id=photo_id) as span:
+                processor = get_ai_processor()
+                started_at = time.time()
+                result = processor.process_image(str(input_filepath), trace_id=trace_id)
+                get_store().add_ai_job(photo_id, result, started_at)
+                if not result['success']:
+                    span['status'] = 'error'
+                    span['error'] = result['message'][:200]
+                else:
+                    span['theme'] = result['theme']
         
         if not result['success']:
             return jsonify({
                 'success': False,
-                'error': result['message']
+                'error': result['message'],
+                'trace_id': trace_id
             }), 500
         
         # AI-Output zurück in static/photos kopieren
@@ -182,19 +630,28 @@ def process_ai(photo_id):
         ai_filename = f"{ai_photo_id}.jpg"
         ai_filepath = PHOTO_DIR / ai_filename
         
-        print(f"📋 Kopiere AI-Output: {result['output_path']} → {ai_filepath}")
-        shutil.copy2(result['output_path'], ai_filepath)
+        # Über versteckte Temp-Datei kopieren, damit nie eine halbe Datei sichtbar ist
+        log.debug(f"Kopiere AI-Output: {result['output_path']} → {ai_filepath}")
+        tmp_filepath = PHOTO_DIR / f".{ai_filename}"
+        shutil.copy2(result['output_path'], tmp_filepath)
+        os.replace(tmp_filepath, ai_filepath)
+        get_store().add_photo(get_catalog().add(ai_filepath))
+        share = share_info(ai_photo_id)
+        prerender_print(ai_filepath)
+        generate_derivatives(ai_filepath)
         
         return jsonify({
             'success': True,
             'ai_photo_id': ai_photo_id,
             'url': f'/static/photos/{ai_filename}',
             'theme': result['theme'],
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.now().isoformat(),
+            'trace_id': trace_id,
+            **share
         })
         
     except Exception as e:
-        print(f"❌ AI-Verarbeitung Fehler: {e}")
+        log.exception(f"AI-Verarbeitung Fehler: {e}", extra={'stage': 'ai'})
         return jsonify({
             'success': False,
             'error': f'Unerwarteter Fehler: {str(e)}'
@@ -202,10 +659,9 @@ def process_ai(photo_id):
 
 @app.route('/api/ai/status')
 def ai_status():
-    """Prüft ob AI verfügbar ist"""
+    """Prüft ob AI verfügbar ist (aus dem Status-Cache)"""
     try:
-        processor = get_ai_processor()
-        status = processor.check_availability()
+        status = get_status_service().get('ai')
         return jsonify(status)
     except Exception as e:
         return jsonify({
@@ -215,36 +671,111 @@ def ai_status():
 
 # Drucker-Endpunkte
 @app.route('/api/print/<photo_id>', methods=['POST'])
+@idempotent('print')
 def print_photo(photo_id):
     """
     Foto drucken
     
     Args:
         photo_id: ID des zu druckenden Fotos
+        
+    Optionaler JSON-Body:
+        {'layout': 'single' | 'strip' | '2up' | 'side_by_side',
+         'photo_ids': [weitere Foto-IDs für Mehrfach-Layouts],
+         'reprint': true}  → denselben Bogen innerhalb von PRINT_REPEAT_WINDOW erneut drucken
     """
     try:
-        filepath = PHOTO_DIR / f"{photo_id}.jpg"
+        options = request.get_json(silent=True) or {}
+        layout = options.get('layout', 'single')
+        
+        if layout not in LAYOUTS:
+            return jsonify({
+                'success': False,
+                'error': f'Unbekanntes Layout: {layout}'
+            }), 400
+        
+        # Fotos für das Layout bestimmen
+        extra_ids = options.get('photo_ids')
+        if extra_ids is not None and not (
+            isinstance(extra_ids, list) and all(isinstance(pid, str) for pid in extra_ids)
+        ):
+            return jsonify({
+                'success': False,
+                'error': "'photo_ids' muss eine Liste von Foto-IDs sein"
+            }), 400
+        if extra_ids:
+            photo_ids = [photo_id] + [pid for pid in extra_ids if pid != photo_id]
+        elif layout == 'side_by_side':
+            # Original + AI-Version desselben Fotos
+            original_id = photo_id.removesuffix('_ai')
+            photo_ids = [original_id, f"{original_id}_ai"]
+        else:
+            photo_ids = [photo_id]
         
-        if not filepath.exists():
+        # Nur Fotos aus dem Session-Store - Client-IDs werden nie zu Pfaden
+        entries = [get_store().get_photo(pid) for pid in photo_ids]
+        if any(entry is None for entry in entries):
             return jsonify({
                 'success': False,
                 'error': 'Foto nicht gefunden'
             }), 404
+        filepaths = [entry.path for entry in entries]
+        
+        for pid in photo_ids:
+            get_retention().touch(pid)
+        
+        # Der Druck gehört zum Trace der Session des ersten Fotos
+        session_id = session_id_for(photo_ids[0])
+        trace_id = tracing.tracer.trace_for(session_id, request.headers.get(tracing.TRACE_HEADER))
         
-        # Drucker holen und drucken
-        printer_instance = get_printer()
-        result = printer_instance.print_image(str(filepath))
+        # Derselbe Bogen wird nicht doppelt in die Warteschlange gestellt - weder
+        # während der Übergabe an CUPS noch kurz danach (zweiter Tipp auf "Drucken")
+        with in_flight.claim('print', (layout, *photo_ids)) as claimed:
+            if not claimed:
+                return jsonify({
+                    'success': False,
+                    'error': 'Dieser Druck wird bereits gesendet'
+                }), 409
+            
+            if not options.get('reprint'):
+                previous = get_store().recent_print_job(photo_ids, layout, time.time() - PRINT_REPEAT_WINDOW)
+                if previous is not None:
+                    duplicates.add('print_repeated')
+                    return jsonify({
+                        'success': False,
+                        'error': 'Dieser Bogen wurde gerade erst gedruckt',
+                        'job_id': previous['job_id']
+                    }), 409
+            
+            # Drucker holen und drucken (der Trace endet mit der Übergabe an CUPS)
+            with tracing.tracer.span(trace_id, 'print', session_id=session_id,
+                                     photo_id=photo_ids[0], layout=layout) as span:
+                printer_instance = get_printer()
+                submitted_at = time.time()
+                if layout == 'single':
+                    result = printer_instance.print_image(str(filepaths[0]), trace_id=trace_id)
+                else:
+                    result = printer_instance.print_layout([str(path) for path in filepaths], layout,
+                                                           trace_id=trace_id)
+                get_store().add_print_job(photo_ids, layout, result, submitted_at, time.time() - submitted_at)
+                if result['success']:
+                    span['job_id'] = result['job_id']
+                else:
+                    span['status'] = 'error'
+                    span['error'] = result['message'][:200]
         
         if result['success']:
             return jsonify({
                 'success': True,
                 'message': result['message'],
-                'job_id': result['job_id']
+                'job_id': result['job_id'],
+                'trace_id': trace_id
             })
         else:
             return jsonify({
                 'success': False,
-                'error': result['message']
+                'error': result['message'],
+                'trace_id': trace_id
             }), 500
             
     except Exception as e:
@@ -253,12 +784,106 @@ def print_photo(photo_id):
             'error': f'Unerwarteter Fehler: {str(e)}'
         }), 500
 
+def parse_time(value):
+    """Zeitpunkt aus Unix-Zeit oder ISO 8601 (z.B. 2025-06-14T18:00)"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.route('/api/export')
+def export_photos():
+    """
+    Fotos als ZIP/TAR streamen (wird beim Senden erzeugt, nie komplett im Speicher)
+    
+    Query-Parameter:
+        format: 'zip' (Standard) oder 'tar'
+        from, to: Zeitraum (Unix-Zeit oder ISO 8601), 'to' exklusiv
+        sessions: Kommagetrennte Session-IDs
+        include: Kommagetrennt aus 'original', 'ai', 'derivatives' (Standard: original,ai)
+        derivative_size: Nur diese Derivat-Größe ('thumb', 'screen', 'full')
+    """
+    fmt = request.args.get('format', 'zip')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unbekanntes Format: {fmt}'}), 400
+    
+    include = set(filter(None, request.args.get('include', 'original,ai').split(',')))
+    unknown = include - {KIND_ORIGINAL, KIND_AI, 'derivatives'}
+    if unknown or not include:
+        return jsonify({'error': f'Ungültiges include: {", ".join(sorted(unknown)) or "leer"}'}), 400
+    
+    try:
+        start = parse_time(request.args['from']) if request.args.get('from') else None
+        end = parse_time(request.args['to']) if request.args.get('to') else None
+    except ValueError as e:
+        return jsonify({'error': f'Ungültiger Zeitpunkt: {e}'}), 400
+    session_ids = [sid for sid in request.args.get('sessions', '').split(',') if sid]
+    
+    # Auswahl vorab (schnelle Index-Abfrage), Dateien werden erst beim Senden gelesen
+    store = get_store()
+    selected = store.select_photos(start=start, end=end, session_ids=session_ids)
+    entries = [entry for entry in selected if entry.kind in include]
+    derivative_files = []
+    if 'derivatives' in include:
+        derivative_files = store.derivatives_for(
+            [entry.id for entry in selected], size=request.args.get('derivative_size')
+        )
+    
+    stream = stream_zip if fmt == 'zip' else stream_tar
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    download_name = f"photobox_export_{datetime.now():%Y-%m-%d_%H%M}{extension}"
+    log.info(f"Export: {len(entries)} Fotos, {len(derivative_files)} Derivate als {fmt}")
+    
+    return app.response_class(
+        stream(export_files(entries, derivative_files)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{download_name}"',
+            'Cache-Control': 'no-store',
+        }
+    )
+
+@app.route('/api/sessions/<session_id>')
+def get_session(session_id):
+    """Alles zu einer Aufnahme: Fotos, AI-Jobs, Derivate, Druckaufträge"""
+    session = get_store().get_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Session nicht gefunden'}), 404
+    return jsonify(session)
+
+@app.route('/api/sessions/stats')
+def session_stats():
+    """Kennzahlen des Events (Sessions, Fotos, AI-Jobs, Drucke)"""
+    return jsonify(get_store().stats())
+
+@app.route('/api/pool/stats')
+def pool_stats():
+    """Kennzahlen des Image Worker Pools (Queue-Tiefe, Zeiten pro Task)"""
+    return jsonify(get_image_pool().stats())
+
+@app.route('/api/print/layouts')
+def print_layouts():
+    """Verfügbare Drucklayouts auflisten"""
+    return jsonify(LAYOUTS)
+
 @app.route('/api/printer/status')
 def printer_status():
-    """Drucker-Status abfragen"""
+    """Drucker-Status abfragen (aus dem Status-Cache)"""
+    try:
+        status = get_status_service().get('printer')
+        return jsonify(status)
+    except Exception as e:
+        return jsonify({
+            'available': False,
+            'status': 'Fehler',
+            'details': str(e)
+        }), 500
+
+@app.route('/api/camera/status')
+def camera_status():
+    """Kamera-Status abfragen (aus dem Status-Cache)"""
     try:
-        printer_instance = get_printer()
-        status = printer_instance.get_printer_status()
+        status = get_status_service().get('camera')
         return jsonify(status)
     except Exception as e:
         return jsonify({
@@ -267,66 +892,107 @@ def printer_status():
             'details': str(e)
         }), 500
 
+@app.route('/api/camera/stats')
+def camera_stats():
+    """Kennzahlen des Kamera-Threads (Frames, Viewer, Wartezeiten je Anfrageart)"""
+    return jsonify(get_camera().get_stats())
+
+@app.route('/api/status')
+def all_status():
+    """Status aller Geräte (aus dem Status-Cache)"""
+    return jsonify(get_status_service().snapshot())
+
+@socketio.on('connect')
+def send_status_on_connect():
+    """Neuen Clients sofort den aktuellen Status schicken"""
+    if status_service is not None:
+        socketio.emit("status_update", status_service.snapshot(), to=request.sid)
+
 @app.route('/api/cleanup', methods=['POST'])
 def cleanup_old_photos():
-    """Alte Fotos löschen (älter als 1 Stunde)"""
-    import time
-    deleted = 0
-    current_time = time.time()
-    
-    for photo in PHOTO_DIR.glob("*.jpg"):
-        if current_time - photo.stat().st_mtime > 3600:  # 1 Stunde
-            photo.unlink()
-            deleted += 1
+    """
+    Retention sofort ausführen (läuft sonst alle RETENTION_INTERVAL Sekunden)
     
+    Returns:
+        JSON: Bericht der Retention-Engine (gelöschte Dateien, freigegebene Bytes)
+    """
+    report = get_retention().run_once()
     return jsonify({
         'success': True,
-        'deleted': deleted
+        'deleted': report['deleted_photos'] + report['deleted_ai'],
+        **report
     })
 
+@app.route('/api/retention/status')
+def retention_status():
+    """Retention-Regeln und letzter Bericht"""
+    return jsonify(get_retention().get_status())
+
 def listen_button():
-    """Physischen Button überwachen und Events senden"""
+    """Physischen Button überwachen und den Countdown im Server starten"""
     try:
         from inputs import get_gamepad
-        print("🎮  Warte auf physische Knopfdrücke...")
-        print("🎮  Erwarteter Event-Code: BTN_TRIGGER")
+        log.info("Warte auf physische Knopfdrücke (erwarteter Event-Code: BTN_TRIGGER)")
         
+        last_press = 0.0
         while True:
-            events = get_gamepad()
-            for event in events:
-                # Nur auf Button-Press reagieren (state == 1), nicht auf Release (state == 0)
-                if event.ev_type == "Key" and event.state == 1:
-                    print(f"✓ Button gedrückt: {event.code} (state={event.state})")
-                    
-                    # WebSocket-Event an alle verbundenen Clients senden
-                    socketio.emit("button_pressed", {"code": event.code})
-                    print("📡 WebSocket-Event 'button_pressed' gesendet")
+            # Lesen von /dev/input blockiert in C → im Async-Modus in einem OS-Thread
+            events = async_support.run_blocking(get_gamepad)
+            # Nur auf Button-Press reagieren (state == 1), nicht auf Release (state == 0)
+            presses = [event for event in events if event.ev_type == "Key" and event.state == 1]
+            if not presses:
+                continue
+            
+            pressed_at = time.monotonic()
+            # Mehrere Presses in einem Batch → ein Knopfdruck
+            for _ in presses[1:]:
+                duplicates.add('button_coalesced')
+            # Prellen: Presses kurz nach dem letzten zählen nicht
+            if pressed_at - last_press < BUTTON_DEBOUNCE:
+                duplicates.add('button_bounce')
+                continue
+            last_press = pressed_at
+            
+            event = presses[0]
+            # Kernel-Zeitstempel des Events → Verzögerung bis zum Einlesen
+            timestamp = getattr(event, "timestamp", None)
+            input_delay = time.time() - timestamp if timestamp else None
+            log.info(f"Button gedrückt: {event.code} (state={event.state})", extra={'stage': 'button'})
+            
+            # Countdown und Aufnahme laufen im Server, die Oberfläche zeigt nur an
+            if get_countdown().trigger(source='button', pressed_at=pressed_at,
+                                       input_delay=input_delay):
+                log.info("Countdown gestartet", extra={'stage': 'countdown'})
+            else:
+                duplicates.add('button_coalesced')
+                log.info("Countdown läuft bereits - Knopfdruck ignoriert", extra={'stage': 'countdown'})
                     
     except ImportError:
-        print("⚠ Warning: 'inputs' library nicht gefunden - Button-Funktion deaktiviert")
-        print("   Installiere mit: pip3 install inputs")
+        log.warning("'inputs' library nicht gefunden - Button-Funktion deaktiviert "
+                    "(installieren mit: pip3 install inputs)")
     except Exception as e:
-        print(f"❌ Fehler im Button-Handler: {e}")
+        log.exception(f"Fehler im Button-Handler: {e}")
 
 
 def start_image_server():
-    """Startet den Image-Share-Server auf Port 8080"""
+    """Startet den Image-Share-Server auf Port 8080 (überwacht, Log in Datei)"""
+    global share_server
+    
+    # Mit Reloader (debug=True) läuft __main__ zweimal - der Share-Server gehört
+    # in den langlebigen Elternprozess, nicht in jeden neu geladenen Kindprozess
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        return
+    
     try:
-        import subprocess
-        import sys
+        import atexit
         
-        # Starte image_server.py als separaten Prozess
-        print("🌐 Starte Image-Share-Server auf Port 8080...")
-        subprocess.Popen(
-            [sys.executable, "image_server.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        print("✓ Image-Share-Server gestartet!")
+        log.info("Starte Image-Share-Server auf Port 8080")
+        share_server = ShareServerSupervisor(log_path=SHARE_SERVER_LOG)
+        share_server.start()
+        atexit.register(share_server.stop)
         
     except Exception as e:
-        print(f"⚠ Warnung: Image-Share-Server konnte nicht gestartet werden: {e}")
-
+        log.warning(f"Image-Share-Server konnte nicht gestartet werden: {e}")
 
 if __name__ == '__main__':
     # Image-Share-Server starten
@@ -335,23 +1001,25 @@ if __name__ == '__main__':
     # Button-Listener starten
     threading.Thread(target=listen_button, daemon=True).start()
     
+    # Status-Service starten (Kamera, Drucker, AI im Hintergrund abfragen)
+    get_status_service()
+    
+    # Retention starten (Alter, Quota, freier Platz)
+    get_retention()
+    
     # AI Status prüfen beim Start
     try:
-        processor = get_ai_processor()
-        ai_check = processor.check_availability()
+        ai_check = get_status_service().get('ai')
         if ai_check['available']:
-            print("✅ AI-Verarbeitung verfügbar!")
+            log.info("AI-Verarbeitung verfügbar")
         else:
-            print(f"⚠️  AI-Verarbeitung nicht verfügbar: {ai_check['message']}")
+            log.warning(f"AI-Verarbeitung nicht verfügbar: {ai_check['message']}")
     except Exception as e:
-        print(f"⚠️  AI-Verarbeitung konnte nicht geprüft werden: {e}")
+        log.warning(f"AI-Verarbeitung konnte nicht geprüft werden: {e}")
     
     # Hauptserver starten
-    print("=" * 60)
-    print("📸 PhotoBox Hauptserver")
-    print("=" * 60)
-    print("🌐 PhotoBox UI: http://127.0.0.1:5000")
-    print("📱 Foto-Sharing: http://127.0.0.1:8080")
-    print("=" * 60)
-    
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    log.info(f"PhotoBox Hauptserver: Modus {async_support.active_mode()}, "
+             f"Log-Profil {logging_setup.LOG_PROFILE}, "
+             f"UI http://127.0.0.1:5000, Foto-Sharing http://127.0.0.1:8080")
+    
+    socketio.run(app, host='0.0.0.0', port=5000, **async_support.server_options())
\ No newline at end of file
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Async-Servermodus für PhotoBox
+Im Standardmodus ('threading', Werkzeug) belegt jeder MJPEG-Stream und jeder
+Socket.IO-Long-Poll einen eigenen OS-Thread. Mit gevent laufen Requests als
+Greenlets auf einer Event-Loop - viele gleichzeitige Viewer und Sockets
+kosten dann nur noch wenig Speicher.
+
+Auswahl über PHOTOBOX_ASYNC_MODE = threading (Standard) | gevent
+
+eventlet wird bewusst nicht unterstützt: es ist upstream abgekündigt, und
+sein grünes subprocess wirft ein anderes TimeoutExpired als das, das
+ai_processor.py und printer.py abfangen.
+
+Regeln für den Async-Modus:
+- monkey_patch() muss vor allen anderen Imports laufen (erste Zeilen von app.py)
+- Nach dem Patchen sind Sockets, sleep(), subprocess und threading kooperativ
+- Aufrufe, die in C blockieren ohne die Event-Loop zu kennen (OpenCV grab/
+  retrieve/imencode, Lesen von /dev/input), laufen über run_blocking() in
+  echten OS-Threads. Sie dürfen dabei keine Locks/Events der App benutzen -
+  die sind nach dem Patchen grün und gehören zur Event-Loop.
+"""
+import os
+
+ASYNC_MODES = ('threading', 'gevent')
+
+
+def configured_mode():
+    """
+    Async-Modus aus PHOTOBOX_ASYNC_MODE lesen
+
+    Returns:
+        str: 'threading' oder 'gevent'
+
+    Raises:
+        ValueError bei unbekanntem Modus
+    """
+    mode = os.environ.get("PHOTOBOX_ASYNC_MODE", "threading").strip().lower() or "threading"
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"Unbekannter PHOTOBOX_ASYNC_MODE: {mode} (erlaubt: {', '.join(ASYNC_MODES)})")
+    return mode
+
+
+ASYNC_MODE = configured_mode()
+
+_patched = None
+
+
+def monkey_patch(mode=None):
+    """
+    Standardbibliothek für gevent patchen (im Modus 'threading' nichts)
+
+    Args:
+        mode: Async-Modus (Standard: ASYNC_MODE) - nur beim ersten Aufruf wirksam
+
+    Returns:
+        str: Aktiver Async-Modus
+    """
+    global _patched
+    if _patched is not None:
+        return _patched
+
+    mode = mode or ASYNC_MODE
+    if mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    _patched = mode
+    return mode
+
+
+def active_mode():
+    """Async-Modus nach monkey_patch() ('threading' wenn nicht gepatcht)"""
+    return _patched or 'threading'
+
+
+def run_blocking(func, *args, **kwargs):
+    """
+    Blockierenden Aufruf ausführen, ohne die Event-Loop anzuhalten
+
+    Im Modus 'threading' ein direkter Aufruf (kein Overhead). Mit gevent läuft
+    func in einem echten OS-Thread des Hub-Thread-Pools, der aufrufende
+    Greenlet wartet kooperativ. Exceptions werden an den Aufrufer weitergegeben.
+
+    Args:
+        func: Funktion, die in C blockiert (darf keine App-Locks benutzen)
+
+    Returns:
+        Rückgabewert von func
+    """
+    if active_mode() == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args, kwargs)
+    return func(*args, **kwargs)
+
+
+def server_options():
+    """
+    Optionen für socketio.run() je nach Modus
+
+    Returns:
+        dict: Werkzeug-Entwicklungsserver im Modus 'threading' (mit Debug und
+              Reloader nur im Log-Profil 'development'), sonst der WSGI-Server
+              von gevent ohne Reloader
+    """
+    # Erst hier importieren: async_support läuft vor dem Patchen
+    import logging_setup
+    if active_mode() == 'threading':
+        debug = not logging_setup.is_production()
+        return {'debug': debug, 'use_reloader': debug, 'log_output': debug, 'allow_unsafe_werkzeug': True}
+    return {'debug': False, 'use_reloader': False, 'log_output': False}
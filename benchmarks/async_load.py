@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Last-Test für die Server-Modi von PhotoBox (PHOTOBOX_ASYNC_MODE)
+Startet je Modus den Hauptserver mit synthetischer Kamera
+(benchmarks/load_server.py) und erhöht stufenweise die Last:
+
+- Preview-Viewer: gleichzeitige MJPEG-Streams (/api/video_feed)
+- Socket.IO-Clients: gleichzeitige WebSocket-Verbindungen, pro Stufe ein
+  Countdown-Broadcast (countdown_started an alle Clients)
+
+Eine Stufe gilt als gehalten, wenn jeder Viewer mindestens --min-fps-ratio
+der Kamera-Bildrate bekommt bzw. jeder Socket verbunden ist und den Broadcast
+innerhalb von --max-fanout-ms erhält, und /api/status nebenbei im p95 unter
+--max-probe-ms antwortet. Die erste nicht gehaltene Stufe beendet die Rampe.
+
+Aufruf (aus dem Projektverzeichnis):
+    python3 benchmarks/async_load.py --modes threading gevent --viewers 1 4 8 16 32 --sockets 25 50 100 200
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import simple_websocket
+
+from stats import percentile
+
+BENCH_DIR = Path(__file__).resolve().parent
+BOUNDARY = b'--frame'
+
+
+def process_info(pid):
+    """RSS (MB) und Anzahl OS-Threads des Server-Prozesses (Linux /proc)"""
+    info = {}
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                info['rss_mb'] = int(line.split()[1]) / 1024
+            elif line.startswith("Threads:"):
+                info['threads'] = int(line.split()[1])
+    except OSError:
+        pass
+    return info
+
+
+class Server:
+    """Hauptserver in einem eigenen Prozess (je Modus)"""
+
+    def __init__(self, mode, port, fps, width, height, countdown):
+        self.mode = mode
+        self.port = port
+        self.workdir = tempfile.TemporaryDirectory(prefix=f"photobox-load-{mode}-")
+        env = dict(os.environ, PHOTOBOX_ASYNC_MODE=mode, PHOTOBOX_COUNTDOWN=str(countdown))
+        self.log = open(Path(self.workdir.name) / "server.log", "wb")
+        self.process = subprocess.Popen(
+            [sys.executable, str(BENCH_DIR / "load_server.py"), '--port', str(port),
+             '--workdir', self.workdir.name, '--fps', str(fps),
+             '--width', str(width), '--height', str(height)],
+            env=env, stdout=self.log, stderr=subprocess.STDOUT
+        )
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server ({self.mode}) beendet, siehe {self.log.name}")
+            try:
+                get(self.port, '/api/status', timeout=2)
+                return
+            except OSError:
+                time.sleep(0.5)
+        raise RuntimeError(f"Server ({self.mode}) nicht erreichbar")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+        self.workdir.cleanup()
+
+
+def get(port, path, method='GET', timeout=10):
+    """Einfacher Request, liefert (Status, Dauer in Sekunden)"""
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request(method, path)
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+class Probe:
+    """Fragt während einer Stufe /api/status ab (Antwortzeit der restlichen App)"""
+
+    def __init__(self, port, interval=0.2):
+        self.port = port
+        self.interval = interval
+        self.times = []
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                status, elapsed = get(self.port, '/api/status', timeout=5)
+                if status == 200:
+                    self.times.append(elapsed)
+                else:
+                    self.errors += 1
+            except OSError:
+                self.errors += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return {
+            'count': len(self.times),
+            'errors': self.errors,
+            'p50_ms': percentile(self.times, 50) * 1000 if self.times else None,
+            'p95_ms': percentile(self.times, 95) * 1000 if self.times else None,
+        }
+
+
+def viewer(port, seconds, results, errors):
+    """Ein MJPEG-Viewer: zählt empfangene Frames"""
+    frames = 0
+    tail = b''
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        conn.request('GET', '/api/video_feed')
+        response = conn.getresponse()
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            data = tail + chunk
+            frames += data.count(BOUNDARY)
+            tail = data[-(len(BOUNDARY) - 1):]
+        elapsed = time.perf_counter() - started
+        conn.close()
+        results.append(frames / elapsed if elapsed else 0.0)
+    except OSError as e:
+        errors.append(str(e))
+
+
+def run_viewers(server, count, seconds, fps, args):
+    results, errors = [], []
+    probe = Probe(server.port)
+    threads = [threading.Thread(target=viewer, args=(server.port, seconds, results, errors))
+               for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds / 2)
+    peak = process_info(server.process.pid)
+    for thread in threads:
+        thread.join(timeout=seconds + 15)
+    probe_stats = probe.stop()
+
+    fps_min = min(results) if results else 0.0
+    held = (not errors and len(results) == count
+            and fps_min >= args.min_fps_ratio * fps
+            and probe_stats['p95_ms'] is not None and probe_stats['p95_ms'] <= args.max_probe_ms)
+    return {
+        'viewers': count,
+        'held': held,
+        'fps_min': fps_min,
+        'fps_mean': statistics.mean(results) if results else 0.0,
+        'errors': len(errors),
+        'probe': probe_stats,
+        'server': peak,
+    }
+
+
+class SocketClient:
+    """Minimaler Socket.IO-Client (Engine.IO v4, Upgrade auf WebSocket)"""
+
+    def __init__(self, port):
+        self.port = port
+        self.events = {}        # Event-Name → Empfangszeitpunkt (erstes Vorkommen)
+        self.connected = False
+        self.error = None
+        self.ws = None
+        self._stop = threading.Event()
+
+    def connect(self):
+        """Wie der Browser: Handshake per Long-Polling, dann Upgrade auf WebSocket"""
+        try:
+            started = time.perf_counter()
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+            conn.request('GET', '/socket.io/?EIO=4&transport=polling')
+            opening = conn.getresponse().read().decode()
+            conn.close()
+            if not opening.startswith('0'):
+                raise ConnectionError(f"Unerwartetes Open-Paket: {opening!r}")
+            sid = json.loads(opening[1:])['sid']
+
+            self.ws = simple_websocket.Client(
+                f"ws://127.0.0.1:{self.port}/socket.io/?EIO=4&transport=websocket&sid={sid}")
+            self.ws.send('2probe')
+            if self.ws.receive(timeout=10) != '3probe':
+                raise ConnectionError("WebSocket-Upgrade fehlgeschlagen")
+            self.ws.send('5')
+            self.ws.send('40')
+            while True:
+                message = self.ws.receive(timeout=10)
+                if message is None:
+                    raise ConnectionError("Timeout beim Socket.IO-Connect")
+                if message.startswith('40'):
+                    break
+                self._handle(message)
+            self.connect_time = time.perf_counter() - started
+            self.connected = True
+            threading.Thread(target=self._listen, daemon=True).start()
+        except Exception as e:
+            self.error = str(e)
+
+    def _handle(self, message):
+        if message == '2':  # Ping → Pong
+            self.ws.send('3')
+        elif message.startswith('42'):
+            try:
+                name = json.loads(message[2:])[0]
+            except (ValueError, IndexError):
+                return
+            self.events.setdefault(name, time.perf_counter())
+
+    def _listen(self):
+        while not self._stop.is_set():
+            try:
+                message = self.ws.receive(timeout=1)
+            except Exception as e:
+                if not self._stop.is_set():
+                    self.error = str(e)
+                return
+            if message is not None:
+                self._handle(message)
+
+    def close(self):
+        self._stop.set()
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+
+
+def run_sockets(server, count, seconds, args):
+    clients = [SocketClient(server.port) for _ in range(count)]
+    threads = [threading.Thread(target=client.connect) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    connected = [client for client in clients if client.connected]
+
+    probe = Probe(server.port)
+    time.sleep(1)
+    # Broadcast: Countdown starten, alle Clients bekommen countdown_started
+    sent_at = time.perf_counter()
+    status, _ = get(server.port, '/api/capture/countdown', method='POST')
+    time.sleep(seconds)
+    peak = process_info(server.process.pid)
+    probe_stats = probe.stop()
+
+    fanout = [client.events['countdown_started'] - sent_at
+              for client in connected if 'countdown_started' in client.events]
+    for client in clients:
+        client.close()
+    # Countdown und Aufnahme abwarten, bevor die nächste Stufe startet
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+        conn.request('GET', '/api/capture/stats')
+        running = json.loads(conn.getresponse().read()).get('running')
+        conn.close()
+        if not running:
+            break
+        time.sleep(0.5)
+
+    fanout_p95 = percentile(fanout, 95) * 1000 if fanout else None
+    held = (status == 202 and len(connected) == count and len(fanout) == count
+            and fanout_p95 <= args.max_fanout_ms
+            and probe_stats['p95_ms'] is not None and probe_stats['p95_ms'] <= args.max_probe_ms)
+    return {
+        'sockets': count,
+        'held': held,
+        'connected': len(connected),
+        'connect_p95_ms': percentile([c.connect_time for c in connected], 95) * 1000 if connected else None,
+        'fanout_received': len(fanout),
+        'fanout_p95_ms': fanout_p95,
+        'fanout_max_ms': max(fanout) * 1000 if fanout else None,
+        'probe': probe_stats,
+        'server': peak,
+    }
+
+
+def run_mode(mode, args):
+    server = Server(mode, args.port, args.fps, args.width, args.height, countdown=1)
+    try:
+        server.wait_ready()
+        result = {'mode': mode, 'idle': process_info(server.process.pid),
+                  'viewer_levels': [], 'socket_levels': []}
+
+        for count in args.viewers:
+            level = run_viewers(server, count, args.seconds, args.fps, args)
+            result['viewer_levels'].append(level)
+            print_level(mode, f"{count} Viewer", level,
+                        f"min {level['fps_min']:.1f} fps, Ø {level['fps_mean']:.1f} fps")
+            if not level['held']:
+                break
+
+        for count in args.sockets:
+            level = run_sockets(server, count, args.seconds, args)
+            result['socket_levels'].append(level)
+            fanout = (f"{level['fanout_p95_ms']:.0f} ms" if level['fanout_p95_ms'] is not None else "-")
+            print_level(mode, f"{count} Sockets", level,
+                        f"{level['connected']} verbunden, Broadcast p95 {fanout}")
+            if not level['held']:
+                break
+
+        result['max_viewers'] = max((l['viewers'] for l in result['viewer_levels'] if l['held']), default=0)
+        result['max_sockets'] = max((l['sockets'] for l in result['socket_levels'] if l['held']), default=0)
+        return result
+    finally:
+        server.stop()
+
+
+def print_level(mode, label, level, detail):
+    probe = level['probe']
+    server = level['server']
+    mark = "✓" if level['held'] else "❌"
+    probe_p95 = f"{probe['p95_ms']:.0f} ms" if probe['p95_ms'] is not None else "-"
+    print(f"{mark} [{mode}] {label:<12} {detail} | /api/status p95 {probe_p95} | "
+          f"{server.get('threads', '?')} Threads, {server.get('rss_mb', 0):.0f} MB", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preview-Viewer und Socket.IO-Clients je Server-Modus")
+    parser.add_argument('--modes', nargs='+', default=['threading', 'gevent'], help="Zu testende Modi")
+    parser.add_argument('--viewers', type=int, nargs='+', default=[1, 4, 8, 16, 32],
+                        help="Stufen gleichzeitiger MJPEG-Streams")
+    parser.add_argument('--sockets', type=int, nargs='+', default=[25, 50, 100, 200],
+                        help="Stufen gleichzeitiger Socket.IO-Clients")
+    parser.add_argument('--seconds', type=float, default=10, help="Dauer je Stufe")
+    parser.add_argument('--fps', type=int, default=30, help="Bildrate der synthetischen Kamera")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--min-fps-ratio', type=float, default=0.8,
+                        help="Viewer gilt als bedient ab diesem Anteil der Kamera-Bildrate")
+    parser.add_argument('--max-probe-ms', type=float, default=250, help="Grenze p95 für /api/status")
+    parser.add_argument('--max-fanout-ms', type=float, default=1000, help="Grenze p95 für den Broadcast")
+    parser.add_argument('--json', metavar="PFAD", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        print("=" * 60)
+        print(f"⚙️  Modus: {mode}")
+        print("=" * 60, flush=True)
+        results.append(run_mode(mode, args))
+
+    print("=" * 60)
+    print(f"{'Modus':<12}{'Viewer':>10}{'Sockets':>10}")
+    for result in results:
+        print(f"{result['mode']:<12}{result['max_viewers']:>10}{result['max_sockets']:>10}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'config': vars(args), 'results': results}, indent=2))
+        print(f"✓ Ergebnis gespeichert: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
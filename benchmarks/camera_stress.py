@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Kamera-Stresstest für PhotoBox
+Viele gleichzeitige Leser (MJPEG-Streams, /api/preview-Abrufe, Aufnahmen)
+auf einer synthetischen Kamera. Jedes Frame ist einfarbig und trägt in der
+ersten Zeile die Nummer, unter der die Quelle es erzeugt hat. Geprüft wird:
+
+- keine zerrissenen Frames (Frame nicht einheitlich / Farbe passt nicht zur Nummer)
+- keine doppelten Frames pro Stream (Sequenznummern streng steigend)
+- Aufnahmen sind frisch (Frame entstand erst nach der Anfrage)
+- eine Sequenznummer gehört immer zu genau einem Quell-Frame
+
+Aufruf (aus dem Projektverzeichnis):
+    python3 benchmarks/camera_stress.py --streams 16 --previews 8 --captures 2 --seconds 10
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from camera import Camera
+from fakes import SyntheticCamera, color_for
+from stats import summarize_ms
+
+
+def frame_number(frame):
+    """Quell-Nummer aus der ersten Zeile lesen"""
+    return int(np.frombuffer(frame[0, :8, 0].tobytes(), dtype=np.int64)[0])
+
+
+def check_raw(frame):
+    """Rohes Frame: einfarbig (ohne Kopfzeile) und Farbe passt zur Nummer"""
+    number = frame_number(frame)
+    body = frame[1:]
+    expected = color_for(number)
+    return number, bool(body.min() == expected and body.max() == expected)
+
+
+def check_jpeg(jpeg):
+    """JPEG-Frame: nahezu einfarbig (verlustbehaftet, daher mit Toleranz)"""
+    image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    body = image[8:].astype(np.int16)
+    mean = float(body.mean())
+    return mean, bool(body.max() - body.min() <= 8)
+
+
+def run(streams, previews, captures, seconds, fps, width, height):
+    """Führt den Stresstest aus und liefert Messwerte und gefundene Fehler"""
+    source = SyntheticCamera(width, height, fps)
+    camera = Camera(width=width, height=height, source=source)
+    stop = threading.Event()
+    lock = threading.Lock()
+    errors = []
+    seq_to_number = {}
+    stream_stats = []
+    preview_times = []
+    capture_times = []
+
+    def error(message):
+        with lock:
+            if len(errors) < 50:
+                errors.append(message)
+
+    def bind(seq, number):
+        """Sequenznummer ↔ Quell-Frame muss eindeutig sein"""
+        with lock:
+            known = seq_to_number.setdefault(seq, number)
+        if known != number:
+            error(f"Sequenz {seq} gehört zu Frame {known} und {number}")
+
+    def stream_reader(index):
+        frames = 0
+        duplicates = 0
+        torn = 0
+        last_seq = 0
+        last_mean = None
+        started = time.perf_counter()
+        for seq, jpeg in camera.stream(timeout=2.0):
+            if seq <= last_seq:
+                duplicates += 1
+                error(f"Stream {index}: Sequenz {seq} nach {last_seq}")
+            mean, uniform = check_jpeg(jpeg)
+            if not uniform:
+                torn += 1
+                error(f"Stream {index}: Frame {seq} nicht einheitlich")
+            if last_mean is not None and abs(mean - last_mean) < 1:
+                duplicates += 1
+                error(f"Stream {index}: Frame {seq} gleicht dem vorherigen")
+            last_seq, last_mean = seq, mean
+            frames += 1
+            if stop.is_set():
+                break
+        elapsed = time.perf_counter() - started
+        with lock:
+            stream_stats.append({'frames': frames, 'fps': frames / elapsed,
+                                 'duplicates': duplicates, 'torn': torn})
+
+    def preview_reader(index):
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            jpeg = camera.get_frame()
+            if jpeg is None:
+                error(f"Preview {index}: kein Frame")
+                continue
+            with lock:
+                preview_times.append(time.perf_counter() - t0)
+            _, uniform = check_jpeg(jpeg.getvalue())
+            if not uniform:
+                error(f"Preview {index}: Frame nicht einheitlich")
+
+    def capture_reader(index):
+        while not stop.is_set():
+            requested_after = source.number
+            t0 = time.perf_counter()
+            seq, frame = camera.capture_frame()
+            elapsed = time.perf_counter() - t0
+            if frame is None:
+                error(f"Aufnahme {index}: kein Frame")
+                continue
+            with lock:
+                capture_times.append(elapsed)
+            number, consistent = check_raw(frame)
+            if not consistent:
+                error(f"Aufnahme {index}: Frame {seq} zerrissen")
+            if number <= requested_after:
+                error(f"Aufnahme {index}: Frame {number} entstand vor der Anfrage ({requested_after})")
+            bind(seq, number)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=stream_reader, args=(i,)) for i in range(streams)]
+    threads += [threading.Thread(target=preview_reader, args=(i,)) for i in range(previews)]
+    threads += [threading.Thread(target=capture_reader, args=(i,)) for i in range(captures)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    camera.release()
+
+    return {
+        'config': {'streams': streams, 'previews': previews, 'captures': captures,
+                   'seconds': seconds, 'fps': fps, 'resolution': f"{width}x{height}"},
+        'source_frames': source.number,
+        'camera': camera.get_stats(),
+        'streams': {
+            'frames_total': sum(s['frames'] for s in stream_stats),
+            'fps_min': min((s['fps'] for s in stream_stats), default=None),
+            'duplicates': sum(s['duplicates'] for s in stream_stats),
+            'torn': sum(s['torn'] for s in stream_stats),
+        },
+        'preview': summarize_ms(preview_times),
+        'capture': summarize_ms(capture_times),
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kamera-Actor mit vielen gleichzeitigen Lesern prüfen")
+    parser.add_argument('--streams', type=int, default=16, help="Gleichzeitige MJPEG-Streams")
+    parser.add_argument('--previews', type=int, default=8, help="Threads, die /api/preview-Frames abrufen")
+    parser.add_argument('--captures', type=int, default=2, help="Threads, die Aufnahmen auslösen")
+    parser.add_argument('--seconds', type=float, default=10, help="Dauer")
+    parser.add_argument('--fps', type=int, default=30, help="Bildrate der synthetischen Kamera")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=360)
+    parser.add_argument('--json', metavar="PFAD", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    results = run(args.streams, args.previews, args.captures, args.seconds,
+                  args.fps, args.width, args.height)
+
+    print("=" * 60)
+    print(f"📷 Kamera-Stresstest: {args.streams} Streams, {args.previews} Previews, "
+          f"{args.captures} Aufnahme-Threads, {args.seconds:.0f}s")
+    print("=" * 60)
+    streams = results['streams']
+    print(f"Quell-Frames:       {results['source_frames']} ({args.fps} fps), "
+          f"dekodiert: {results['camera']['frames']}")
+    if streams['fps_min'] is not None:
+        print(f"Stream-Frames:      {streams['frames_total']} (langsamster Stream {streams['fps_min']:.1f} fps)")
+    for name in ('preview', 'capture'):
+        stats = results[name]
+        if stats:
+            print(f"{name.capitalize():<20}{stats['count']} × p50 {stats['p50_ms']:.1f} ms, "
+                  f"p95 {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms")
+    print(f"Doppelte Frames:    {streams['duplicates']}")
+    print(f"Zerrissene Frames:  {streams['torn']}")
+
+    if results['errors']:
+        print(f"❌ {len(results['errors'])} Fehler, z.B.:")
+        for message in results['errors'][:10]:
+            print(f"   {message}")
+    else:
+        print("✓ Keine zerrissenen, doppelten oder veralteten Frames")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"✓ Ergebnis gespeichert: {args.json}")
+
+    sys.exit(1 if results['errors'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+"""
+Last-Generator für eine volle Veranstaltung
+Simuliert gleichzeitig:
+
+- Handys am Share-Server: laden / und /bild, pollen dann /api/status
+  (wie die Share-Seite ohne EventSource) und holen /bild bei neuem Foto
+- Kiosk-MJPEG-Viewer: /api/video_feed am Hauptserver
+- Gäste: Sessions Aufnahme → AI → Druck, Ankünfte als Poisson-Prozess
+
+Die Last wird in Stufen erhöht (--scale multipliziert Handys, Viewer und
+Sessions pro Stunde). Pro Stufe werden Latenz-Perzentile und Fehlerquoten je
+Endpunkt, die Bildrate der Viewer sowie CPU, Speicher (und auf dem Jetson
+GPU-Last und Temperatur) über die Zeit aufgezeichnet. Die erste Stufe, die
+eine Grenze reißt, ist der Bruchpunkt - die Rampe endet dort.
+
+Ohne --app/--share werden beide Server lokal mit synthetischer Hardware
+gestartet (benchmarks/load_server.py: Fake-Kamera, Fake-SD-Worker, Fake-lp).
+CPU und Speicher werden auf dem Rechner gemessen, auf dem dieses Skript läuft -
+auf dem Jetson selbst gestartet also inklusive der Last des Generators
+(dessen eigener Anteil steht unter 'generator').
+
+Aufruf (aus dem Projektverzeichnis):
+    python3 benchmarks/event_load.py --phones 25 --viewers 1 --sessions-per-hour 60 --scale 1 2 4 8
+    python3 benchmarks/event_load.py --app http://127.0.0.1:5000 --share http://127.0.0.1:8080 --scale 1
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from stats import percentile, summarize_ms
+
+BENCH_DIR = Path(__file__).resolve().parent
+BOUNDARY = b'--frame'
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+class Connection:
+    """Keep-Alive-Verbindung wie ein Browser-Tab (bei Fehlern neu aufbauen)"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._conn = None
+
+    def request(self, method, path, headers=None, body=None):
+        """
+        Request senden und Antwort komplett lesen
+
+        Returns:
+            tuple: (Status, Header-dict, Body-Bytes, Dauer in Sekunden)
+        """
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        started = time.perf_counter()
+        try:
+            self._conn.request(method, path, body=body, headers=headers or {})
+            response = self._conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if response.getheader('Connection', '').lower() == 'close':
+            self.close()
+        return response.status, dict(response.getheaders()), data, time.perf_counter() - started
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class Recorder:
+    """Sammelt (Zeitpunkt, Endpunkt, Dauer, ok) aller Requests einer Stufe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+        self.started = time.monotonic()
+
+    def record(self, name, elapsed, ok):
+        with self._lock:
+            self.samples.append((time.monotonic() - self.started, name, elapsed, ok))
+
+    def call(self, name, connection, method, path, ok_status=(200,), **kwargs):
+        """Request ausführen und verbuchen; liefert (Status, Header, Body) oder None"""
+        started = time.perf_counter()
+        try:
+            status, headers, body, elapsed = connection.request(method, path, **kwargs)
+        except (OSError, http.client.HTTPException):
+            self.record(name, time.perf_counter() - started, False)
+            return None
+        self.record(name, elapsed, status in ok_status)
+        return status, headers, body
+
+    def summary(self):
+        with self._lock:
+            samples = list(self.samples)
+        endpoints = {}
+        for _, name, elapsed, ok in samples:
+            entry = endpoints.setdefault(name, {'times': [], 'errors': 0})
+            entry['times'].append(elapsed)
+            entry['errors'] += 0 if ok else 1
+        return {
+            name: {'count': len(entry['times']), 'errors': entry['errors'],
+                   'error_rate': entry['errors'] / len(entry['times']),
+                   **summarize_ms(entry['times'])}
+            for name, entry in sorted(endpoints.items())
+        }
+
+    def timeline(self, bucket):
+        """Requests, Fehler und p95 je Zeitfenster (Sekunden ab Stufenbeginn)"""
+        with self._lock:
+            samples = list(self.samples)
+        buckets = {}
+        for offset, name, elapsed, ok in samples:
+            entry = buckets.setdefault(int(offset // bucket), {'times': [], 'errors': 0})
+            entry['times'].append(elapsed)
+            entry['errors'] += 0 if ok else 1
+        return [
+            {'t': index * bucket, 'requests': len(entry['times']), 'errors': entry['errors'],
+             'p95_ms': percentile(entry['times'], 95) * 1000}
+            for index, entry in sorted(buckets.items())
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Systemlast
+# ---------------------------------------------------------------------------
+
+def _process_tree(pid):
+    """PID und alle Nachfahren (Image-Worker, SD-Worker, lp, ...)"""
+    pids = [pid]
+    for root in pids:
+        try:
+            for task in os.listdir(f"/proc/{root}/task"):
+                children = Path(f"/proc/{root}/task/{task}/children").read_text().split()
+                pids.extend(int(child) for child in children)
+        except OSError:
+            continue
+    return pids
+
+
+def _process_usage(pid):
+    """(CPU-Ticks, RSS in MB) eines Prozessbaums"""
+    ticks = 0
+    rss_mb = 0.0
+    for member in _process_tree(pid):
+        try:
+            fields = Path(f"/proc/{member}/stat").read_text().rsplit(')', 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])  # utime + stime
+            for line in Path(f"/proc/{member}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    rss_mb += int(line.split()[1]) / 1024
+        except (OSError, IndexError, ValueError):
+            continue
+    return ticks, rss_mb
+
+
+def _cpu_times():
+    fields = [int(value) for value in Path("/proc/stat").read_text().splitlines()[0].split()[1:]]
+    idle = fields[3] + fields[4]  # idle + iowait
+    return sum(fields), idle
+
+
+def _jetson_extras():
+    """GPU-Last (%) und höchste Temperatur (°C), falls vorhanden (Jetson/Linux)"""
+    extras = {}
+    try:
+        extras['gpu_percent'] = int(Path("/sys/devices/gpu.0/load").read_text()) / 10
+    except (OSError, ValueError):
+        pass
+    temperatures = []
+    for zone in Path("/sys/class/thermal").glob("thermal_zone*/temp"):
+        try:
+            temperatures.append(int(zone.read_text()) / 1000)
+        except (OSError, ValueError):
+            continue
+    if temperatures:
+        extras['temp_max_c'] = max(temperatures)
+    return extras
+
+
+class SystemSampler:
+    """Misst CPU, Speicher und die Prozesse der Server in festen Abständen"""
+
+    def __init__(self, processes, interval=1.0):
+        """
+        Args:
+            processes: {Name: PID} der zu beobachtenden Prozesse (inkl. Kindprozesse)
+            interval: Messabstand in Sekunden
+        """
+        self.processes = dict(processes, generator=os.getpid())
+        self.interval = interval
+        self.samples = []
+        self._ticks_per_second = os.sysconf('SC_CLK_TCK')
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.samples = []
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        started = time.monotonic()
+        last_total, last_idle = _cpu_times()
+        last_ticks = {name: _process_usage(pid)[0] for name, pid in self.processes.items()}
+        while not self._stop.wait(self.interval):
+            total, idle = _cpu_times()
+            sample = {'t': round(time.monotonic() - started, 1)}
+            if total > last_total:
+                sample['cpu_percent'] = 100 * (1 - (idle - last_idle) / (total - last_total))
+            memory = {}
+            for line in Path("/proc/meminfo").read_text().splitlines():
+                key, value = line.split(':', 1)
+                memory[key] = int(value.split()[0]) / 1024
+            sample['mem_used_mb'] = memory['MemTotal'] - memory.get('MemAvailable', memory['MemFree'])
+            sample.update(_jetson_extras())
+            for name, pid in self.processes.items():
+                ticks, rss_mb = _process_usage(pid)
+                # Prozent eines Kerns (200 = zwei Kerne voll)
+                cpu = (ticks - last_ticks[name]) / self._ticks_per_second / self.interval * 100
+                sample[name] = {'cpu_percent': max(0.0, cpu), 'rss_mb': rss_mb}
+                last_ticks[name] = ticks
+            self.samples.append(sample)
+            last_total, last_idle = total, idle
+
+    def stop(self):
+        """Messung beenden; liefert Zusammenfassung und Zeitreihe"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        samples = self.samples
+        summary = {}
+        for key in ('cpu_percent', 'mem_used_mb', 'gpu_percent', 'temp_max_c'):
+            values = [sample[key] for sample in samples if key in sample]
+            if values:
+                summary[key] = {'mean': sum(values) / len(values), 'max': max(values)}
+        for name in self.processes:
+            values = [sample[name] for sample in samples if name in sample]
+            if values:
+                summary[name] = {
+                    'cpu_percent_mean': sum(v['cpu_percent'] for v in values) / len(values),
+                    'cpu_percent_max': max(v['cpu_percent'] for v in values),
+                    'rss_mb_max': max(v['rss_mb'] for v in values),
+                }
+        return summary, samples
+
+
+# ---------------------------------------------------------------------------
+# Simulierte Nutzer
+# ---------------------------------------------------------------------------
+
+def phone(share_url, recorder, stop, interval):
+    """Handy mit geöffneter Share-Seite (Polling wie ohne EventSource)"""
+    connection = Connection(share_url)
+    etags = {}
+
+    def get(path, name):
+        headers = {'Accept': 'text/html,image/webp,*/*'}
+        if path in etags:
+            headers['If-None-Match'] = etags[path]
+        result = recorder.call(name, connection, 'GET', path, ok_status=(200, 304, 404), headers=headers)
+        if result is not None and 'ETag' in result[1]:
+            etags[path] = result[1]['ETag']
+        return result
+
+    # Versetzt starten, damit nicht alle Handys im selben Takt pollen
+    if stop.wait(random.uniform(0, interval)):
+        return
+    get('/', 'share /')
+    get('/bild', 'share /bild')
+    while not stop.wait(interval * random.uniform(0.8, 1.2)):
+        result = get('/api/status', 'share /api/status')
+        if result is not None and result[0] == 200:
+            get('/bild', 'share /bild')  # neues Foto
+    connection.close()
+
+
+def viewer(app_url, stop, results):
+    """Kiosk-Viewer: MJPEG-Stream lesen, Bildrate und längste Lücke messen"""
+    parts = urlsplit(app_url)
+    frames = 0
+    max_gap = 0.0
+    error = None
+    started = time.perf_counter()
+    try:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+        conn.request('GET', '/api/video_feed')
+        response = conn.getresponse()
+        started = last_frame = time.perf_counter()
+        tail = b''
+        while not stop.is_set():
+            chunk = response.read1(65536)
+            if not chunk:
+                error = "Stream beendet"
+                break
+            data = tail + chunk
+            count = data.count(BOUNDARY)
+            if count:
+                now = time.perf_counter()
+                max_gap = max(max_gap, now - last_frame)
+                last_frame = now
+                frames += count
+            tail = data[-(len(BOUNDARY) - 1):]
+        conn.close()
+    except (OSError, http.client.HTTPException) as e:
+        error = str(e)
+    elapsed = time.perf_counter() - started
+    results.append({'fps': frames / elapsed if elapsed else 0.0, 'max_gap_ms': max_gap * 1000,
+                    'error': error})
+
+
+def kiosk_probe(app_url, recorder, stop, interval=1.0):
+    """Antwortzeit der Kiosk-Oberfläche (Status-Abfrage am Hauptserver)"""
+    connection = Connection(app_url)
+    while not stop.wait(interval):
+        recorder.call('app /api/status', connection, 'GET', '/api/status')
+    connection.close()
+
+
+def guest(app_url, recorder, sessions, lock):
+    """Eine Gäste-Session: Aufnahme → AI → Druck"""
+    connection = Connection(app_url, timeout=600)
+    started = time.perf_counter()
+    outcome = 'ok'
+    json_headers = {'Content-Type': 'application/json'}
+
+    result = recorder.call('app /api/capture', connection, 'POST', '/api/capture')
+    if result is None or result[0] != 200:
+        outcome = 'capture'
+    else:
+        photo_id = json.loads(result[2])['photo_id']
+        result = recorder.call('app /api/process-ai', connection, 'POST', f'/api/process-ai/{photo_id}')
+        if result is None or result[0] != 200:
+            outcome = 'ai'
+        else:
+            ai_photo_id = json.loads(result[2])['ai_photo_id']
+            result = recorder.call('app /api/print', connection, 'POST', f'/api/print/{ai_photo_id}',
+                                   headers=json_headers, body=b'{}')
+            if result is None or result[0] != 200:
+                outcome = 'print'
+    connection.close()
+    with lock:
+        sessions.append({'outcome': outcome, 'seconds': time.perf_counter() - started})
+
+
+def arrivals(app_url, recorder, stop, per_hour, sessions, lock, guests):
+    """Gäste kommen als Poisson-Prozess (exponentielle Abstände)"""
+    if per_hour <= 0:
+        return
+    rate = per_hour / 3600
+    while not stop.wait(random.expovariate(rate)):
+        thread = threading.Thread(target=guest, args=(app_url, recorder, sessions, lock), daemon=True)
+        thread.start()
+        guests.append(thread)
+
+
+# ---------------------------------------------------------------------------
+# Stufen
+# ---------------------------------------------------------------------------
+
+def run_level(scale, args, sampler):
+    phones = round(args.phones * scale)
+    viewers = round(args.viewers * scale)
+    per_hour = args.sessions_per_hour * scale
+
+    recorder = Recorder()
+    stop = threading.Event()
+    lock = threading.Lock()
+    sessions, guests, viewer_results = [], [], []
+
+    sampler.start()
+    threads = [threading.Thread(target=phone, args=(args.share, recorder, stop, args.poll_interval))
+               for _ in range(phones)]
+    threads += [threading.Thread(target=viewer, args=(args.app, stop, viewer_results))
+                for _ in range(viewers)]
+    threads.append(threading.Thread(target=kiosk_probe, args=(args.app, recorder, stop)))
+    threads.append(threading.Thread(target=arrivals,
+                                    args=(args.app, recorder, stop, per_hour, sessions, lock, guests)))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    # Begonnene Sessions zu Ende laufen lassen (AI-Warteschlange abarbeiten)
+    deadline = time.monotonic() + args.drain
+    for thread in guests:
+        thread.join(timeout=max(0.0, deadline - time.monotonic()))
+    system, system_samples = sampler.stop()
+
+    endpoints = recorder.summary()
+    requests = sum(entry['count'] for entry in endpoints.values())
+    errors = sum(entry['errors'] for entry in endpoints.values())
+    completed = [session['seconds'] for session in sessions if session['outcome'] == 'ok']
+    failed = {}
+    for session in sessions:
+        if session['outcome'] != 'ok':
+            failed[session['outcome']] = failed.get(session['outcome'], 0) + 1
+    fps = [result['fps'] for result in viewer_results]
+
+    level = {
+        'scale': scale,
+        'phones': phones,
+        'viewers': viewers,
+        'sessions_per_hour': per_hour,
+        'requests': requests,
+        'error_rate': errors / requests if requests else 0.0,
+        'endpoints': endpoints,
+        'sessions': {
+            'started': len(guests),
+            'completed': len(completed),
+            'failed': failed,
+            'unfinished': sum(1 for thread in guests if thread.is_alive()),
+            'duration': summarize_ms(completed),
+        },
+        'viewer_fps': {
+            'min': min(fps, default=None),
+            'mean': sum(fps) / len(fps) if fps else None,
+            'max_gap_ms': max((result['max_gap_ms'] for result in viewer_results), default=None),
+            'errors': sum(1 for result in viewer_results if result['error']),
+        },
+        'system': system,
+        'timeline': {'requests': recorder.timeline(args.bucket), 'system': system_samples},
+    }
+    level['violations'] = check_limits(level, args)
+    return level
+
+
+def check_limits(level, args):
+    """Gerissene Grenzen einer Stufe (leer = Stufe gehalten)"""
+    violations = []
+    if level['error_rate'] > args.max_error_rate:
+        violations.append(f"Fehlerquote {level['error_rate']:.1%}")
+    for name, entry in level['endpoints'].items():
+        # AI und Druck dauern naturgemäß lange - dort zählt nur die Fehlerquote
+        if name in ('app /api/process-ai', 'app /api/print'):
+            continue
+        limit = args.max_capture_ms if name == 'app /api/capture' else args.max_p95_ms
+        if entry['p95_ms'] > limit:
+            violations.append(f"{name} p95 {entry['p95_ms']:.0f} ms")
+    viewers = level['viewer_fps']
+    if viewers['min'] is not None and viewers['min'] < args.min_fps:
+        violations.append(f"Viewer {viewers['min']:.1f} fps")
+    if level['sessions']['unfinished']:
+        violations.append(f"{level['sessions']['unfinished']} Sessions nach {args.drain:.0f}s nicht fertig")
+    return violations
+
+
+def print_level(level):
+    mark = "✓" if not level['violations'] else "❌"
+    print(f"{mark} Stufe ×{level['scale']:g}: {level['phones']} Handys, {level['viewers']} Viewer, "
+          f"{level['sessions_per_hour']:.0f} Sessions/h - {level['requests']} Requests, "
+          f"Fehler {level['error_rate']:.1%}")
+    for name, entry in level['endpoints'].items():
+        print(f"    {name:<22}{entry['count']:>7}  p50 {entry['p50_ms']:>7.0f} ms  "
+              f"p95 {entry['p95_ms']:>7.0f} ms  p99 {entry['p99_ms']:>7.0f} ms  Fehler {entry['errors']}")
+    sessions = level['sessions']
+    duration = sessions['duration']
+    print(f"    Sessions: {sessions['completed']}/{sessions['started']} fertig"
+          + (f", p95 {duration['p95_ms'] / 1000:.0f}s" if duration else "")
+          + (f", fehlgeschlagen {sessions['failed']}" if sessions['failed'] else ""))
+    viewers = level['viewer_fps']
+    if viewers['min'] is not None:
+        print(f"    Viewer: min {viewers['min']:.1f} fps, längste Lücke {viewers['max_gap_ms']:.0f} ms")
+    system = level['system']
+    if 'cpu_percent' in system:
+        line = (f"    System: CPU Ø {system['cpu_percent']['mean']:.0f}% / max {system['cpu_percent']['max']:.0f}%, "
+                f"Speicher max {system['mem_used_mb']['max']:.0f} MB")
+        if 'gpu_percent' in system:
+            line += f", GPU max {system['gpu_percent']['max']:.0f}%"
+        if 'temp_max_c' in system:
+            line += f", {system['temp_max_c']['max']:.0f} °C"
+        print(line)
+    for violation in level['violations']:
+        print(f"    ⚠ {violation}")
+    sys.stdout.flush()
+
+
+# ---------------------------------------------------------------------------
+# Lokale Server
+# ---------------------------------------------------------------------------
+
+class LocalServers:
+    """Haupt- und Share-Server mit synthetischer Hardware in einem Arbeitsverzeichnis"""
+
+    def __init__(self, args):
+        for port in (args.app_port, args.share_port):
+            with socket.socket() as probe:
+                if probe.connect_ex(('127.0.0.1', port)) == 0:
+                    raise RuntimeError(f"Port {port} belegt - läuft noch ein alter Server?")
+        self.workdir = tempfile.TemporaryDirectory(prefix="photobox-event-")
+        self.log = open(Path(self.workdir.name) / "servers.log", "wb")
+        common = ['--workdir', self.workdir.name]
+        self.app = subprocess.Popen(
+            [sys.executable, str(BENCH_DIR / "load_server.py"), '--server', 'app',
+             '--port', str(args.app_port), '--sd-steps', str(args.sd_steps),
+             '--sd-step-seconds', str(args.sd_step_seconds), '--lp-seconds', str(args.lp_seconds),
+             *common],
+            stdout=self.log, stderr=subprocess.STDOUT
+        )
+        self.share = subprocess.Popen(
+            [sys.executable, str(BENCH_DIR / "load_server.py"), '--server', 'share',
+             '--port', str(args.share_port), *common],
+            stdout=self.log, stderr=subprocess.STDOUT
+        )
+        args.app = f"http://127.0.0.1:{args.app_port}"
+        args.share = f"http://127.0.0.1:{args.share_port}"
+
+    def processes(self):
+        return {'app': self.app.pid, 'share': self.share.pid}
+
+    def wait_ready(self, args, timeout=60):
+        deadline = time.monotonic() + timeout
+        for url, process in ((args.app, self.app), (args.share, self.share)):
+            connection = Connection(url, timeout=2)
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server beendet, siehe {self.log.name}")
+                try:
+                    connection.request('GET', '/api/status')
+                    break
+                except (OSError, http.client.HTTPException):
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"{url} nicht erreichbar, siehe {self.log.name}")
+                    time.sleep(0.5)
+            connection.close()
+
+    def stop(self):
+        for process in (self.app, self.share):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.log.close()
+        self.workdir.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Volle Veranstaltung simulieren und Bruchpunkt finden")
+    parser.add_argument('--app', help="Hauptserver, z.B. http://192.168.4.1:5000 (Standard: lokal starten)")
+    parser.add_argument('--share', help="Share-Server, z.B. http://192.168.4.1:8080 (Standard: lokal starten)")
+    parser.add_argument('--phones', type=float, default=25, help="Handys an der Share-Seite (Stufe ×1)")
+    parser.add_argument('--viewers', type=float, default=1, help="Kiosk-MJPEG-Viewer (Stufe ×1)")
+    parser.add_argument('--sessions-per-hour', type=float, default=60, help="Gäste-Sessions pro Stunde (Stufe ×1)")
+    parser.add_argument('--scale', type=float, nargs='+', default=[1, 2, 4, 8], help="Laststufen (Multiplikator)")
+    parser.add_argument('--duration', type=float, default=120, help="Dauer je Stufe (s)")
+    parser.add_argument('--drain', type=float, default=300, help="Wartezeit auf begonnene Sessions (s)")
+    parser.add_argument('--poll-interval', type=float, default=5, help="Polling-Intervall der Handys (s)")
+    parser.add_argument('--bucket', type=float, default=10, help="Zeitfenster der Zeitreihe (s)")
+    parser.add_argument('--sample-interval', type=float, default=1, help="Messabstand CPU/Speicher (s)")
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help="Grenze Fehlerquote")
+    parser.add_argument('--max-p95-ms', type=float, default=500, help="Grenze p95 für Status/Seiten/Bilder")
+    parser.add_argument('--max-capture-ms', type=float, default=2000, help="Grenze p95 für /api/capture")
+    parser.add_argument('--min-fps', type=float, default=15, help="Grenze Bildrate je Viewer")
+    parser.add_argument('--app-port', type=int, default=5098, help="Lokaler Hauptserver: Port")
+    parser.add_argument('--share-port', type=int, default=8098, help="Lokaler Share-Server: Port")
+    parser.add_argument('--sd-steps', type=int, default=20, help="Lokal: Fake-SD-Schritte")
+    parser.add_argument('--sd-step-seconds', type=float, default=2.5, help="Lokal: Sekunden je Schritt")
+    parser.add_argument('--lp-seconds', type=float, default=0.3, help="Lokal: Fake-lp-Übergabezeit")
+    parser.add_argument('--json', metavar="PFAD", help="Ergebnis (inkl. Zeitreihen) als JSON speichern")
+    args = parser.parse_args()
+
+    if bool(args.app) != bool(args.share):
+        parser.error("--app und --share nur zusammen angeben")
+
+    servers = None
+    processes = {}
+    if not args.app:
+        servers = LocalServers(args)
+        processes = servers.processes()
+
+    print("=" * 60)
+    print(f"🎉 Veranstaltungs-Last: {args.app} + {args.share}")
+    print(f"   Stufen ×{', ×'.join(f'{scale:g}' for scale in args.scale)}, je {args.duration:.0f}s")
+    print("=" * 60, flush=True)
+
+    levels = []
+    try:
+        if servers is not None:
+            servers.wait_ready(args)
+        sampler = SystemSampler(processes, interval=args.sample_interval)
+        for scale in args.scale:
+            level = run_level(scale, args, sampler)
+            levels.append(level)
+            print_level(level)
+            if level['violations']:
+                break
+    finally:
+        if servers is not None:
+            servers.stop()
+
+    held = [level for level in levels if not level['violations']]
+    broken = next((level for level in levels if level['violations']), None)
+    print("=" * 60)
+    if held:
+        last = held[-1]
+        print(f"✓ Gehalten bis ×{last['scale']:g}: {last['phones']} Handys, {last['viewers']} Viewer, "
+              f"{last['sessions_per_hour']:.0f} Sessions/h")
+    if broken:
+        print(f"❌ Bruchpunkt bei ×{broken['scale']:g}: {', '.join(broken['violations'])}")
+    else:
+        print("✓ Alle Stufen gehalten")
+
+    if args.json:
+        output = {'config': vars(args), 'levels': levels,
+                  'max_scale_held': held[-1]['scale'] if held else None}
+        Path(args.json).write_text(json.dumps(output, indent=2))
+        print(f"✓ Ergebnis gespeichert: {args.json}")
+
+    sys.exit(1 if broken else 0)
+
+
+if __name__ == "__main__":
+    main()
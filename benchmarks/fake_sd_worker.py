@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Fake-SD1.5-Worker für Benchmarks
+Verhält sich nach außen wie generate_from_photobox.py: liest
+input_images/photobox_input.jpg, schreibt output_images/photobox_output.jpg
+und gibt Theme und Seed aus. Statt der Diffusion wird pro Schritt geschlafen.
+
+Umgebung:
+    PHOTOBOX_FAKE_SD_STEPS          Anzahl Schritte (Standard: 20)
+    PHOTOBOX_FAKE_SD_STEP_SECONDS   Sekunden pro Schritt (Standard: 0.05)
+    PHOTOBOX_TRACE_ID               wird wie beim echten Worker nur mitgeloggt
+"""
+import os
+import random
+import time
+
+from PIL import Image, ImageOps
+
+THEMES = ("Pirate", "Astronaut", "Renaissance", "Cyberpunk", "Superhero")
+
+
+def main():
+    steps = int(os.environ.get("PHOTOBOX_FAKE_SD_STEPS", "20"))
+    step_time = float(os.environ.get("PHOTOBOX_FAKE_SD_STEP_SECONDS", "0.05"))
+    seed = random.randrange(2 ** 32)
+    theme = THEMES[seed % len(THEMES)]
+
+    print(f"Theme: {theme}")
+    print(f"Seed: {seed}")
+    if os.environ.get("PHOTOBOX_TRACE_ID"):
+        print(f"Trace: {os.environ['PHOTOBOX_TRACE_ID']}")
+
+    image = Image.open("input_images/photobox_input.jpg").convert("RGB")
+    for _ in range(steps):
+        time.sleep(step_time)
+
+    # SD1.5 liefert 512x512 - hier einfach das (zugeschnittene) Foto posterisiert
+    output = ImageOps.posterize(ImageOps.fit(image, (512, 512)), 3)
+    output.save("output_images/photobox_output.jpg", "JPEG", quality=95)
+    print(f"Fertig nach {steps} Schritten")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Hardware-Ersatz für Benchmarks ohne Jetson-Peripherie
+- SyntheticCamera: Frame-Quelle im Kamera-Takt, jedes Frame trägt seine Nummer
+- TexturedCamera: synthetische Kamera mit realistischer JPEG-Größe
+- Fake-SD1.5-Worker (fake_sd_worker.py): schläft pro Diffusionsschritt
+- Fake-CUPS (fake_bin/lp, fake_bin/lpstat): nimmt Aufträge an, ohne zu drucken
+
+Die Fakes ersetzen nur die Hardware - Branding, Katalog, Session-Store,
+Worker-Pool und HTTP-Endpunkte laufen unverändert.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+FAKE_BIN = BENCHMARK_DIR / "fake_bin"
+FAKE_SD_WORKER = BENCHMARK_DIR / "fake_sd_worker.py"
+
+
+def color_for(number):
+    """Farbwert eines Quell-Frames (benachbarte Frames unterscheiden sich deutlich)"""
+    return (number * 37) % 256
+
+
+class SyntheticCamera:
+    """Frame-Quelle mit der Schnittstelle von cv2.VideoCapture (grab/retrieve/read)"""
+
+    def __init__(self, width=640, height=360, fps=30):
+        self.width = width
+        self.height = height
+        self.interval = 1.0 / fps
+        self.number = 0           # Nummer des zuletzt belichteten Frames
+        self._next_at = time.perf_counter()
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        return True
+
+    def grab(self):
+        # Kamera-Takt: grab() blockiert bis zum nächsten Frame
+        delay = self._next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_at = max(self._next_at + self.interval, time.perf_counter())
+        self.number += 1
+        return True
+
+    def retrieve(self):
+        frame = np.full((self.height, self.width, 3), color_for(self.number), dtype=np.uint8)
+        frame[0, :8, 0] = np.frombuffer(np.int64(self.number).tobytes(), dtype=np.uint8)
+        return True, frame
+
+    def read(self):
+        self.grab()
+        return self.retrieve()
+
+    def release(self):
+        self._opened = False
+
+
+class TexturedCamera(SyntheticCamera):
+    """Synthetische Kamera mit festem Rauschen - JPEGs etwa so groß wie bei der Webcam"""
+
+    def __init__(self, width, height, fps):
+        super().__init__(width, height, fps)
+        rng = np.random.default_rng(0)
+        self.noise = rng.integers(0, 16, (height, width, 3), dtype=np.uint8)
+
+    def retrieve(self):
+        frame = self.noise + np.uint8(self.number % 192)
+        return True, frame
+
+
+def install_fake_cups(spool_time=0.3):
+    """
+    fake_bin/ vor PATH setzen - lp/lpstat von CupsBackend landen dann beim Fake
+
+    Args:
+        spool_time: Simulierte Übergabezeit von lp in Sekunden
+    """
+    os.environ["PATH"] = f"{FAKE_BIN}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ["PHOTOBOX_FAKE_LP_SECONDS"] = str(spool_time)
+
+
+def use_fake_sd(processor, workdir, steps=20, step_time=0.05):
+    """
+    AIProcessor auf den Fake-Worker umstellen (statt /media/user/SSD/sdxl-project)
+
+    Args:
+        processor: AIProcessor-Instanz
+        workdir: Verzeichnis für input_images/ und output_images/
+        steps: Simulierte Diffusionsschritte
+        step_time: Sekunden pro Schritt
+    """
+    project_dir = Path(workdir) / "sd-project"
+    processor.sd_project_dir = project_dir
+    processor.sd_venv_python = Path(sys.executable)
+    processor.sd_script = FAKE_SD_WORKER
+    processor.sd_input_dir = project_dir / "input_images"
+    processor.sd_output_dir = project_dir / "output_images"
+    processor.sd_input_dir.mkdir(parents=True, exist_ok=True)
+    processor.sd_output_dir.mkdir(parents=True, exist_ok=True)
+    os.environ["PHOTOBOX_FAKE_SD_STEPS"] = str(steps)
+    os.environ["PHOTOBOX_FAKE_SD_STEP_SECONDS"] = str(step_time)
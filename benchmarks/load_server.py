@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+PhotoBox-Server mit synthetischer Hardware (für async_load.py und event_load.py)
+Startet app.py im Modus aus PHOTOBOX_ASYNC_MODE, statt der Webcam liefert
+eine synthetische Quelle Frames mit Bildrauschen (realistische JPEG-Größe).
+AI und Druck laufen über den Fake-SD-Worker und Fake-lp (siehe fakes.py).
+Mit --server share startet stattdessen der Share-Server (image_server.py).
+Alle Dateien (Fotos, Datenbank) landen im Arbeitsverzeichnis --workdir.
+
+Aufruf (normalerweise durch async_load.py bzw. event_load.py):
+    PHOTOBOX_ASYNC_MODE=gevent python3 benchmarks/load_server.py --port 5099 --workdir /tmp/photobox-load
+    python3 benchmarks/load_server.py --server share --port 8099 --workdir /tmp/photobox-load
+"""
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+# Wie in app.py: Patchen vor allen anderen Imports
+import async_support
+async_support.monkey_patch()
+
+import argparse
+import os
+
+
+def run_app(args):
+    import app
+    from camera import Camera
+    from fakes import TexturedCamera, install_fake_cups, use_fake_sd
+
+    install_fake_cups(args.lp_seconds)
+    app.camera = Camera(width=args.width, height=args.height,
+                        source=TexturedCamera(args.width, args.height, args.fps))
+    use_fake_sd(app.get_ai_processor(), Path.cwd(), args.sd_steps, args.sd_step_seconds)
+    app.get_status_service()
+
+    print(f"⚙️  Last-Server: Modus {async_support.active_mode()}, Port {args.port}", flush=True)
+    options = async_support.server_options()
+    options.update(debug=False, use_reloader=False, log_output=False)
+    app.socketio.run(app.app, host='127.0.0.1', port=args.port, **options)
+
+
+def run_share(args):
+    import image_server
+
+    print(f"⚙️  Share-Server: Port {args.port}", flush=True)
+    image_server.get_store()
+    image_server.serve(host='127.0.0.1', port=args.port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PhotoBox-Server mit synthetischer Hardware")
+    parser.add_argument('--server', choices=['app', 'share'], default='app')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--workdir', required=True, help="Arbeitsverzeichnis für Fotos und Datenbank")
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--sd-steps', type=int, default=20, help="Fake-SD-Worker: Schritte")
+    parser.add_argument('--sd-step-seconds', type=float, default=2.5,
+                        help="Fake-SD-Worker: Sekunden je Schritt (20 × 2.5s ≈ echte SD1.5-Laufzeit)")
+    parser.add_argument('--lp-seconds', type=float, default=0.3, help="Fake-lp: Übergabezeit")
+    args = parser.parse_args()
+
+    # app.py und image_server.py arbeiten mit relativen Pfaden (static/photos, data/...)
+    workdir = Path(args.workdir)
+    (workdir / "static" / "photos").mkdir(parents=True, exist_ok=True)
+    branding = workdir / "static" / "branding"
+    if not branding.exists():
+        branding.symlink_to(PROJECT_DIR / "static" / "branding")
+    os.chdir(workdir)
+
+    if args.server == 'share':
+        run_share(args)
+    else:
+        run_app(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Foto-Listen-Benchmark für PhotoBox
+Füllt Katalog und Session-Store mit synthetischen Einträgen (ohne Dateien)
+und misst die Antwortzeit von /api/photos für die erste Seite, eine tiefe
+Cursor-Seite, den Typ-Filter und zum Vergleich die komplette Liste. Die Seiten sollten
+bei 100 wie bei 10.000 Fotos gleich schnell sein.
+
+Aufruf (aus dem Projektverzeichnis):
+    python3 benchmarks/photo_listing.py --photos 100 1000 10000 --requests 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from photo_catalog import PhotoCatalog
+from session_store import SessionStore
+from stats import summarize_ms
+
+
+def make_catalog(count, photo_dir):
+    """Katalog mit `count` synthetischen Fotos, jedes dritte mit AI-Version"""
+    catalog = PhotoCatalog(photo_dir)
+    timestamp = time.time() - count * 30
+    added = 0
+    while added < count:
+        photo_id = str(uuid.uuid4())
+        catalog.add(photo_dir / f"{photo_id}.jpg", timestamp=timestamp, size=450_000)
+        added += 1
+        if added % 3 == 0 and added < count:
+            catalog.add(photo_dir / f"{photo_id}_ai.jpg", timestamp=timestamp + 20, size=80_000)
+            added += 1
+        timestamp += 30
+    return catalog
+
+
+def measure(client, url, requests):
+    """Antwortzeiten eines Endpunkts in Sekunden"""
+    times = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        response = client.get(url)
+        times.append(time.perf_counter() - t0)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} → {response.status_code}")
+    return times
+
+
+def run(counts, requests, limit):
+    """Führt den Benchmark aus und liefert die Messwerte als dict"""
+    import app as photobox
+
+    client = photobox.app.test_client()
+    results = []
+
+    for count in counts:
+        photo_dir = Path(tempfile.mkdtemp(prefix="photobox_listing_bench_"))
+        photobox.catalog = make_catalog(count, photo_dir)
+        photobox.store = SessionStore(photo_dir / "photobox.db")
+        photobox.store.sync(photobox.catalog.list())
+
+        # Cursor aus der Mitte des Archivs für eine "tiefe" Seite
+        middle = photobox.catalog.list()[count // 2]
+
+        result = {'photos': count}
+        result['first_page'] = summarize_ms(measure(client, f"/api/photos?limit={limit}", requests))
+        result['deep_page'] = summarize_ms(
+            measure(client, f"/api/photos?limit={limit}&before={middle.cursor}", requests))
+        result['ai_only'] = summarize_ms(measure(client, f"/api/photos?limit={limit}&type=ai", requests))
+        result['full_list'] = summarize_ms(
+            measure(client, f"/api/photos?limit={photobox.PHOTO_PAGE_MAX}", max(1, requests // 10)))
+        results.append(result)
+
+    return {'limit': limit, 'requests': requests, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/photos mit synthetischem Archiv messen")
+    parser.add_argument('--photos', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="Archivgrößen")
+    parser.add_argument('--requests', type=int, default=200, help="Requests pro Messung")
+    parser.add_argument('--limit', type=int, default=20, help="Seitengröße")
+    parser.add_argument('--json', metavar="PFAD", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    # app.py legt static/photos relativ zum Arbeitsverzeichnis an
+    os.chdir(PROJECT_DIR)
+
+    results = run(args.photos, args.requests, args.limit)
+
+    print("=" * 72)
+    print(f"🗂️  /api/photos Benchmark: limit={results['limit']}, {results['requests']} Requests")
+    print("=" * 72)
+    print(f"{'Fotos':>8}  {'erste Seite':>14}  {'tiefe Seite':>14}  {'nur AI':>14}  {'500 Fotos':>14}")
+    for result in results['results']:
+        cells = [f"{result[key]['p50_ms']:.2f}/{result[key]['p95_ms']:.2f}"
+                 for key in ('first_page', 'deep_page', 'ai_only', 'full_list')]
+        print(f"{result['photos']:>8}  " + "  ".join(f"{cell:>14}" for cell in cells))
+    print("(p50/p95 in ms)")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"✓ Ergebnis gespeichert: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Druck-Durchsatz-Benchmark für PhotoBox
+Schickt N Druckaufträge durch Branding und Übergabe an einen simulierten
+CUPS-Drucker und misst Branding-Zeit, Übergabe-Latenz, Wartezeit in der
+Drucker-Warteschlange und Bögen pro Stunde.
+
+Aufruf (aus dem Projektverzeichnis):
+    python3 benchmarks/print_throughput.py --jobs 20 --print-time 60 --layout single
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from image_branding import LAYOUTS
+from print_cache import PrintCache
+from printer import Printer
+from printer_backend import SimulatedBackend
+from stats import percentile
+
+# Wie viele Gäste ein Bogen pro Layout bedient
+GUESTS_PER_SHEET = {'single': 1, 'strip': 2, '2up': 2, 'side_by_side': 1}
+
+
+def make_synthetic_photo(path, seed, size=(1980, 1080)):
+    """Erzeugt ein Testfoto mit Rauschen (jedes Foto hat einen anderen Hash)"""
+    noise = [Image.effect_noise(size, 40 + (seed + i) % 30) for i in range(3)]
+    photo = Image.merge("RGB", noise)
+    photo.save(path, "JPEG", quality=95)
+
+
+def summarize(values):
+    return {
+        'mean': statistics.mean(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'max': max(values),
+    }
+
+
+def run(jobs, layout, spool_time, print_time, prerender):
+    """Führt den Benchmark aus und liefert die Messwerte als dict"""
+    workdir = Path(tempfile.mkdtemp(prefix="photobox_print_bench_"))
+    photo_dir = workdir / "photos"
+    photo_dir.mkdir()
+
+    backend = SimulatedBackend(spool_time=spool_time, print_time=print_time)
+    printer = Printer(backend=backend)
+    if not printer.enable_branding:
+        raise RuntimeError("Branding konnte nicht initialisiert werden (cairosvg installiert?)")
+    printer.print_cache = PrintCache(printer.branding, cache_dir=workdir / "print_cache")
+
+    photos_per_job = 2 if layout == 'side_by_side' else 1
+    photos = []
+    for i in range(jobs * photos_per_job):
+        path = photo_dir / f"bench_{i:04d}.jpg"
+        make_synthetic_photo(path, seed=i)
+        photos.append(str(path))
+
+    branding_times = []
+    submit_times = []
+    job_ids = []
+
+    started = time.time()
+    for job in range(jobs):
+        paths = photos[job * photos_per_job:(job + 1) * photos_per_job]
+
+        if prerender and layout == 'single':
+            # Vorrendern direkt nach der "Aufnahme", Druck kommt später
+            printer.prerender(paths[0])
+            printer.print_cache.get(paths[0])
+
+        t0 = time.perf_counter()
+        if layout == 'single':
+            printer.print_cache.get(paths[0])
+        else:
+            printer.print_cache.get_layout(paths, layout)
+        t1 = time.perf_counter()
+
+        if layout == 'single':
+            result = printer.print_image(paths[0])
+        else:
+            result = printer.print_layout(paths, layout)
+        t2 = time.perf_counter()
+
+        if not result['success']:
+            raise RuntimeError(f"Druckauftrag fehlgeschlagen: {result['message']}")
+
+        branding_times.append(t1 - t0)
+        submit_times.append(t2 - t1)
+        job_ids.append(result['job_id'])
+    wall_time = time.time() - started
+
+    infos = [backend.job_info(job_id) for job_id in job_ids]
+    queue_waits = [info['queue_wait'] for info in infos]
+    makespan = infos[-1]['finished_at'] - infos[0]['queued_at']
+    sheets_per_hour = jobs / makespan * 3600
+
+    return {
+        'jobs': jobs,
+        'layout': layout,
+        'prerender': prerender,
+        'spool_time_s': spool_time,
+        'print_time_s': print_time,
+        'branding_s': summarize(branding_times),
+        'submit_latency_s': summarize(submit_times),
+        'queue_wait_s': summarize(queue_waits),
+        'submit_wall_time_s': wall_time,
+        'sheets_per_hour': sheets_per_hour,
+        'guests_per_hour': sheets_per_hour * GUESTS_PER_SHEET[layout],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Druck-Durchsatz mit simuliertem CUPS-Backend messen")
+    parser.add_argument('--jobs', type=int, default=10, help="Anzahl Druckaufträge")
+    parser.add_argument('--layout', choices=sorted(LAYOUTS), default='single')
+    parser.add_argument('--spool-time', type=float, default=0.5, help="Simulierte lp/Spool-Zeit (s)")
+    parser.add_argument('--print-time', type=float, default=60.0, help="Simulierte Druckzeit pro Bogen (s)")
+    parser.add_argument('--prerender', action='store_true', help="Druckversion vor dem Drucken vorrendern")
+    parser.add_argument('--json', metavar="PFAD", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    # Branding-Pfade sind relativ zum Projektverzeichnis
+    os.chdir(PROJECT_DIR)
+
+    results = run(args.jobs, args.layout, args.spool_time, args.print_time, args.prerender)
+
+    print("=" * 60)
+    print(f"🖨️  Druck-Benchmark: {results['jobs']} Aufträge, Layout '{results['layout']}'")
+    print("=" * 60)
+    for key in ('branding_s', 'submit_latency_s', 'queue_wait_s'):
+        stats = results[key]
+        print(f"{key:<18} mean={stats['mean']:.3f}  p50={stats['p50']:.3f}  "
+              f"p95={stats['p95']:.3f}  max={stats['max']:.3f}")
+    print(f"{'Bögen/Stunde':<18} {results['sheets_per_hour']:.1f}")
+    print(f"{'Gäste/Stunde':<18} {results['guests_per_hour']:.1f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"✓ Ergebnis gespeichert: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Kennzahlen für die Benchmarks (Perzentile ohne numpy)
+Gemeinsam genutzt von den Benchmark-Skripten und tracing.py summary.
+"""
+import statistics
+
+
+def percentile(values, pct):
+    """
+    Einfaches Perzentil (nächster Rang)
+
+    Args:
+        values: Messwerte (nicht leer)
+        pct: Perzentil 0..100
+
+    Returns:
+        Messwert am Rang des Perzentils
+    """
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize_ms(values):
+    """
+    Dauern in Sekunden zusammenfassen
+
+    Returns:
+        dict: {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'} oder None ohne Werte
+    """
+    if not values:
+        return None
+    return {
+        'count': len(values),
+        'mean_ms': statistics.mean(values) * 1000,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'max_ms': max(values) * 1000,
+    }
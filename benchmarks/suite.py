@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+Offline-Benchmark-Suite für die ganze PhotoBox-Pipeline
+Läuft ohne Kamera, Drucker und SD1.5 (siehe benchmarks/fakes.py) und misst:
+
+- capture:  /api/capture mit synthetischer Kamera (inkl. Grab/Encode aus dem Trace)
+- preview:  MJPEG-Bildrate pro Viewer bei 1..N Viewern
+- branding: Rendern der Druckversion je Layout
+- listing:  /api/photos bei wachsendem Archiv
+- share:    Handys pollen den Share-Server (/api/status, /bild, /)
+- session:  Aufnahme → AI (Fake-Worker) → Druck (Fake-lp), Sessions pro Stunde
+
+Jeder Teil läuft in einem eigenen Prozess mit eigenem Arbeitsverzeichnis, die
+Ausgaben der App landen in <Arbeitsverzeichnis>/<teil>.log. Das Ergebnis wird
+als JSON gespeichert (Standard: benchmarks/results/<Zeit>_<Commit>.json) und
+kann mit einem früheren Lauf verglichen werden.
+
+Aufruf (aus dem Projektverzeichnis):
+    python3 benchmarks/suite.py
+    python3 benchmarks/suite.py --only capture session --compare benchmarks/results/vorher.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = BENCHMARK_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+sys.path.insert(0, str(BENCHMARK_DIR))
+
+from stats import summarize_ms
+
+RESULTS_DIR = BENCHMARK_DIR / "results"
+SECTIONS = ('capture', 'preview', 'branding', 'listing', 'share', 'session')
+
+# Kennzahlen, die --compare gegenüberstellt (Schlüssel enden auf einen dieser Namen)
+COMPARE_KEYS = ('p50_ms', 'p95_ms', 'fps_min', 'fps_mean', 'requests_per_s',
+                'sessions_per_hour', 'p50', 'p95')
+
+
+# ---------------------------------------------------------------------------
+# Hilfen für die Teil-Prozesse
+# ---------------------------------------------------------------------------
+
+def prepare_workdir(workdir):
+    """Arbeitsverzeichnis wie das Projektverzeichnis aufbauen (relative Pfade der App)"""
+    workdir = Path(workdir)
+    (workdir / "static" / "photos").mkdir(parents=True, exist_ok=True)
+    branding = workdir / "static" / "branding"
+    if not branding.exists():
+        branding.symlink_to(PROJECT_DIR / "static" / "branding")
+    os.chdir(workdir)
+
+
+def start_app(options):
+    """app.py im aktuellen Verzeichnis mit synthetischer Kamera laden"""
+    import app
+    from camera import Camera
+    from fakes import TexturedCamera
+
+    app.camera = Camera(width=options.width, height=options.height,
+                        source=TexturedCamera(options.width, options.height, options.fps))
+    return app
+
+
+def stop_app(app):
+    """Kamera-Thread und Worker-Prozesse der App beenden"""
+    app.get_camera().release()
+    if app.image_pool is not None:
+        app.image_pool.shutdown()
+
+
+def spans_by_stage(stages):
+    """Spans des Trace-Logs im Arbeitsverzeichnis, nach Schritt gruppiert"""
+    import tracing
+
+    grouped = {}
+    for span in tracing.read_spans(tracing.TRACE_LOG):
+        if span['stage'] in stages:
+            grouped.setdefault(span['stage'], []).append(span)
+    return grouped
+
+
+# ---------------------------------------------------------------------------
+# Teile
+# ---------------------------------------------------------------------------
+
+def bench_capture(options):
+    """Aufnahmen nacheinander über /api/capture"""
+    app = start_app(options)
+    client = app.app.test_client()
+    client.post('/api/capture')  # Aufwärmen: Worker-Prozesse starten
+
+    times = []
+    errors = 0
+    for _ in range(options.captures):
+        t0 = time.perf_counter()
+        response = client.post('/api/capture')
+        times.append(time.perf_counter() - t0)
+        if response.status_code != 200:
+            errors += 1
+        # Vorrendern und Derivate des vorigen Fotos laufen im Hintergrund weiter
+        time.sleep(options.capture_interval)
+    stop_app(app)
+
+    spans = spans_by_stage(('capture',)).get('capture', [])[1:]
+    return {
+        'captures': options.captures,
+        'resolution': f"{options.width}x{options.height}",
+        'errors': errors,
+        'request': summarize_ms(times),
+        'grab': summarize_ms([span['grab_ms'] / 1000 for span in spans if 'grab_ms' in span]),
+        'encode': summarize_ms([span['encode_ms'] / 1000 for span in spans if 'encode_ms' in span]),
+    }
+
+
+def bench_preview(options):
+    """MJPEG-Bildrate pro Viewer (ein Encode pro Frame für alle Viewer)"""
+    from camera import Camera
+    from fakes import TexturedCamera
+
+    results = []
+    for viewers in options.viewers:
+        source = TexturedCamera(options.width, options.height, options.fps)
+        camera = Camera(width=options.width, height=options.height, source=source)
+        stop = threading.Event()
+        lock = threading.Lock()
+        rates = []
+
+        def viewer():
+            frames = 0
+            started = time.perf_counter()
+            for _ in camera.stream(timeout=2.0):
+                frames += 1
+                if stop.is_set():
+                    break
+            with lock:
+                rates.append(frames / (time.perf_counter() - started))
+
+        threads = [threading.Thread(target=viewer) for _ in range(viewers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(options.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
+        camera.release()
+
+        results.append({
+            'viewers': viewers,
+            'source_fps': options.fps,
+            'fps_min': min(rates, default=0.0),
+            'fps_mean': sum(rates) / len(rates) if rates else 0.0,
+        })
+    return {'resolution': f"{options.width}x{options.height}", 'seconds': options.seconds,
+            'results': results}
+
+
+def bench_branding(options):
+    """Druckversion rendern (Cache-Miss) je Layout, Übergabe an einen simulierten Drucker"""
+    import print_throughput
+
+    # ImageBranding lädt Logo und QR-Code relativ zum Projektverzeichnis
+    os.chdir(PROJECT_DIR)
+    results = {}
+    for layout in options.layouts:
+        run = print_throughput.run(options.print_jobs, layout, spool_time=0.01, print_time=0.01,
+                                   prerender=False)
+        results[layout] = {f"{name}_ms": value * 1000 for name, value in run['branding_s'].items()}
+    return {'jobs': options.print_jobs, 'layouts': results}
+
+
+def bench_listing(options):
+    """/api/photos bei wachsendem Archiv (siehe photo_listing.py)"""
+    import photo_listing
+
+    return photo_listing.run(options.photos, options.listing_requests, 20)
+
+
+def bench_share(options):
+    """Viele Handys pollen den Share-Server, währenddessen kommen neue Fotos dazu"""
+    import cv2
+
+    from derivatives import DerivativeGenerator
+    from fakes import TexturedCamera
+    from image_pool import ImageWorkerPool
+    from photo_catalog import PhotoCatalog
+    from session_store import SessionStore
+
+    # Absolute Pfade: Flask löst relative Pfade gegen das Projektverzeichnis auf
+    photo_dir = Path("static/photos").resolve()
+    catalog = PhotoCatalog(photo_dir)
+    store = SessionStore(Path("data/photobox.db"))
+    pool = ImageWorkerPool(max_workers=2)
+    generator = DerivativeGenerator(photo_dir, pool=pool)
+    source = TexturedCamera(options.width, options.height, options.fps)
+
+    def add_photo(index):
+        """Foto wie app.py ablegen: Datei, Katalog, Session-Store, Derivate"""
+        source.grab()
+        _, frame = source.retrieve()
+        path = photo_dir / f"share-bench-{index:04d}.jpg"
+        cv2.imwrite(str(path), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        store.add_photo(catalog.add(path))
+        outputs = []
+        for output in generator.submit(path).result():
+            _, size, fmt = DerivativeGenerator.describe(output)
+            outputs.append((size, fmt, output, os.path.getsize(output)))
+        store.add_derivatives(path.stem, outputs)
+
+    add_photo(0)
+
+    import image_server
+    image_server.derivatives = DerivativeGenerator(photo_dir)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    times = {'/api/status': [], '/bild': [], '/': []}
+    statuses = {}
+
+    def phone(index):
+        client = image_server.app.test_client()
+        etags = {}
+        polls = 0
+        while not stop.is_set():
+            # Seite einmal laden, danach /api/status pollen, /bild nur bei Änderung
+            urls = ['/api/status']
+            if polls == 0:
+                urls = ['/', '/bild', '/api/status']
+            for url in urls:
+                headers = {'Accept': 'image/webp,*/*'}
+                if url in etags:
+                    headers['If-None-Match'] = etags[url]
+                t0 = time.perf_counter()
+                response = client.get(url, headers=headers)
+                elapsed = time.perf_counter() - t0
+                response.close()
+                if response.headers.get('ETag'):
+                    etags[url] = response.headers['ETag']
+                with lock:
+                    times[url].append(elapsed)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if url == '/api/status' and response.status_code == 200 and polls > 0:
+                    urls.append('/bild')  # neues Foto → Bild nachladen
+            polls += 1
+            stop.wait(options.poll_interval)
+
+    threads = [threading.Thread(target=phone, args=(i,)) for i in range(options.phones)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    index = 1
+    while time.perf_counter() - started < options.seconds:
+        time.sleep(options.photo_interval)
+        add_photo(index)
+        index += 1
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=10)
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    store.stop_watching()
+
+    total = sum(len(values) for values in times.values())
+    return {
+        'phones': options.phones,
+        'poll_interval_s': options.poll_interval,
+        'new_photos': index - 1,
+        'requests': total,
+        'requests_per_s': total / elapsed,
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        'errors': sum(count for code, count in statuses.items() if code >= 400),
+        'endpoints': {url: summarize_ms(values) for url, values in times.items()},
+    }
+
+
+def bench_session(options):
+    """Gäste-Sessions Aufnahme → AI → Druck mit Fake-Worker und Fake-lp"""
+    from fakes import install_fake_cups, use_fake_sd
+
+    install_fake_cups(options.lp_seconds)
+    app = start_app(options)
+    use_fake_sd(app.get_ai_processor(), Path.cwd(), options.sd_steps, options.sd_step_seconds)
+    app.get_printer()
+    app.app.test_client().post('/api/capture')  # Aufwärmen
+
+    lock = threading.Lock()
+    remaining = [options.sessions]
+    stages = {'capture': [], 'ai': [], 'print': [], 'session': []}
+    failures = {}
+
+    def guest():
+        client = app.app.test_client()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            steps = (('capture', lambda: client.post('/api/capture')),
+                     ('ai', lambda: client.post(f"/api/process-ai/{photo_id}")),
+                     ('print', lambda: client.post(f"/api/print/{photo_id}_ai", json={})))
+            photo_id = None
+            for stage, request in steps:
+                t0 = time.perf_counter()
+                response = request()
+                elapsed = time.perf_counter() - t0
+                if response.status_code != 200:
+                    with lock:
+                        failures[stage] = failures.get(stage, 0) + 1
+                    break
+                with lock:
+                    stages[stage].append(elapsed)
+                if stage == 'capture':
+                    photo_id = response.get_json()['photo_id']
+            else:
+                with lock:
+                    stages['session'].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=guest) for _ in range(options.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop_app(app)
+
+    # Aufschlüsselung aus dem Trace-Log (Warteschlange vor dem Worker, lp-Übergabe, ...)
+    spans = spans_by_stage(('ai_queue', 'ai_run', 'print_render', 'print_submit'))
+    completed = len(stages['session'])
+    return {
+        'sessions': options.sessions,
+        'concurrency': options.concurrency,
+        'fake_sd_s': options.sd_steps * options.sd_step_seconds,
+        'fake_lp_s': options.lp_seconds,
+        'completed': completed,
+        'failures': failures,
+        'sessions_per_hour': completed / elapsed * 3600,
+        'stages': {stage: summarize_ms(values) for stage, values in stages.items()},
+        'breakdown': {stage: summarize_ms([span['duration_ms'] / 1000 for span in values])
+                      for stage, values in spans.items()},
+    }
+
+
+BENCHMARKS = {
+    'capture': bench_capture,
+    'preview': bench_preview,
+    'branding': bench_branding,
+    'listing': bench_listing,
+    'share': bench_share,
+    'session': bench_session,
+}
+
+
+def _section_main(name, options, workdir, conn):
+    """Einstieg des Teil-Prozesses: Ausgaben ins Log, Ergebnis über die Pipe"""
+    log = open(Path(workdir) / f"{name}.log", "w")
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+    try:
+        prepare_workdir(Path(workdir) / name)
+        conn.send(('ok', BENCHMARKS[name](argparse.Namespace(**options))))
+    except BaseException:
+        traceback.print_exc()
+        conn.send(('error', traceback.format_exc(limit=-3)))
+    finally:
+        conn.close()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Hintergrund-Threads der App (Status, Katalog, ...) nicht abwarten
+        os._exit(0)
+
+
+def run_section(name, options, workdir, timeout):
+    """Einen Teil in einem frischen Prozess ausführen (eigene Module, eigene Metriken)"""
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_section_main, args=(name, vars(options), workdir, sender))
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            raise TimeoutError(f"{name}: kein Ergebnis nach {timeout:.0f}s")
+        status, result = receiver.recv()
+    except EOFError:
+        status, result = 'error', f"{name}: Prozess ohne Ergebnis beendet"
+    finally:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.kill()
+    if status != 'ok':
+        raise RuntimeError(result)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Ergebnis, Vergleich
+# ---------------------------------------------------------------------------
+
+def run_info():
+    """Commit, Rechner und Zeitpunkt des Laufs"""
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=PROJECT_DIR, capture_output=True,
+                                  text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            return ""
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git('rev-parse', '--short', 'HEAD') or None,
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def flatten(data, prefix=""):
+    """Verschachteltes Ergebnis → {'a.b.c': Zahl} (Listen über ihren ersten Schlüssel)"""
+    values = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            values.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            label = index
+            if isinstance(value, dict) and value:
+                first = next(iter(value))
+                label = f"{first}={value[first]}"
+            values.update(flatten(value, f"{prefix}{label}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        values[prefix.rstrip('.')] = data
+    return values
+
+
+def compare(base, current):
+    """Kennzahlen zweier Läufe gegenüberstellen"""
+    before = flatten(base['results'])
+    after = flatten(current['results'])
+    print("=" * 78)
+    print(f"📊 Vergleich mit {base['run'].get('commit')} ({base['run'].get('timestamp')})")
+    print("=" * 78)
+    for key, value in after.items():
+        if key not in before or not key.endswith(COMPARE_KEYS):
+            continue
+        old = before[key]
+        change = f"{(value - old) / old * 100:+7.1f}%" if old else "      -"
+        print(f"{key:<52}{old:>10.1f} → {value:>10.1f} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PhotoBox-Pipeline offline durchmessen")
+    parser.add_argument('--only', nargs='+', choices=SECTIONS, default=list(SECTIONS),
+                        help="Nur diese Teile ausführen")
+    parser.add_argument('--json', metavar="PFAD", help="Ergebnisdatei (Standard: benchmarks/results/...)")
+    parser.add_argument('--compare', metavar="PFAD", help="Mit einem früheren Ergebnis vergleichen")
+    parser.add_argument('--workdir', help="Arbeitsverzeichnis (Standard: temporär)")
+    parser.add_argument('--timeout', type=float, default=600, help="Maximale Dauer je Teil (s)")
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--fps', type=int, default=30, help="Bildrate der synthetischen Kamera")
+    parser.add_argument('--captures', type=int, default=20, help="capture: Anzahl Aufnahmen")
+    parser.add_argument('--capture-interval', type=float, default=0.5, help="capture: Pause (s)")
+    parser.add_argument('--viewers', type=int, nargs='+', default=[1, 4, 16], help="preview: Viewer")
+    parser.add_argument('--seconds', type=float, default=5, help="preview/share: Dauer (s)")
+    parser.add_argument('--layouts', nargs='+', default=['single', 'side_by_side'], help="branding: Layouts")
+    parser.add_argument('--print-jobs', type=int, default=5, help="branding: Bögen je Layout")
+    parser.add_argument('--photos', type=int, nargs='+', default=[100, 10000], help="listing: Archivgrößen")
+    parser.add_argument('--listing-requests', type=int, default=100, help="listing: Requests je Messung")
+    parser.add_argument('--phones', type=int, default=50, help="share: pollende Handys")
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="share: Polling-Intervall (s)")
+    parser.add_argument('--photo-interval', type=float, default=2.0, help="share: neues Foto alle (s)")
+    parser.add_argument('--sessions', type=int, default=10, help="session: Anzahl Gäste-Sessions")
+    parser.add_argument('--concurrency', type=int, default=3, help="session: gleichzeitige Gäste")
+    parser.add_argument('--sd-steps', type=int, default=20, help="session: Fake-SD-Schritte")
+    parser.add_argument('--sd-step-seconds', type=float, default=0.1, help="session: Sekunden je Schritt")
+    parser.add_argument('--lp-seconds', type=float, default=0.3, help="session: Fake-lp-Übergabezeit")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="photobox_suite_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    options = argparse.Namespace(**{key: value for key, value in vars(args).items()
+                                    if key not in ('only', 'json', 'compare', 'workdir', 'timeout')})
+
+    print("=" * 60)
+    print(f"🧪 PhotoBox-Benchmark-Suite: {', '.join(args.only)}")
+    print(f"   Arbeitsverzeichnis: {workdir}")
+    print("=" * 60)
+
+    results = {}
+    errors = {}
+    for name in SECTIONS:
+        if name not in args.only:
+            continue
+        print(f"▶ {name} ...", flush=True)
+        started = time.perf_counter()
+        try:
+            results[name] = run_section(name, options, str(workdir), args.timeout)
+            print(f"  ✓ {time.perf_counter() - started:.1f}s")
+        except (RuntimeError, TimeoutError) as e:
+            errors[name] = str(e)
+            print(f"  ❌ fehlgeschlagen (Log: {workdir / f'{name}.log'})\n{e}")
+
+    output = {'run': run_info(), 'options': vars(options), 'results': results, 'errors': errors}
+    if args.json:
+        path = Path(args.json)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{stamp}_{output['run']['commit'] or 'nogit'}.json"
+    path.write_text(json.dumps(output, indent=2))
+    print(f"✓ Ergebnis gespeichert: {path}")
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), output)
+
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,90 @@
 import cv2
+import logging
+import queue
+import threading
+import time
 import numpy as np
 from io import BytesIO
 from PIL import Image
 
+import metrics
+from async_support import run_blocking
+
+log = logging.getLogger(__name__)
+
+PREVIEW_ENCODE_SECONDS = metrics.Histogram(
+    'photobox_preview_encode_seconds',
+    'JPEG-Kodierung eines Preview-/Stream-Frames (einmal pro Frame für alle Viewer)'
+)
+STALE_FRAME_AGE = 5.0  # Sekunden ohne neues Frame trotz Viewer → Status 'stale'
+
+class _Request:
+    """Nachricht an den Kamera-Thread (Aufnahme oder Preview)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.submitted_at = time.perf_counter()
+        self.done = threading.Event()
+        self.seq = None
+        self.frame = None
+
+    def reply(self, seq, frame):
+        self.seq = seq
+        self.frame = frame
+        self.done.set()
+
 class Camera:
-    def __init__(self, camera_index=0, width=1980, height=1080):
+    def __init__(self, camera_index=0, width=1980, height=1080, source=None, preview_quality=85):
         """
         Kamera initialisieren
+
+        Nur ein Thread (der Kamera-Actor) liest von der Kamera. Aufnahmen und
+        Previews sind Nachrichten an diesen Thread, Frames tragen eine
+        fortlaufende Sequenznummer.
         
         Args:
             camera_index: Index der Webcam (0 für erste Kamera)
             width: Bildbreite
             height: Bildhöhe
+            source: Optionale Frame-Quelle mit grab()/retrieve()/read()/isOpened()/
+                    set()/release() wie cv2.VideoCapture (z.B. synthetische Kamera
+                    für Tests und Benchmarks)
+            preview_quality: JPEG-Qualität für Preview und Video-Stream
         """
         self.camera_index = camera_index
         self.width = width
         self.height = height
-        self.cap = None
+        self.preview_quality = preview_quality
+        self.cap = source
+        self._injected = source is not None
+        self.last_frame_time = None  # Zeitpunkt des letzten erfolgreich gelesenen Frames
         
-        # Kamera beim Start initialisieren
-        self._init_camera()
+        # Zustand des Actors - geschrieben nur vom Kamera-Thread
+        self._requests = queue.Queue()
+        self._frame_cond = threading.Condition()
+        self._seq = 0
+        self._latest = None        # (Sequenznummer, Frame)
+        self._jpeg = (0, None)     # zuletzt kodiertes Preview (Sequenznummer, JPEG-Bytes)
+        self._jpeg_lock = threading.Lock()
+        self._viewers = 0
+        self._stats_lock = threading.Lock()
+        self._stats = {}           # Art → Zähler und Wartezeiten
+        self._stop_event = threading.Event()
     
-    def _init_camera(self):
-        """Kamera initialisieren"""
+        # Kamera beim Start initialisieren, danach liest nur noch der Actor
+        run_blocking(self._init_camera)
+        self._thread = threading.Thread(target=self._run, name="camera", daemon=True)
+        self._thread.start()
+
+    def _init_camera(self, quiet=False):
+        """Kamera initialisieren (quiet: Fehlschlag nicht melden, z.B. bei Wiederholungen)"""
         try:
-            self.cap = cv2.VideoCapture(self.camera_index)
+            if not self._injected:
+                self.cap = cv2.VideoCapture(self.camera_index)
+            if not self.cap.isOpened():
+                if not quiet:
+                    log.error(f"Fehler beim Initialisieren der Kamera: Kamera {self.camera_index} nicht gefunden")
+                return False
             
             # Auflösung setzen
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
@@ -37,12 +97,165 @@ class Camera:
             for _ in range(5):
                 self.cap.read()
                 
-            print(f"Kamera erfolgreich initialisiert: {self.width}x{self.height}")
+            log.info(f"Kamera erfolgreich initialisiert: {self.width}x{self.height}")
             return True
             
         except Exception as e:
-            print(f"Fehler beim Initialisieren der Kamera: {e}")
+            if not quiet:
+                log.error(f"Fehler beim Initialisieren der Kamera: {e}")
             return False
+
+    # ------------------------------------------------------------------
+    # Kamera-Actor
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        """
+        Einziger Leser der Kamera
+
+        Liest ohne Anfragen nur mit grab() mit, damit der Puffer der Webcam
+        nie veraltete Frames enthält. Dekodiert (retrieve) wird nur, wenn
+        eine Aufnahme, ein Preview oder ein Video-Stream wartet.
+
+        Im Async-Modus laufen grab()/retrieve() über run_blocking() in einem
+        OS-Thread, der Actor selbst bleibt ein Greenlet der Event-Loop.
+        """
+        # Fehlschlag beim Start wurde von _init_camera() bereits gemeldet
+        offline = self.cap is None or not self.cap.isOpened()
+        while not self._stop_event.is_set():
+            if self.cap is None or not self.cap.isOpened():
+                if not offline:
+                    log.warning("Kamera ist nicht initialisiert, versuche neu zu initialisieren...")
+                self._fail_pending()
+                metrics.RETRIES.labels('camera_init').inc()
+                if not run_blocking(self._init_camera, quiet=offline):
+                    offline = True
+                    self._stop_event.wait(1.0)
+                continue
+            offline = False
+
+            try:
+                # Anfragen vor dem grab() einsammeln: sie bekommen ein Frame,
+                # das erst nach ihrem Eintreffen belichtet wurde
+                pending = self._drain_requests()
+                if not run_blocking(self.cap.grab):
+                    log.warning("Frame konnte nicht gelesen werden")
+                    metrics.FAILURES.labels('camera_read').inc()
+                    self._fail(pending)
+                    self._stop_event.wait(0.1)
+                    continue
+
+                with self._frame_cond:
+                    wanted = pending or self._viewers > 0
+                if not wanted:
+                    continue
+
+                ret, frame = run_blocking(self.cap.retrieve)
+                if not ret or frame is None:
+                    log.error("Kein Frame empfangen")
+                    metrics.FAILURES.labels('camera_read').inc()
+                    self._fail(pending)
+                    continue
+
+                self.last_frame_time = time.time()
+                with self._frame_cond:
+                    self._seq += 1
+                    self._latest = (self._seq, frame)
+                    self._frame_cond.notify_all()
+
+                for request in pending:
+                    request.reply(self._seq, frame)
+                    self._record(request)
+
+            except Exception as e:
+                log.exception(f"Fehler im Kamera-Thread: {e}")
+                self._fail_pending()
+                self._stop_event.wait(0.1)
+
+        self._fail_pending()
+
+    def _drain_requests(self):
+        pending = []
+        while True:
+            try:
+                pending.append(self._requests.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def _fail(self, requests):
+        for request in requests:
+            request.reply(None, None)
+
+    def _fail_pending(self):
+        self._fail(self._drain_requests())
+
+    def _request(self, kind, timeout):
+        """Nachricht an den Actor schicken und auf das Frame warten"""
+        if self._stop_event.is_set():
+            return None, None
+        request = _Request(kind)
+        self._requests.put(request)
+        if not request.done.wait(timeout):
+            return None, None
+        return request.seq, request.frame
+
+    def _record(self, request):
+        """Wartezeit einer Anfrage (Eintreffen → Frame) verbuchen"""
+        wait_ms = (time.perf_counter() - request.submitted_at) * 1000
+        with self._stats_lock:
+            stats = self._stats.setdefault(request.kind, {'count': 0, 'wait_total_ms': 0.0, 'wait_max_ms': 0.0})
+            stats['count'] += 1
+            stats['wait_total_ms'] += wait_ms
+            stats['wait_max_ms'] = max(stats['wait_max_ms'], wait_ms)
+
+    def _encode_preview(self, seq, frame):
+        """JPEG eines Frames, pro Sequenznummer nur einmal kodiert (teilen sich alle Viewer)"""
+        with self._jpeg_lock:
+            cached_seq, jpeg = self._jpeg
+            if cached_seq == seq:
+                return jpeg
+            started = time.perf_counter()
+            ret, encoded = run_blocking(cv2.imencode, '.jpg', frame,
+                                        [cv2.IMWRITE_JPEG_QUALITY, self.preview_quality])
+            PREVIEW_ENCODE_SECONDS.observe(time.perf_counter() - started)
+            if not ret:
+                return None
+            jpeg = encoded.tobytes()
+            if seq > cached_seq:
+                self._jpeg = (seq, jpeg)
+            return jpeg
+
+    # ------------------------------------------------------------------
+    # Öffentliche Schnittstelle
+    # ------------------------------------------------------------------
+
+    def capture_frame(self, timeout=2.0):
+        """
+        Frisches Frame für eine Aufnahme holen (erst nach der Anfrage belichtet)
+
+        Args:
+            timeout: Maximale Wartezeit auf den Kamera-Thread
+
+        Returns:
+            tuple: (Sequenznummer, BGR-Frame) oder (None, None)
+        """
+        return self._request('capture', timeout)
+    
+    def grab_frame(self):
+        """
+        Aktuelles Frame für eine Aufnahme holen (ohne Speichern)
+        
+        Returns:
+            numpy.ndarray: BGR-Frame oder None
+        """
+        seq, frame = self.capture_frame()
+        if frame is None:
+            log.error("Kein Frame empfangen")
+        
+        # Optional: Bild spiegeln (wenn Webcam gespiegelt ist)
+        # frame = cv2.flip(frame, 1)
+            
+        return frame
     
     def capture(self, filepath):
         """
@@ -54,35 +267,18 @@ class Camera:
         Returns:
             bool: True wenn erfolgreich, False sonst
         """
-        if self.cap is None or not self.cap.isOpened():
-            print("Kamera ist nicht initialisiert, versuche neu zu initialisieren...")
-            self._init_camera()
+        frame = self.grab_frame()
+        if frame is None:
+            return False
         
         try:
-            # Mehrere Frames verwerfen um aktuelles Bild zu bekommen
-            # Dies ist wichtig weil Webcams oft alte Frames im Buffer haben
-            for _ in range(5):
-                ret, frame = self.cap.read()
-                if not ret:
-                    print("Warnung: Frame konnte nicht gelesen werden")
-            
-            # Jetzt das echte aktuelle Frame aufnehmen
-            ret, frame = self.cap.read()
-            
-            if not ret or frame is None:
-                print("Fehler: Kein Frame empfangen")
-                return False
-            
-            # Optional: Bild spiegeln (wenn Webcam gespiegelt ist)
-            # frame = cv2.flip(frame, 1)
-            
             # Bild speichern
-            cv2.imwrite(filepath, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-            print(f"Foto gespeichert: {filepath}")
+            run_blocking(cv2.imwrite, filepath, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            log.info(f"Foto gespeichert: {filepath}")
             return True
             
         except Exception as e:
-            print(f"Fehler beim Aufnehmen: {e}")
+            log.error(f"Fehler beim Aufnehmen: {e}")
             return False
     
     def get_frame(self):
@@ -92,31 +288,115 @@ class Camera:
         Returns:
             BytesIO: JPEG-kodiertes Bild oder None
         """
-        if self.cap is None or not self.cap.isOpened():
+        seq, frame = self._request('preview', timeout=2.0)
+        if frame is None:
             return None
         
         try:
-            ret, frame = self.cap.read()
-            if not ret:
-                return None
-            
-            # Frame in JPEG konvertieren
-            ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not ret:
-                return None
-            
-            return BytesIO(jpeg.tobytes())
+            jpeg = self._encode_preview(seq, frame)
+            return BytesIO(jpeg) if jpeg is not None else None
             
         except Exception as e:
-            print(f"Fehler beim Holen des Frames: {e}")
+            log.error(f"Fehler beim Holen des Frames: {e}")
             return None
+
+    def stream(self, timeout=2.0):
+        """
+        JPEG-Frames für einen Video-Stream (MJPEG)
+
+        Jeder Stream bekommt jedes Frame höchstens einmal und in aufsteigender
+        Reihenfolge. Ist ein Stream langsamer als die Kamera, werden Frames
+        übersprungen statt gepuffert.
+
+        Args:
+            timeout: Ohne neues Frame in dieser Zeit endet der Stream
+
+        Yields:
+            tuple: (Sequenznummer, JPEG-Bytes)
+        """
+        with self._frame_cond:
+            self._viewers += 1
+            # Nur Frames ab jetzt, kein altes Frame von einer früheren Aufnahme
+            last_seq = self._seq
+        try:
+            while not self._stop_event.is_set():
+                with self._frame_cond:
+                    if not self._frame_cond.wait_for(
+                            lambda: self._latest is not None and self._latest[0] > last_seq,
+                            timeout=timeout):
+                        return
+                    seq, frame = self._latest
+                jpeg = self._encode_preview(seq, frame)
+                if jpeg is None:
+                    return
+                last_seq = seq
+                yield seq, jpeg
+        finally:
+            with self._frame_cond:
+                self._viewers -= 1
+
+    def get_stats(self):
+        """
+        Kennzahlen des Kamera-Threads
+
+        Returns:
+            dict: {'frames', 'viewers', 'pending', 'requests': {Art: {'count', 'wait_avg_ms', 'wait_max_ms'}}}
+        """
+        with self._stats_lock:
+            requests = {}
+            for kind, stats in self._stats.items():
+                requests[kind] = {
+                    'count': stats['count'],
+                    'wait_avg_ms': stats['wait_total_ms'] / stats['count'],
+                    'wait_max_ms': stats['wait_max_ms'],
+                }
+        with self._frame_cond:
+            frames = self._seq
+            viewers = self._viewers
+        return {
+            'frames': frames,
+            'viewers': viewers,
+            'pending': self._requests.qsize(),
+            'requests': requests,
+        }
+    
+    def get_status(self):
+        """
+        Kamera-Status abfragen (ohne Frame zu lesen)
+        
+        Returns:
+            dict: {'available': bool, 'status': str, 'resolution': str, 'last_frame_age': float oder None,
+                   'stale': bool, 'viewers': int}
+        """
+        available = self.cap is not None and self.cap.isOpened()
+        last_frame_age = None
+        if self.last_frame_time is not None:
+            last_frame_age = round(time.time() - self.last_frame_time, 1)
+        # Frames werden nur für Viewer/Anfragen gelesen → ohne Viewer ist ein altes Frame normal
+        stale = self._viewers > 0 and (last_frame_age is None or last_frame_age > STALE_FRAME_AGE)
+        
+        return {
+            'available': available,
+            'status': 'Bereit' if available else 'Nicht verfügbar',
+            'resolution': f"{self.width}x{self.height}",
+            'last_frame_age': last_frame_age,
+            'stale': stale,
+            'viewers': self._viewers
+        }
     
     def release(self):
-        """Kamera-Ressourcen freigeben"""
+        """Kamera-Thread stoppen und Kamera-Ressourcen freigeben"""
+        stop_event = getattr(self, '_stop_event', None)
+        if stop_event is not None:
+            stop_event.set()
+        thread = getattr(self, '_thread', None)
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
         if self.cap is not None:
             self.cap.release()
-            print("Kamera freigegeben")
+            self.cap = None
+            log.info("Kamera freigegeben")
     
     def __del__(self):
         """Destruktor - Kamera automatisch freigeben"""
-        self.release()
\ No newline at end of file
+        self.release()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Server-seitiger Countdown für PhotoBox
+Der Button-Thread (oder die Oberfläche) startet den Countdown, bei t=0 wird
+direkt im Server ausgelöst. Die Kiosk-Oberfläche stellt nur noch die
+Socket.IO-Events dar - ein schlafender Tab oder ein Socket-Reconnect kann
+keine Aufnahme mehr verhindern.
+
+Events:
+    countdown_started  {'seconds', 'source'}
+    countdown          {'remaining'}
+    capture_result     {'success', ..., 'latency': {...}}
+"""
+import logging
+import threading
+import time
+
+import tracing
+
+log = logging.getLogger(__name__)
+
+
+class CaptureCountdown:
+    def __init__(self, capture, emit, seconds=5, history=100):
+        """
+        Countdown initialisieren
+
+        Args:
+            capture: Funktion(trace_id), die das Foto aufnimmt und ein
+                     Ergebnis-dict liefert (mit 'shutter_at' = time.monotonic()
+                     des aufgenommenen Frames)
+            emit: Funktion(event, data) zum Senden an die Oberfläche
+            seconds: Länge des Countdowns
+            history: Anzahl Messungen für die Latenz-Statistik
+        """
+        self.capture = capture
+        self.emit = emit
+        self.seconds = seconds
+        self.history = history
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._latencies = []   # dicts mit den Zeiten der letzten Aufnahmen
+
+    @property
+    def running(self):
+        with self._lock:
+            return self._running
+
+    def trigger(self, source="button", pressed_at=None, input_delay=None):
+        """
+        Countdown starten
+
+        Args:
+            source: Auslöser ('button' oder 'ui')
+            pressed_at: time.monotonic() beim Einlesen des Knopfdrucks
+            input_delay: Verzögerung Kernel-Event → Button-Thread in Sekunden (falls bekannt)
+
+        Returns:
+            bool: False wenn bereits ein Countdown läuft (Druck wird ignoriert)
+        """
+        pressed_at = pressed_at if pressed_at is not None else time.monotonic()
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+
+        threading.Thread(
+            target=self._run,
+            args=(source, pressed_at, input_delay),
+            name="capture-countdown",
+            daemon=True
+        ).start()
+        return True
+
+    def _run(self, source, pressed_at, input_delay):
+        # Der Trace der Session beginnt mit dem Knopfdruck
+        trace_id = tracing.new_trace_id()
+        pressed_wall = time.time() - (time.monotonic() - pressed_at)
+        result = {}
+        try:
+            started_at = time.monotonic()
+            self.emit("countdown_started", {'seconds': self.seconds, 'source': source})
+
+            # Feste Zeitpunkte statt sleep(1) in Folge - kein Aufsummieren von Verzögerungen
+            for remaining in range(self.seconds, 0, -1):
+                self.emit("countdown", {'remaining': remaining})
+                deadline = started_at + (self.seconds - remaining + 1)
+                time.sleep(max(0.0, deadline - time.monotonic()))
+
+            shutter_due = started_at + self.seconds
+            self.emit("countdown", {'remaining': 0})
+            result = self.capture(trace_id)
+
+            shutter_at = result.pop('shutter_at', None)
+            latency = {
+                'trigger_ms': (started_at - pressed_at) * 1000,
+                'input_delay_ms': input_delay * 1000 if input_delay is not None else None,
+            }
+            if shutter_at is not None:
+                latency['shutter_delay_ms'] = (shutter_at - shutter_due) * 1000
+                latency['button_to_shutter_ms'] = (shutter_at - pressed_at) * 1000
+                self._record(latency)
+                log.info(f"Auslöser: {latency['button_to_shutter_ms']:.0f} ms nach Knopfdruck "
+                         f"({self.seconds}s Countdown, {latency['shutter_delay_ms']:.1f} ms nach t=0)",
+                         extra={'photo_id': result.get('photo_id'), 'trace_id': trace_id, 'stage': 'countdown',
+                                'duration_ms': round(latency['button_to_shutter_ms'], 1)})
+
+            self.emit("capture_result", {**result, 'source': source, 'latency': latency})
+        except Exception as e:
+            log.exception(f"Countdown-Aufnahme fehlgeschlagen: {e}", extra={'trace_id': trace_id})
+            self.emit("capture_result", {'success': False, 'error': str(e), 'source': source})
+        finally:
+            # Knopfdruck bis geplanter Auslöser (die Aufnahme selbst ist der Span 'capture')
+            tracing.tracer.record(
+                trace_id, 'countdown', pressed_wall, self.seconds + (started_at - pressed_at),
+                source=source, photo_id=result.get('photo_id'),
+                input_delay_ms=round(input_delay * 1000, 1) if input_delay is not None else None
+            )
+            with self._lock:
+                self._running = False
+
+    def _record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            del self._latencies[:-self.history]
+
+    def get_stats(self):
+        """
+        Latenz-Statistik der letzten Aufnahmen
+
+        Returns:
+            dict: {'count', 'countdown_s', 'running', 'last', 'shutter_delay_ms': {...},
+                   'trigger_ms': {...}}
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            running = self._running
+
+        stats = {
+            'count': len(latencies),
+            'countdown_s': self.seconds,
+            'running': running,
+            'last': latencies[-1] if latencies else None,
+        }
+        for key in ('shutter_delay_ms', 'trigger_ms'):
+            values = sorted(entry[key] for entry in latencies)
+            if values:
+                stats[key] = {
+                    'mean': sum(values) / len(values),
+                    'p95': values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+                    'max': values[-1],
+                }
+        return stats
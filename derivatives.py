@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Derivate für PhotoBox
+Erzeugt pro Foto einmalig verkleinerte Versionen (Thumbnail, Handy-Bildschirm,
+volle Auflösung mit geringerer Qualität) als JPEG und WebP. Share-Server und
+/api/photos liefern dann je nach Query-Parameter bzw. Accept-Header die
+passende Größe aus - im Hotspot ist Bandbreite der Engpass, nicht CPU.
+
+Ablage: static/photos/derivatives/<photo_id>_<größe>.<jpg|webp>
+"""
+from pathlib import Path
+
+from image_pool import make_derivatives
+
+# Größe → max. Kantenlänge in Pixel (None = volle Auflösung) und Qualität
+DERIVATIVE_SIZES = {
+    'full': (None, 85),
+    'screen': (1280, 80),
+    'thumb': (320, 75),
+}
+
+# Format → (PIL-Format, Dateiendung, Mimetype)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', '.webp', 'image/webp'),
+    'jpeg': ('JPEG', '.jpg', 'image/jpeg'),
+}
+
+
+class DerivativeGenerator:
+    def __init__(self, photo_dir="static/photos", pool=None):
+        """
+        Derivat-Generator initialisieren
+
+        Args:
+            photo_dir: Foto-Verzeichnis (Derivate liegen im Unterordner derivatives/)
+            pool: ImageWorkerPool zum Erzeugen; ohne Pool kann nur ausgewählt werden
+                  (z.B. im Share-Server)
+        """
+        self.photo_dir = Path(photo_dir)
+        self.derivative_dir = self.photo_dir / "derivatives"
+        self.derivative_dir.mkdir(parents=True, exist_ok=True)
+        self.pool = pool
+
+    def path_for(self, photo_id, size, fmt):
+        """Pfad eines Derivats"""
+        extension = DERIVATIVE_FORMATS[fmt][1]
+        return self.derivative_dir / f"{photo_id}_{size}{extension}"
+
+    def url_for(self, photo_id, size, fmt):
+        """URL eines Derivats unter /static"""
+        return f"/static/photos/derivatives/{self.path_for(photo_id, size, fmt).name}"
+
+    @staticmethod
+    def describe(path):
+        """
+        Foto-ID, Größe und Format aus dem Pfad eines Derivats
+
+        Returns:
+            tuple: (photo_id, size, fmt)
+        """
+        path = Path(path)
+        photo_id, _, size = path.stem.rpartition('_')
+        fmt = next(name for name, (_, extension, _) in DERIVATIVE_FORMATS.items() if extension == path.suffix)
+        return photo_id, size, fmt
+
+    def submit(self, photo_path):
+        """
+        Alle Derivate eines Fotos im Hintergrund erzeugen
+
+        Args:
+            photo_path: Pfad zum Original (z.B. static/photos/<uuid>.jpg)
+
+        Returns:
+            Future mit der Liste der geschriebenen Pfade
+        """
+        photo_id = Path(photo_path).stem
+        outputs = []
+        # Von groß nach klein, damit jede Stufe aus der vorherigen skaliert wird
+        for size, (max_size, quality) in DERIVATIVE_SIZES.items():
+            for fmt, (pil_format, _, _) in DERIVATIVE_FORMATS.items():
+                outputs.append((str(self.path_for(photo_id, size, fmt)), max_size, pil_format, quality))
+        return self.pool.submit(make_derivatives, str(photo_path), outputs)
+
+    @staticmethod
+    def choose_format(fmt=None, accept=""):
+        """
+        Format bestimmen: expliziter Parameter, sonst WebP falls der Browser es akzeptiert
+
+        Returns:
+            str: 'webp' oder 'jpeg'
+        """
+        if fmt in DERIVATIVE_FORMATS:
+            return fmt
+        return 'webp' if 'image/webp' in (accept or "") else 'jpeg'
+
+    def pick(self, photo_id, size, fmt=None, accept=""):
+        """
+        Passendes Derivat auswählen
+
+        Args:
+            photo_id: ID des Fotos
+            size: 'thumb', 'screen', 'full' oder 'original'
+            fmt: 'webp'/'jpeg' oder None (dann per Accept-Header)
+            accept: Accept-Header des Requests
+
+        Returns:
+            tuple: (Path, Mimetype) oder (None, None) wenn kein Derivat existiert
+                   (Aufrufer liefert dann das Original aus)
+        """
+        if size not in DERIVATIVE_SIZES:
+            return None, None
+
+        preferred = self.choose_format(fmt, accept)
+        for candidate in (preferred, 'jpeg'):
+            path = self.path_for(photo_id, size, candidate)
+            if path.exists():
+                return path, DERIVATIVE_FORMATS[candidate][2]
+        return None, None
+
+    def remove(self, photo_id):
+        """
+        Alle Derivate eines Fotos löschen
+
+        Returns:
+            int: Anzahl freigegebener Bytes
+        """
+        freed = 0
+        for size in DERIVATIVE_SIZES:
+            for fmt in DERIVATIVE_FORMATS:
+                path = self.path_for(photo_id, size, fmt)
+                try:
+                    freed += path.stat().st_size
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        return freed
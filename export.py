@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Export für PhotoBox
+Baut ZIP- oder TAR-Archive als Generator: jede Datei wird in kleinen Blöcken
+gelesen und sofort weitergereicht, das Archiv liegt nie komplett im Speicher.
+JPEG/WebP sind bereits komprimiert - es wird nur gespeichert (kein Deflate),
+damit der Export kaum CPU braucht, während die PhotoBox weiterläuft.
+"""
+import io
+import tarfile
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+CHUNK_SIZE = 256 * 1024
+
+EXPORT_FORMATS = {
+    'zip': ('application/zip', '.zip'),
+    'tar': ('application/x-tar', '.tar'),
+}
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Nicht-seekbares Ziel für zipfile, das geschriebene Bytes sammelt"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        """Bisher geschriebene Bytes abholen"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _read_chunks(source):
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_zip(files):
+    """
+    ZIP-Archiv (ZIP64, unkomprimiert) als Generator
+
+    Args:
+        files: Iterable von (Pfad, Name im Archiv, mtime)
+
+    Yields:
+        bytes: Archiv-Blöcke
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for path, arcname, mtime in files:
+            try:
+                source = open(path, 'rb')
+            except FileNotFoundError:
+                continue  # zwischenzeitlich gelöscht (Retention)
+            with source:
+                info = zipfile.ZipInfo(arcname, time.localtime(mtime)[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with archive.open(info, 'w', force_zip64=True) as target:
+                    for chunk in _read_chunks(source):
+                        target.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            yield buffer.drain()
+    # Zentralverzeichnis wird beim Schließen geschrieben
+    yield buffer.drain()
+
+
+def stream_tar(files):
+    """
+    TAR-Archiv (ustar/pax, unkomprimiert) als Generator
+
+    Header und Blöcke werden direkt geschrieben - tarfile.addfile() würde
+    jede Datei erst komplett in den Puffer kopieren.
+
+    Args:
+        files: Iterable von (Pfad, Name im Archiv, mtime)
+
+    Yields:
+        bytes: Archiv-Blöcke
+    """
+    for path, arcname, mtime in files:
+        try:
+            source = open(path, 'rb')
+        except FileNotFoundError:
+            continue
+        with source:
+            info = tarfile.TarInfo(arcname)
+            info.size = source.seek(0, io.SEEK_END)
+            info.mtime = mtime
+            info.mode = 0o644
+            source.seek(0)
+
+            yield info.tobuf(format=tarfile.PAX_FORMAT)
+            written = 0
+            for chunk in _read_chunks(source):
+                # Nie mehr schreiben als im Header steht (Datei könnte wachsen)
+                chunk = chunk[:info.size - written]
+                written += len(chunk)
+                yield chunk
+                if written >= info.size:
+                    break
+            if written < info.size:
+                yield b'\0' * (info.size - written)  # Datei ist geschrumpft
+            padding = -info.size % tarfile.BLOCKSIZE
+            if padding:
+                yield b'\0' * padding
+    yield b'\0' * (tarfile.BLOCKSIZE * 2)
+
+
+def archive_name(entry):
+    """Name eines Fotos im Archiv: <Datum>/<Dateiname>"""
+    return f"{datetime.fromtimestamp(entry.timestamp):%Y-%m-%d}/{entry.filename}"
+
+
+def export_files(entries, derivatives=()):
+    """
+    Dateiliste für stream_zip/stream_tar
+
+    Args:
+        entries: PhotoEntry, älteste zuerst
+        derivatives: (photo_id, Pfad) der mitzuexportierenden Derivate
+
+    Yields:
+        tuple: (Pfad, Name im Archiv, mtime)
+    """
+    timestamps = {}
+    for entry in entries:
+        timestamps[entry.id] = entry.timestamp
+        yield entry.path, archive_name(entry), entry.timestamp
+
+    for photo_id, path in derivatives:
+        path = Path(path)
+        timestamp = timestamps.get(photo_id, time.time())
+        yield path, f"{datetime.fromtimestamp(timestamp):%Y-%m-%d}/derivatives/{path.name}", timestamp
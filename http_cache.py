@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+HTTP-Caching für PhotoBox
+Starke ETags aus dem Dateiinhalt, lange Cache-Control-Zeiten für
+unveränderliche UUID-URLs und 304-Antworten, ohne die Datei zu öffnen.
+
+Fotos werden nach UUID benannt und nie verändert - ein Browser, der ein
+Foto einmal hat, muss es nie wieder laden. Nur "das neueste Foto"
+(/bild, /download) und AI-Ergebnisse (<uuid>_ai, bei jedem AI-Lauf neu
+geschrieben) ändern sich und werden per ETag revalidiert.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from flask import Response, abort, request, send_file
+
+# <uuid>.jpg, derivatives/<uuid>_<größe>.<jpg|webp> - nicht <uuid>_ai*, das überschreibt
+# /api/process-ai bei jedem Lauf (samt Derivaten)
+IMMUTABLE_NAME = re.compile(
+    r'^(derivatives/)?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+    r'(_(thumb|screen|full))?\.(jpg|webp)$'
+)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+MIMETYPES = {'.jpg': 'image/jpeg', '.webp': 'image/webp'}
+
+
+def is_immutable_name(relative_path):
+    """Ändert sich der Inhalt hinter diesem Namen nie? (UUID-basierte Fotos ohne AI-Ergebnisse)"""
+    return IMMUTABLE_NAME.match(relative_path) is not None
+
+
+class ETagCache:
+    def __init__(self, max_entries=4096):
+        """
+        Merkt sich Inhalts-Hashes, damit jede Datei nur einmal gelesen wird
+
+        Args:
+            max_entries: Maximale Anzahl gemerkter ETags (LRU)
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash_file(path):
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, path, immutable=False):
+        """
+        ETag einer Datei
+
+        Args:
+            path: Dateipfad
+            immutable: True = Inhalt ändert sich nie, kein stat() nötig
+
+        Returns:
+            str: ETag (ohne Anführungszeichen)
+        """
+        if immutable:
+            key = str(path)
+        else:
+            stat = Path(path).stat()
+            key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            etag = self._entries.get(key)
+            if etag is not None:
+                self._entries.move_to_end(key)
+                return etag
+
+        etag = self._hash_file(path)
+        with self._lock:
+            self._entries[key] = etag
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def discard(self, path):
+        """ETag einer gelöschten Datei vergessen"""
+        path = str(path)
+        with self._lock:
+            for key in [k for k in self._entries if k == path or (isinstance(k, tuple) and k[0] == path)]:
+                del self._entries[key]
+
+
+def send_cached(path, etags, mimetype=None, immutable=False, **send_file_kwargs):
+    """
+    Datei mit ETag und passendem Cache-Control senden
+
+    Bei passendem If-None-Match wird 304 geantwortet, ohne die Datei zu öffnen.
+
+    Args:
+        path: Dateipfad
+        etags: ETagCache
+        mimetype: Content-Type
+        immutable: True für UUID-URLs (max-age 1 Jahr, immutable), sonst no-cache
+        **send_file_kwargs: z.B. as_attachment, download_name
+
+    Returns:
+        Flask Response
+    """
+    etag = etags.get(path, immutable=immutable)
+    cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+    else:
+        # Relative Pfade gelten ab dem Arbeitsverzeichnis (send_file nähme das Projektverzeichnis)
+        response = send_file(os.path.abspath(path), mimetype=mimetype, etag=etag, conditional=True,
+                             **send_file_kwargs)
+
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def add_static_photo_route(app, photo_dir, etags):
+    """
+    Ersetzt für /static/photos/* die Flask-Static-Route durch eine mit
+    Inhalts-ETag und immutable-Caching für UUID-Dateinamen
+
+    Args:
+        app: Flask-App
+        photo_dir: Foto-Verzeichnis
+        etags: ETagCache
+    """
+    photo_dir = Path(photo_dir).resolve()
+
+    @app.route('/static/photos/<path:filename>')
+    def static_photo(filename):
+        path = (photo_dir / filename).resolve()
+        if photo_dir not in path.parents or path.suffix not in MIMETYPES or path.name.startswith('.'):
+            abort(404)
+        immutable = is_immutable_name(filename)
+        try:
+            return send_cached(path, etags, mimetype=MIMETYPES[path.suffix], immutable=immutable)
+        except FileNotFoundError:
+            abort(404)
+
+    return static_photo
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Duplikat-Schutz für PhotoBox
+Aufnahme, Druck und AI sind die langsamsten Ressourcen der Box - ein
+prellender Button, ein Doppelklick oder ein wiederholter Request darf sie
+nicht zweimal belegen.
+
+- IdempotencyCache: Antworten je Idempotency-Key merken, Wiederholungen
+  bekommen die gespeicherte Antwort (läuft der erste Request noch, wird
+  auf ihn gewartet)
+- InFlight: "läuft bereits" je Schlüssel (z.B. Druck derselben Fotos)
+- DuplicateCounter: zählt, wie viel doppelte Arbeit vermieden wurde
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class DuplicateCounter:
+    """Vermiedene Duplikate je Grund (z.B. 'button_bounce', 'idempotent_replay')"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def add(self, reason):
+        with self._lock:
+            self._counts[reason] = self._counts.get(reason, 0) + 1
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {'total': int, 'by_reason': {Grund: Anzahl}}
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        return {'total': sum(counts.values()), 'by_reason': counts}
+
+
+class _Entry:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.created_at = time.time()
+
+
+class IdempotencyCache:
+    def __init__(self, ttl=600, max_entries=1024, counter=None):
+        """
+        Idempotency-Cache initialisieren
+
+        Args:
+            ttl: So lange (Sekunden) wird eine Antwort für Wiederholungen behalten
+            max_entries: Maximale Anzahl gemerkter Schlüssel (älteste fliegen raus)
+            counter: Optionaler DuplicateCounter
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.counter = counter
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (Scope, Key) → _Entry
+
+    def run(self, scope, key, func, timeout=300):
+        """
+        func einmal je (scope, key) ausführen
+
+        Args:
+            scope: Bereich des Schlüssels (z.B. 'capture', 'print') - gleiche
+                   Keys in verschiedenen Endpunkten kollidieren nicht
+            key: Idempotency-Key des Clients
+            func: Funktion ohne Argumente, liefert die Antwort
+            timeout: Maximale Wartezeit auf einen laufenden Erst-Request
+
+        Returns:
+            tuple: (Antwort, replayed) - replayed ist True bei einer Wiederholung
+
+        Raises:
+            TimeoutError wenn der Erst-Request nicht rechtzeitig fertig wird
+        """
+        cache_key = (scope, key)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(cache_key)
+            owner = entry is None
+            if owner:
+                entry = _Entry()
+                self._entries[cache_key] = entry
+
+        if not owner:
+            if not entry.done.wait(timeout):
+                raise TimeoutError("Erst-Request mit diesem Idempotency-Key läuft noch")
+            if entry.response is not None:
+                if self.counter is not None:
+                    self.counter.add(f'{scope}_replayed')
+                return entry.response, True
+            # Erst-Request ist fehlgeschlagen → dieser Request führt selbst aus
+            return self.run(scope, key, func, timeout)
+
+        try:
+            response = func()
+        except BaseException:
+            self._forget(cache_key, entry)
+            raise
+        entry.response = response
+        entry.done.set()
+        return response, False
+
+    def discard(self, scope, key):
+        """Antwort vergessen (z.B. Serverfehler - eine Wiederholung soll neu ausführen)"""
+        with self._lock:
+            entry = self._entries.get((scope, key))
+        if entry is not None:
+            self._forget((scope, key), entry)
+
+    def _forget(self, cache_key, entry):
+        with self._lock:
+            if self._entries.get(cache_key) is entry:
+                del self._entries[cache_key]
+        entry.response = None
+        entry.done.set()
+
+    def _expire(self):
+        """Abgelaufene und überzählige Einträge entfernen (Lock muss gehalten sein)"""
+        cutoff = time.time() - self.ttl
+        while self._entries:
+            cache_key, entry = next(iter(self._entries.items()))
+            if entry.created_at >= cutoff and len(self._entries) < self.max_entries:
+                break
+            if not entry.done.is_set():
+                break  # läuft noch - nicht unter einem wartenden Request entfernen
+            del self._entries[cache_key]
+
+
+class InFlight:
+    """Verhindert, dass derselbe Auftrag (z.B. Druck derselben Fotos) doppelt läuft"""
+
+    def __init__(self, counter=None):
+        self.counter = counter
+        self._lock = threading.Lock()
+        self._running = set()
+
+    @contextmanager
+    def claim(self, scope, key):
+        """
+        Auftrag für die Dauer des with-Blocks belegen
+
+        Yields:
+            bool: False wenn derselbe Auftrag bereits läuft
+        """
+        token = (scope, key)
+        with self._lock:
+            claimed = token not in self._running
+            if claimed:
+                self._running.add(token)
+        if not claimed and self.counter is not None:
+            self.counter.add(f'{scope}_already_queued')
+        try:
+            yield claimed
+        finally:
+            if claimed:
+                with self._lock:
+                    self._running.discard(token)
@@ -3,12 +3,26 @@
 Image Branding für PhotoBox
 Fügt HS-Esslingen Logo und QR-Code zu Fotos hinzu
 Normalisiert alle Bilder auf Druckgröße (1800x1200px @ 300 DPI für 10x15cm)
+Setzt mehrere Fotos auf einen Bogen (Fotostreifen, 2-up, Original + AI)
 """
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageOps
 from pathlib import Path
+from collections import OrderedDict
+import logging
+import threading
 import cairosvg
 from io import BytesIO
 
+log = logging.getLogger(__name__)
+
+# Verfügbare Drucklayouts (Name → Beschreibung)
+LAYOUTS = {
+    'single': 'Ein Foto pro Bogen (10x15cm)',
+    'strip': 'Zwei 5x15cm Fotostreifen mit je 3 Fotos (wird geschnitten)',
+    '2up': 'Zwei 10x7,5cm Fotos pro Bogen (wird geschnitten)',
+    'side_by_side': 'Original und AI-Version nebeneinander',
+}
+
 class ImageBranding:
     def __init__(self, logo_path="static/branding/HS-Esslingen_Logo.svg", 
                  qr_path="static/branding/HS-Esslingen_Code.png"):
@@ -32,11 +46,17 @@ class ImageBranding:
         self.border_thickness = 11  # 3mm bei 300 DPI ≈ 11 Pixel
         self.border_radius = 15  # Abgerundete Ecken
         self.padding = 20  # Abstand vom Rand des Fotos
+        self.cut_line_color = (210, 210, 210)  # Schnittlinie bei Mehrfach-Layouts
+        
+        # Logo/QR werden nur einmal pro Skalierung gerendert. Pro Session gibt es
+        # einen eigenen QR-Code - davon bleiben nur die zuletzt benutzten im Speicher.
+        self.max_cached_qr = 64
+        self._logo_cache = {}
+        self._qr_cache = OrderedDict()
+        self._overlay_lock = threading.Lock()
         
-        print(f"🎨 Image Branding initialisiert")
-        print(f"   Logo: {self.logo_path}")
-        print(f"   QR-Code: {self.qr_path}")
-        print(f"   Druckgröße: {self.print_width}x{self.print_height}px")
+        log.info(f"Image Branding initialisiert: Logo {self.logo_path}, QR-Code {self.qr_path}, "
+                 f"Druckgröße {self.print_width}x{self.print_height}px")
     
     def _svg_to_png(self, svg_path, width):
         """
@@ -58,18 +78,21 @@ class ImageBranding:
         # PNG als PIL Image laden
         return Image.open(BytesIO(png_data)).convert("RGBA")
     
-    def _create_logo_with_background(self, logo_img):
+    def _create_logo_with_background(self, logo_img, border=None, radius=None):
         """
         Erstellt Logo mit weißem Hintergrund und abgerundetem Rahmen
         
         Args:
             logo_img: PIL Image des Logos (RGBA)
+            border: Rahmenstärke in Pixel (Standard: border_thickness)
+            radius: Eckenradius in Pixel (Standard: border_radius)
             
         Returns:
             PIL Image mit Hintergrund und Rahmen
         """
         # Größe des finalen Bildes (Logo + Padding für Rahmen)
-        border = self.border_thickness
+        border = border or self.border_thickness
+        radius = radius or self.border_radius
         total_width = logo_img.width + 2 * border
         total_height = logo_img.height + 2 * border
         
@@ -82,7 +105,7 @@ class ImageBranding:
         # Äußerer Rahmen (grau)
         draw.rounded_rectangle(
             [(0, 0), (total_width, total_height)],
-            radius=self.border_radius,
+            radius=radius,
             fill=(255, 255, 255, 255),
             outline=(200, 200, 200, 255),
             width=border
@@ -95,18 +118,21 @@ class ImageBranding:
         
         return result
     
-    def _create_qr_with_background(self, qr_img):
+    def _create_qr_with_background(self, qr_img, border=None, radius=None):
         """
         Erstellt QR-Code mit abgerundetem Rahmen
         
         Args:
             qr_img: PIL Image des QR-Codes
+            border: Rahmenstärke in Pixel (Standard: border_thickness)
+            radius: Eckenradius in Pixel (Standard: border_radius)
             
         Returns:
             PIL Image mit Rahmen
         """
         # QR-Code hat schon weißen Hintergrund, nur Rahmen hinzufügen
-        border = self.border_thickness
+        border = border or self.border_thickness
+        radius = radius or self.border_radius
         total_width = qr_img.width + 2 * border
         total_height = qr_img.height + 2 * border
         
@@ -117,7 +143,7 @@ class ImageBranding:
         draw = ImageDraw.Draw(result)
         draw.rounded_rectangle(
             [(0, 0), (total_width, total_height)],
-            radius=self.border_radius,
+            radius=radius,
             fill=(255, 255, 255, 255),
             outline=(200, 200, 200, 255),
             width=border
@@ -135,51 +161,136 @@ class ImageBranding:
         
         return result
     
-    def _normalize_to_print_size(self, photo):
+    def _fit_to_box(self, photo, width, height, crop=False):
         """
-        Normalisiert Foto auf Druckgröße mit Letterbox (weiße Balken)
+        Skaliert ein Foto in eine Box
         
         Args:
             photo: PIL Image
+            width: Breite der Box
+            height: Höhe der Box
+            crop: True = Box füllen und Ränder abschneiden,
+                  False = Letterbox mit weißen Balken (kein Crop)
             
         Returns:
-            PIL Image in Druckgröße (1800x1200px)
+            PIL Image in Boxgröße
         """
+        if crop:
+            return ImageOps.fit(photo, (width, height), Image.LANCZOS)
+        
         original_width, original_height = photo.size
-        print(f"   Original: {original_width}x{original_height}px")
         
         # Seitenverhältnis berechnen
         aspect_original = original_width / original_height
-        aspect_target = self.print_width / self.print_height
+        aspect_target = width / height
         
         # Neue Größe berechnen (fit inside, kein Crop)
         if aspect_original > aspect_target:
             # Breiter als Ziel → an Breite anpassen
-            new_width = self.print_width
-            new_height = int(self.print_width / aspect_original)
+            new_width = width
+            new_height = int(width / aspect_original)
         else:
             # Höher als Ziel → an Höhe anpassen
-            new_height = self.print_height
-            new_width = int(self.print_height * aspect_original)
+            new_height = height
+            new_width = int(height * aspect_original)
         
         # Bild skalieren
         photo_resized = photo.resize((new_width, new_height), Image.LANCZOS)
-        print(f"   Skaliert: {new_width}x{new_height}px")
-        
-        # Weißen Canvas erstellen
-        canvas = Image.new('RGB', (self.print_width, self.print_height), (255, 255, 255))
-        
-        # Bild zentrieren auf Canvas (Letterbox)
-        x_offset = (self.print_width - new_width) // 2
-        y_offset = (self.print_height - new_height) // 2
         
+        # Weißen Canvas erstellen und Bild zentrieren (Letterbox)
+        canvas = Image.new('RGB', (width, height), (255, 255, 255))
+        x_offset = (width - new_width) // 2
+        y_offset = (height - new_height) // 2
         canvas.paste(photo_resized, (x_offset, y_offset))
-        print(f"   Letterbox: {x_offset}px links/rechts, {y_offset}px oben/unten")
-        print(f"   Final: {self.print_width}x{self.print_height}px (Druckgröße)")
         
         return canvas
     
-    def add_branding(self, input_image_path, output_image_path=None):
+    def _normalize_to_print_size(self, photo):
+        """
+        Normalisiert Foto auf Druckgröße mit Letterbox (weiße Balken)
+        
+        Args:
+            photo: PIL Image
+            
+        Returns:
+            PIL Image in Druckgröße (1800x1200px)
+        """
+        log.debug(f"Normalisiere {photo.size[0]}x{photo.size[1]}px → "
+                  f"{self.print_width}x{self.print_height}px (Druckgröße)")
+        canvas = self._fit_to_box(photo, self.print_width, self.print_height)
+        return canvas
+    
+    def _get_branding_overlays(self, scale=1.0, qr_path=None):
+        """
+        Liefert Logo und QR-Code (mit Hintergrund und Rahmen) für eine Skalierung
+        
+        Das Rendern (SVG → PNG, LANCZOS) passiert nur beim ersten Aufruf,
+        danach kommen die fertigen Overlays aus dem Cache.
+        
+        Args:
+            scale: Skalierungsfaktor relativ zu logo_width/qr_width
+            qr_path: QR-Code der Session (Standard: statischer QR-Code)
+            
+        Returns:
+            tuple: (logo_final, qr_final) als RGBA PIL Images
+        """
+        key = round(scale, 3)
+        qr_path = Path(qr_path) if qr_path else self.qr_path
+        border = max(3, int(self.border_thickness * scale))
+        radius = max(4, int(self.border_radius * scale))
+        
+        with self._overlay_lock:
+            logo_final = self._logo_cache.get(key)
+            if logo_final is None:
+                # Logo vorbereiten (SVG → PNG → mit Hintergrund)
+                log.debug(f"Lade Logo (Skalierung {key})")
+                logo_png = self._svg_to_png(self.logo_path, int(self.logo_width * scale))
+                logo_final = self._create_logo_with_background(logo_png, border, radius)
+                self._logo_cache[key] = logo_final
+            
+            qr_key = (str(qr_path), key)
+            qr_final = self._qr_cache.get(qr_key)
+            if qr_final is not None:
+                self._qr_cache.move_to_end(qr_key)
+                return logo_final, qr_final
+            
+            # QR-Code vorbereiten und auf gewünschte Größe skalieren
+            # (NEAREST hält die Module eines generierten Codes scharf)
+            log.debug(f"Lade QR-Code {qr_path.name} (Skalierung {key})")
+            qr_img = Image.open(qr_path).convert("RGBA")
+            qr_width = int(self.qr_width * scale)
+            aspect_ratio = qr_img.height / qr_img.width
+            qr_height = int(qr_width * aspect_ratio)
+            resample = Image.LANCZOS if qr_path == self.qr_path else Image.NEAREST
+            qr_img = qr_img.resize((qr_width, qr_height), resample)
+            qr_final = self._create_qr_with_background(qr_img, border, radius)
+            
+            self._qr_cache[qr_key] = qr_final
+            while len(self._qr_cache) > self.max_cached_qr:
+                self._qr_cache.popitem(last=False)
+            return logo_final, qr_final
+    
+    def _paste_branding(self, canvas, box, scale=1.0, qr_path=None):
+        """
+        Setzt Logo (oben links) und QR-Code (unten rechts) in einen Bereich
+        
+        Args:
+            canvas: RGBA PIL Image
+            box: (x0, y0, x1, y1) Bereich auf dem Canvas
+            scale: Skalierungsfaktor für Logo/QR
+            qr_path: QR-Code der Session (Standard: statischer QR-Code)
+        """
+        logo_final, qr_final = self._get_branding_overlays(scale, qr_path)
+        padding = max(8, int(self.padding * scale))
+        x0, y0, x1, y1 = box
+        
+        canvas.paste(logo_final, (x0 + padding, y0 + padding), logo_final)
+        
+        qr_x = x1 - qr_final.width - padding
+        qr_y = y1 - qr_final.height - padding
+        canvas.paste(qr_final, (qr_x, qr_y), qr_final)
+    
+    def add_branding(self, input_image_path, output_image_path=None, qr_path=None):
         """
         Fügt Logo und QR-Code zum Bild hinzu
         Normalisiert auf Druckgröße mit weißen Letterbox-Balken
@@ -187,11 +298,12 @@ class ImageBranding:
         Args:
             input_image_path: Pfad zum Original-Bild
             output_image_path: Pfad für Ausgabe (wenn None, wird Original überschrieben)
+            qr_path: Gecachter QR-Code der Session (Standard: statischer QR-Code)
             
         Returns:
             str: Pfad zum gebrandeten Bild
         """
-        print(f"\n🎨 Füge Branding hinzu: {input_image_path}")
+        log.debug(f"Füge Branding hinzu: {input_image_path}")
         
         # Original-Bild laden
         photo = Image.open(input_image_path).convert("RGB")
@@ -199,36 +311,9 @@ class ImageBranding:
         # AUF DRUCKGRÖSSE NORMALISIEREN (mit weißen Balken)
         photo_normalized = self._normalize_to_print_size(photo)
         
-        # Logo vorbereiten (SVG → PNG → mit Hintergrund)
-        print(f"   Lade Logo...")
-        logo_png = self._svg_to_png(self.logo_path, self.logo_width)
-        logo_final = self._create_logo_with_background(logo_png)
-        
-        # QR-Code vorbereiten
-        print(f"   Lade QR-Code...")
-        qr_img = Image.open(self.qr_path).convert("RGBA")
-        
-        # QR-Code auf gewünschte Größe skalieren
-        aspect_ratio = qr_img.height / qr_img.width
-        qr_height = int(self.qr_width * aspect_ratio)
-        qr_img = qr_img.resize((self.qr_width, qr_height), Image.LANCZOS)
-        
-        qr_final = self._create_qr_with_background(qr_img)
-        
-        # Foto in RGBA konvertieren für Transparenz
+        # Logo oben links, QR-Code unten rechts (Overlays aus dem Cache)
         photo_rgba = photo_normalized.convert("RGBA")
-        
-        # Logo oben links platzieren
-        logo_x = self.padding
-        logo_y = self.padding
-        photo_rgba.paste(logo_final, (logo_x, logo_y), logo_final)
-        print(f"   Logo platziert: ({logo_x}, {logo_y})")
-        
-        # QR-Code unten rechts platzieren
-        qr_x = photo_rgba.width - qr_final.width - self.padding
-        qr_y = photo_rgba.height - qr_final.height - self.padding
-        photo_rgba.paste(qr_final, (qr_x, qr_y), qr_final)
-        print(f"   QR-Code platziert: ({qr_x}, {qr_y})")
+        self._paste_branding(photo_rgba, (0, 0, photo_rgba.width, photo_rgba.height), qr_path=qr_path)
         
         # Zurück zu RGB konvertieren und speichern
         photo_final = photo_rgba.convert("RGB")
@@ -238,13 +323,128 @@ class ImageBranding:
             output_image_path = input_image_path
         
         photo_final.save(output_image_path, "JPEG", quality=95)
-        print(f"   ✅ Gespeichert: {output_image_path}")
+        log.debug(f"Gespeichert: {output_image_path}")
+        
+        return output_image_path
+    
+    def _draw_cut_line(self, canvas, start, end):
+        """Dünne graue Schnittlinie für Mehrfach-Layouts"""
+        draw = ImageDraw.Draw(canvas)
+        draw.line([start, end], fill=self.cut_line_color, width=2)
+    
+    def _compose_halves(self, photos, branding_per_half, qr_path=None):
+        """
+        Zwei Fotos nebeneinander (je 900x1200px)
+        
+        Args:
+            photos: Liste mit zwei PIL Images
+            branding_per_half: True = Logo/QR auf jeder Hälfte (wird geschnitten),
+                               False = einmal für den ganzen Bogen
+            qr_path: QR-Code der Session (Standard: statischer QR-Code)
+        """
+        half_width = self.print_width // 2
+        canvas = Image.new('RGBA', (self.print_width, self.print_height), (255, 255, 255, 255))
+        
+        for index, photo in enumerate(photos):
+            x0 = index * half_width
+            cell = self._fit_to_box(photo, half_width, self.print_height)
+            canvas.paste(cell, (x0, 0))
+            if branding_per_half:
+                self._paste_branding(canvas, (x0, 0, x0 + half_width, self.print_height),
+                                     scale=0.5, qr_path=qr_path)
+        
+        if branding_per_half:
+            self._draw_cut_line(canvas, (half_width, 0), (half_width, self.print_height))
+        else:
+            self._paste_branding(canvas, (0, 0, self.print_width, self.print_height),
+                                 scale=0.7, qr_path=qr_path)
+        
+        return canvas
+    
+    def _compose_strips(self, photos, qr_path=None):
+        """
+        Zwei identische 5x15cm Fotostreifen (je 1800x600px) mit je 3 Fotos
+        und einer Branding-Kachel am Ende
+        
+        Args:
+            photos: Liste mit 1-3 PIL Images (wird bei Bedarf wiederholt)
+            qr_path: QR-Code der Session (Standard: statischer QR-Code)
+        """
+        strip_height = self.print_height // 2
+        gap = self.padding
+        
+        # Branding-Kachel: Logo über QR-Code, am rechten Ende jedes Streifens
+        logo_final, qr_final = self._get_branding_overlays(scale=0.5, qr_path=qr_path)
+        tile_width = max(logo_final.width, qr_final.width) + 2 * gap
+        
+        cell_count = 3
+        cell_width = (self.print_width - tile_width - (cell_count + 1) * gap) // cell_count
+        cell_height = strip_height - 2 * gap
+        cells = [
+            self._fit_to_box(photos[i % len(photos)], cell_width, cell_height, crop=True)
+            for i in range(cell_count)
+        ]
+        
+        canvas = Image.new('RGBA', (self.print_width, self.print_height), (255, 255, 255, 255))
+        for strip in range(2):
+            y0 = strip * strip_height
+            for i, cell in enumerate(cells):
+                canvas.paste(cell, (gap + i * (cell_width + gap), y0 + gap))
+            
+            tile_x = self.print_width - tile_width
+            canvas.paste(logo_final, (tile_x + gap, y0 + gap), logo_final)
+            qr_y = y0 + strip_height - qr_final.height - gap
+            canvas.paste(qr_final, (tile_x + gap, qr_y), qr_final)
+        
+        self._draw_cut_line(canvas, (0, strip_height), (self.print_width, strip_height))
+        return canvas
+    
+    def compose_layout(self, image_paths, layout, output_image_path, qr_path=None):
+        """
+        Setzt mehrere Fotos mit Branding auf einen Druckbogen
+        
+        Args:
+            image_paths: Liste von Bildpfaden
+                - 'single': 1 Foto
+                - 'strip': 1-3 Fotos (werden wiederholt falls weniger)
+                - '2up': 1-2 Fotos (bei einem Foto zwei Abzüge)
+                - 'side_by_side': [Original, AI-Version]
+            layout: Name des Layouts (siehe LAYOUTS)
+            output_image_path: Pfad für den fertigen Druckbogen
+            qr_path: Gecachter QR-Code der Session (Standard: statischer QR-Code)
+            
+        Returns:
+            str: Pfad zum Druckbogen
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unbekanntes Layout: {layout}")
+        if not image_paths:
+            raise ValueError("Keine Bilder für das Layout angegeben")
+        
+        if layout == 'single':
+            return self.add_branding(image_paths[0], output_image_path, qr_path)
+        
+        log.debug(f"Erstelle Layout '{layout}' aus {len(image_paths)} Bild(ern)")
+        photos = [Image.open(path).convert("RGB") for path in image_paths]
+        
+        if layout == 'strip':
+            canvas = self._compose_strips(photos[:3], qr_path)
+        elif layout == '2up':
+            canvas = self._compose_halves([photos[0], photos[-1]], branding_per_half=True, qr_path=qr_path)
+        else:  # side_by_side
+            if len(photos) != 2:
+                raise ValueError("Layout 'side_by_side' braucht genau zwei Bilder")
+            canvas = self._compose_halves(photos, branding_per_half=False, qr_path=qr_path)
+        
+        canvas.convert("RGB").save(output_image_path, "JPEG", quality=95)
+        log.debug(f"Gespeichert: {output_image_path}")
         
         return output_image_path
 
 
 # Test-Funktion
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
     branding = ImageBranding()
     
     # Test mit einem Beispielbild
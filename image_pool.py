@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Image Worker Pool für PhotoBox
+Gemeinsamer, begrenzter Prozess-Pool für CPU-lastige Bildarbeit
+(Branding, JPEG-Encoding, Derivate, Gesichts-Crop), damit diese
+nicht im Flask-Request-Thread unter dem GIL mit MJPEG-Streams und
+Socket.IO konkurrieren.
+
+Jobs bekommen Dateipfade oder Frames über Shared Memory, nie große
+Bilddaten per Pickle.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+import logging_setup
+
+log = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Shared-Memory-Frames
+# ---------------------------------------------------------------------------
+
+class SharedFrame:
+    """Beschreibt ein numpy-Frame im Shared Memory (picklebar, ohne Bilddaten)"""
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = dtype
+
+    @classmethod
+    def create(cls, frame):
+        """
+        Kopiert ein Frame in einen neuen Shared-Memory-Block
+
+        Returns:
+            tuple: (SharedFrame, SharedMemory) - der Block muss vom Aufrufer
+                   nach Job-Ende mit close()/unlink() freigegeben werden
+        """
+        shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)
+        view[:] = frame
+        return cls(shm.name, frame.shape, frame.dtype.str), shm
+
+    def open(self):
+        """
+        Öffnet das Frame im Worker
+
+        Returns:
+            tuple: (numpy-Array als View, SharedMemory zum Schließen)
+        """
+        shm = shared_memory.SharedMemory(name=self.name)
+        return np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=shm.buf), shm
+
+
+# ---------------------------------------------------------------------------
+# Tasks (laufen im Worker-Prozess, müssen Modul-Funktionen sein)
+# ---------------------------------------------------------------------------
+
+_worker_branding = None
+_worker_face_cascade = None
+
+
+def _get_worker_branding():
+    """ImageBranding einmal pro Worker (Logo/QR-Overlays bleiben gecacht)"""
+    global _worker_branding
+    if _worker_branding is None:
+        from image_branding import ImageBranding
+        _worker_branding = ImageBranding()
+    return _worker_branding
+
+
+def brand_image(input_path, output_path, qr_path=None):
+    """Druckversion mit Logo + QR-Code (gecachter Session-Code oder statisch) rendern"""
+    return _get_worker_branding().add_branding(input_path, output_path, qr_path)
+
+
+def compose_layout(image_paths, layout, output_path, qr_path=None):
+    """Mehrfach-Layout (Fotostreifen, 2-up, ...) rendern"""
+    return _get_worker_branding().compose_layout(image_paths, layout, output_path, qr_path)
+
+
+def write_jpeg(frame, output_path, quality=95):
+    """
+    Frame als JPEG speichern
+
+    Geschrieben wird erst in eine versteckte Temp-Datei, die dann atomar
+    umbenannt wird - Katalog und Share-Server sehen nie halbe Dateien.
+    """
+    import cv2
+    output = Path(output_path)
+    tmp_path = output.with_name(f".{output.name}")
+    if not cv2.imwrite(str(tmp_path), frame, [cv2.IMWRITE_JPEG_QUALITY, quality]):
+        raise IOError(f"JPEG konnte nicht geschrieben werden: {output_path}")
+    os.replace(tmp_path, output)
+    return output_path
+
+
+def encode_jpeg(frame_ref, output_path, quality=95):
+    """Kamera-Frame aus dem Shared Memory als JPEG speichern (siehe write_jpeg)"""
+    frame, shm = frame_ref.open()
+    try:
+        return write_jpeg(frame, output_path, quality)
+    finally:
+        del frame
+        shm.close()
+
+
+def make_derivatives(input_path, outputs):
+    """
+    Verkleinerte Versionen eines Fotos speichern (Foto wird nur einmal dekodiert)
+
+    Args:
+        input_path: Pfad zum Original
+        outputs: Liste von (Ausgabepfad, max. Kantenlänge oder None, PIL-Format, Qualität),
+                 absteigend nach Größe sortiert
+
+    Returns:
+        list: Geschriebene Pfade
+    """
+    from PIL import Image
+    written = []
+    with Image.open(input_path) as photo:
+        photo = photo.convert("RGB")
+        for output_path, max_size, fmt, quality in outputs:
+            if max_size and max(photo.size) > max_size:
+                photo.thumbnail((max_size, max_size), Image.LANCZOS)
+            output = Path(output_path)
+            tmp_path = output.with_name(f".{output.name}")
+            photo.save(tmp_path, fmt, quality=quality)
+            os.replace(tmp_path, output)
+            written.append(output_path)
+    return written
+
+
+def crop_face(input_path, output_path, output_size=512, face_scale=1.4):
+    """
+    Größtes Gesicht finden und quadratisch zuschneiden (wie SimpleFaceCropper
+    in der SD-Pipeline). Ohne Gesicht wird das ganze Bild skaliert.
+
+    Returns:
+        bool: True wenn ein Gesicht gefunden wurde
+    """
+    global _worker_face_cascade
+    import cv2
+
+    if _worker_face_cascade is None:
+        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        _worker_face_cascade = cv2.CascadeClassifier(cascade_path)
+
+    img = cv2.imread(input_path)
+    if img is None:
+        raise IOError(f"Bild konnte nicht gelesen werden: {input_path}")
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    faces = _worker_face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))
+    if len(faces) == 0:
+        faces = _worker_face_cascade.detectMultiScale(gray, 1.05, 3, minSize=(20, 20))
+
+    found = len(faces) > 0
+    if found:
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        center_x = x + w // 2
+        center_y = y + h // 2
+        new_w = int(w * face_scale)
+        new_h = int(h * face_scale)
+        x1 = max(0, center_x - new_w // 2)
+        y1 = max(0, center_y - new_h // 2)
+        x2 = min(img.shape[1], center_x + new_w // 2)
+        y2 = min(img.shape[0], center_y + new_h // 2)
+        img = img[y1:y2, x1:x2]
+
+    img = cv2.resize(img, (output_size, output_size), interpolation=cv2.INTER_LANCZOS4)
+    cv2.imwrite(output_path, img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    return found
+
+
+def _timed_call(func, args, kwargs, submitted_at):
+    """Wrapper im Worker: misst Wartezeit in der Queue und Laufzeit"""
+    started_at = time.time()
+    result = func(*args, **kwargs)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+class ImageWorkerPool:
+    def __init__(self, max_workers=2, max_pending=16):
+        """
+        Prozess-Pool initialisieren
+
+        Args:
+            max_workers: Anzahl Worker-Prozesse
+            max_pending: Maximale Anzahl gleichzeitig wartender/laufender Jobs,
+                         weitere submit()-Aufrufe blockieren (Backpressure)
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        # 'spawn' statt fork: der Hauptprozess hat Kamera- und Server-Threads.
+        # Worker loggen wie der Server (Profil/Format über die Umgebung geerbt)
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=logging_setup.configure
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {}  # Task-Name → Zähler und Zeiten
+
+        log.info(f"Image Worker Pool: {max_workers} Prozesse, max. {max_pending} Jobs")
+
+    def submit(self, func, *args, timeout=None, **kwargs):
+        """
+        Job an den Pool übergeben
+
+        Args:
+            func: Task-Funktion aus diesem Modul
+            *args, **kwargs: Argumente (Pfade, SharedFrame, kleine Werte)
+            timeout: Maximale Wartezeit auf einen freien Slot (None = unbegrenzt)
+
+        Returns:
+            Future mit dem Ergebnis der Task
+
+        Raises:
+            TimeoutError wenn der Pool voll ist und timeout abläuft
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Image Worker Pool ist ausgelastet")
+
+        with self._lock:
+            self._pending += 1
+
+        outer = Future()
+        try:
+            inner = self._executor.submit(_timed_call, func, args, kwargs, time.time())
+        except Exception:
+            self._release()
+            raise
+
+        def _done(inner_future):
+            self._release()
+            try:
+                result, queue_wait, run_time = inner_future.result()
+            except Exception as e:
+                self._record(func.__name__, None, None, failed=True)
+                outer.set_exception(e)
+                return
+            self._record(func.__name__, queue_wait, run_time)
+            outer.set_result(result)
+
+        inner.add_done_callback(_done)
+        return outer
+
+    def submit_frame(self, func, frame, *args, timeout=None, **kwargs):
+        """
+        Job mit einem numpy-Frame übergeben (über Shared Memory statt Pickle)
+
+        Args:
+            func: Task-Funktion, erstes Argument ist ein SharedFrame
+            frame: numpy-Array (z.B. BGR-Frame der Kamera)
+        """
+        frame_ref, shm = SharedFrame.create(frame)
+        try:
+            future = self.submit(func, frame_ref, *args, timeout=timeout, **kwargs)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+        def _free(_):
+            shm.close()
+            shm.unlink()
+
+        future.add_done_callback(_free)
+        return future
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        """Job übergeben und auf das Ergebnis warten (timeout gilt für Slot und Ergebnis zusammen)"""
+        if timeout is None:
+            return self.submit(func, *args, **kwargs).result()
+        deadline = time.monotonic() + timeout
+        future = self.submit(func, *args, timeout=timeout, **kwargs)
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _record(self, name, queue_wait, run_time, failed=False):
+        """Zeiten einer abgeschlossenen Task verbuchen"""
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                'count': 0,
+                'errors': 0,
+                'queue_wait_total_s': 0.0,
+                'run_total_s': 0.0,
+                'run_max_s': 0.0,
+                'run_last_s': None,
+            })
+            if failed:
+                stats['errors'] += 1
+                return
+            stats['count'] += 1
+            stats['queue_wait_total_s'] += queue_wait
+            stats['run_total_s'] += run_time
+            stats['run_max_s'] = max(stats['run_max_s'], run_time)
+            stats['run_last_s'] = run_time
+
+    def stats(self):
+        """
+        Kennzahlen des Pools
+
+        Returns:
+            dict: {'workers', 'max_pending', 'queue_depth', 'tasks': {name: {...}}}
+        """
+        with self._lock:
+            tasks = {}
+            for name, stats in self._stats.items():
+                entry = dict(stats)
+                if stats['count']:
+                    entry['queue_wait_avg_s'] = stats['queue_wait_total_s'] / stats['count']
+                    entry['run_avg_s'] = stats['run_total_s'] / stats['count']
+                tasks[name] = entry
+            return {
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'queue_depth': self._pending,
+                'tasks': tasks,
+            }
+
+    def shutdown(self, wait=True):
+        """Worker-Prozesse beenden"""
+        self._executor.shutdown(wait=wait)
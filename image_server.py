@@ -2,35 +2,97 @@
 """
 Image Share Server für PhotoBox
 Zeigt das aktuellste Foto an und bietet Download an
+Unter /p/<id> hat jede Session (Original + AI) eine eigene Seite - dorthin
+führt der QR-Code auf dem Druck.
 Läuft auf Port 8080 parallel zur Hauptapp
 """
-from flask import Flask, send_file, jsonify
+from flask import Flask, Response, jsonify, request
 from pathlib import Path
+import json
+import logging
 import os
+import threading
+from session_store import SessionStore, session_id_for
+from derivatives import DerivativeGenerator
+from http_cache import ETagCache, add_static_photo_route, is_immutable_name, send_cached
+import logging_setup
+import metrics
+import profiling
 
 app = Flask(__name__)
+log = logging.getLogger("photobox.share")
 
 # Pfad zum Foto-Verzeichnis (gleicher wie in app.py)
 PHOTO_DIR = Path("static/photos")
 
+# Standardgröße für /bild (Handy-Bildschirm statt 1980x1080 in Qualität 95)
+DEFAULT_IMAGE_SIZE = "screen"
+
+# Session-Store (gleiche SQLite-Datei wie app.py, wird lazy initialisiert)
+DB_PATH = Path(os.environ.get("PHOTOBOX_DB", "data/photobox.db"))
+store = None
+
+# Derivat-Auswahl (wird lazy initialisiert, erzeugt werden die Derivate von app.py)
+derivatives = None
+
+# Worker-Threads des Servers (waitress bzw. Werkzeug-Fallback)
+SHARE_THREADS = int(os.environ.get("PHOTOBOX_SHARE_THREADS", "64"))
+
+# Server-Sent Events: Keepalive-Intervall und max. gleichzeitige Verbindungen.
+# Jede Verbindung belegt einen Worker-Thread - 16 Threads bleiben für Bild-Requests
+# frei, weitere Clients fallen auf Polling zurück.
+EVENT_KEEPALIVE = 15
+MAX_EVENT_CLIENTS = int(os.environ.get("PHOTOBOX_MAX_EVENT_CLIENTS", str(max(1, SHARE_THREADS - 16))))
+event_clients = 0
+event_clients_lock = threading.Lock()
+
+# Inhalts-ETags (jede Datei wird nur einmal gehasht, Wiederholungen → 304)
+etags = ETagCache()
+add_static_photo_route(app, PHOTO_DIR, etags)
+
+# Metriken unter /metrics (eigener Prozess → eigene Registry)
+metrics.install(app)
+profiling.install(app)
+metrics.Gauge('photobox_share_event_clients', 'Offene SSE-Verbindungen (/events)').set_function(
+    lambda: event_clients
+)
+
+def get_store():
+    """Session-Store lazy öffnen, Schreibzugriffe von app.py beobachten"""
+    global store
+    if store is None:
+        store = SessionStore(DB_PATH)
+        store.start_watching()
+    return store
+
+def get_derivatives():
+    """Derivat-Auswahl lazy initialisieren"""
+    global derivatives
+    if derivatives is None:
+        derivatives = DerivativeGenerator(PHOTO_DIR)
+    return derivatives
+
+def photo_status(entry):
+    """Status-Dict eines Fotos für /api/status und /events"""
+    if entry is None:
+        return {'has_photo': False}
+    return {
+        'has_photo': True,
+        'id': entry.id,
+        'filename': entry.filename,
+        'type': entry.kind,
+        'size_kb': entry.size / 1024,
+        'timestamp': entry.timestamp
+    }
+
 def get_latest_photo():
     """
-    Findet das neueste Foto im Verzeichnis
+    Findet das neueste Foto (Index-Lookup im Session-Store)
     
     Returns:
-        Path-Objekt oder None wenn kein Foto vorhanden
+        PhotoEntry oder None wenn kein Foto vorhanden
     """
-    try:
-        photos = list(PHOTO_DIR.glob("*.jpg"))
-        if not photos:
-            return None
-        
-        # Sortiere nach Änderungsdatum, neuestes zuerst
-        latest = max(photos, key=lambda p: p.stat().st_mtime)
-        return latest
-    except Exception as e:
-        print(f"Fehler beim Suchen des Fotos: {e}")
-        return None
+    return get_store().latest()
 
 @app.route("/")
 def show_image():
@@ -67,13 +129,20 @@ def show_image():
                     <p>Noch kein Foto aufgenommen!</p>
                     <p style="font-size: 16px; opacity: 0.8;">Mache ein Foto an der PhotoBox um es hier zu sehen.</p>
                 </div>
+                <script>
+                    // Sobald das erste Foto da ist, Seite neu laden
+                    if (window.EventSource) {
+                        new EventSource("/events").addEventListener("photo", (event) => {
+                            if (JSON.parse(event.data).has_photo) location.reload();
+                        });
+                    }
+                </script>
             </body>
             </html>
         '''
     
     # Foto-Info
-    photo_name = latest_photo.name
-    photo_size = latest_photo.stat().st_size / 1024  # KB
+    photo_size = latest_photo.size / 1024  # KB
     
     return f'''
         <html>
@@ -156,7 +225,7 @@ def show_image():
         <body>
             <div class="container">
                 <h1>📸 Dein PhotoBox Foto</h1>
-                <img src="/bild" alt="Dein Foto">
+                <img id="photo" src="/bild?v={latest_photo.id}" alt="Dein Foto">
                 
                 <br>
                 <a class="download-btn" href="/download" download>⬇️ Foto herunterladen</a>
@@ -165,15 +234,45 @@ def show_image():
                 <a class="refresh-btn" href="/" onclick="location.reload()">🔄 Aktualisieren</a>
                 
                 <p class="info">
-                    Größe: {photo_size:.1f} KB
+                    Größe: <span id="size">{photo_size:.1f}</span> KB
                 </p>
             </div>
             
             <script>
-                // Auto-Refresh alle 5 Sekunden um neues Foto zu zeigen
-                setTimeout(() => {{
-                    location.reload();
-                }}, 5000);
+                // Neues Foto per Server-Sent Events, das Bild wird an Ort und Stelle getauscht.
+                // Ohne EventSource (oder wenn der Server voll ist) alle 5 Sekunden /api/status prüfen.
+                let currentId = "{latest_photo.id}";
+                let pollTimer = null;
+
+                function showPhoto(status) {{
+                    if (!status.has_photo || status.id === currentId) return;
+                    currentId = status.id;
+                    document.getElementById("photo").src = "/bild?v=" + encodeURIComponent(status.id);
+                    document.getElementById("size").textContent = status.size_kb.toFixed(1);
+                }}
+
+                function startPolling() {{
+                    if (pollTimer) return;
+                    pollTimer = setInterval(async () => {{
+                        try {{
+                            const response = await fetch("/api/status", {{ cache: "no-cache" }});
+                            showPhoto(await response.json());
+                        }} catch (e) {{
+                            // Server kurz nicht erreichbar - beim nächsten Intervall erneut versuchen
+                        }}
+                    }}, 5000);
+                }}
+
+                if (window.EventSource) {{
+                    const events = new EventSource("/events");
+                    events.addEventListener("photo", (event) => showPhoto(JSON.parse(event.data)));
+                    events.onerror = () => {{
+                        // Verbindung endgültig abgelehnt (z.B. 503) → Polling
+                        if (events.readyState === EventSource.CLOSED) startPolling();
+                    }};
+                }} else {{
+                    startPolling();
+                }}
             </script>
         </body>
         </html>
@@ -181,13 +280,30 @@ def show_image():
 
 @app.route("/bild")
 def bild():
-    """Sendet das Bild zum Anzeigen"""
+    """
+    Sendet das Bild zum Anzeigen
+    
+    Query-Parameter:
+        size: 'thumb', 'screen' (Standard), 'full' oder 'original'
+        format: 'webp' oder 'jpeg' (Standard: WebP wenn der Browser es akzeptiert)
+    """
     latest_photo = get_latest_photo()
     
     if not latest_photo:
         return jsonify({'error': 'Kein Foto verfügbar'}), 404
     
-    return send_file(latest_photo, mimetype="image/jpeg")
+    size = request.args.get('size', DEFAULT_IMAGE_SIZE)
+    path, mimetype = get_derivatives().pick(
+        latest_photo.id, size, request.args.get('format'), request.headers.get('Accept', '')
+    )
+    if path is None:
+        # Noch kein Derivat (oder 'original' angefordert) → Original ausliefern
+        path, mimetype = latest_photo.path, "image/jpeg"
+    
+    # "Das neueste Foto" ändert sich → immer revalidieren, per ETag meist 304
+    response = send_cached(path, etags, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
 
 @app.route("/download")
 def download():
@@ -198,39 +314,258 @@ def download():
         return jsonify({'error': 'Kein Foto verfügbar'}), 404
     
     # Download mit schönem Namen
-    return send_file(
-        latest_photo,
+    return send_cached(
+        latest_photo.path,
+        etags,
+        mimetype="image/jpeg",
         as_attachment=True,
         download_name=f"photobox_foto.jpg"
     )
 
+@app.route("/p/<session_id>")
+def share_page(session_id):
+    """
+    Share-Seite einer Session (Ziel des QR-Codes auf dem Druck)
+
+    Zeigt Original und AI-Version mit Download-Buttons. Wird die
+    AI-Version erst nach dem Scannen fertig, lädt sich die Seite neu.
+    """
+    session_id = session_id_for(session_id)
+    photos = get_store().select_photos(session_ids=[session_id])
+
+    if not photos:
+        return '''
+            <html>
+            <head>
+                <title>PhotoBox - Foto nicht gefunden</title>
+                <meta name="viewport" content="width=device-width, initial-scale=1.0">
+                <style>
+                    body {
+                        text-align: center;
+                        font-family: Arial, sans-serif;
+                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                        color: white;
+                        margin: 0;
+                        padding: 50px 20px;
+                        min-height: 100vh;
+                    }
+                </style>
+            </head>
+            <body>
+                <h1>📸 PhotoBox</h1>
+                <p>Dieses Foto ist nicht mehr verfügbar.</p>
+            </body>
+            </html>
+        ''', 404
+
+    cards = []
+    for entry in photos:
+        label = "🎨 AI-Version" if entry.kind == 'ai' else "📸 Original"
+        cards.append(f'''
+            <div class="card">
+                <img src="/foto/{entry.id}" alt="{label}">
+                <p>{label} · {entry.size / 1024:.1f} KB</p>
+                <a class="download-btn" href="/download/{entry.id}" download>⬇️ Herunterladen</a>
+            </div>''')
+
+    return f'''
+        <html>
+        <head>
+            <title>PhotoBox - Deine Fotos</title>
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <style>
+                body {{
+                    text-align: center;
+                    font-family: Arial, sans-serif;
+                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                    color: white;
+                    margin: 0;
+                    padding: 20px;
+                    min-height: 100vh;
+                }}
+                h1 {{
+                    margin: 20px 0;
+                    font-size: 2.2em;
+                    text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+                }}
+                .card {{
+                    max-width: 900px;
+                    margin: 0 auto 40px;
+                }}
+                .card img {{
+                    max-width: 90%;
+                    height: auto;
+                    border-radius: 20px;
+                    box-shadow: 0 10px 40px rgba(0,0,0,0.4);
+                }}
+                .download-btn {{
+                    display: inline-block;
+                    padding: 16px 48px;
+                    font-size: 20px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #4CAF50;
+                    border-radius: 50px;
+                    text-decoration: none;
+                    box-shadow: 0 5px 20px rgba(0,0,0,0.3);
+                }}
+            </style>
+        </head>
+        <body>
+            <h1>📸 Deine PhotoBox Fotos</h1>
+            {"".join(cards)}
+            <script>
+                // AI-Version dieser Session fertig geworden → Seite neu laden
+                const sessionId = "{session_id}";
+                const shown = {json.dumps([entry.id for entry in photos])};
+                if (window.EventSource) {{
+                    new EventSource("/events").addEventListener("photo", (event) => {{
+                        const status = JSON.parse(event.data);
+                        if (status.has_photo && status.id.startsWith(sessionId) && !shown.includes(status.id)) {{
+                            location.reload();
+                        }}
+                    }});
+                }}
+            </script>
+        </body>
+        </html>
+    '''
+
+@app.route("/foto/<photo_id>")
+def foto(photo_id):
+    """
+    Sendet ein bestimmtes Foto zum Anzeigen (gleiche Parameter wie /bild)
+
+    Die URL enthält die Foto-ID, Derivate ändern sich nie → langes Caching
+    (außer bei AI-Ergebnissen, die ein neuer AI-Lauf überschreibt).
+    """
+    entry = get_store().get_photo(photo_id)
+    if entry is None:
+        return jsonify({'error': 'Foto nicht gefunden'}), 404
+
+    size = request.args.get('size', DEFAULT_IMAGE_SIZE)
+    path, mimetype = get_derivatives().pick(
+        entry.id, size, request.args.get('format'), request.headers.get('Accept', '')
+    )
+    if path is None:
+        # Derivat noch nicht fertig → Original, aber nicht dauerhaft im Browser cachen
+        response = send_cached(entry.path, etags, mimetype="image/jpeg")
+    else:
+        response = send_cached(path, etags, mimetype=mimetype, immutable=is_immutable_name(Path(path).name))
+    response.vary.add('Accept')
+    return response
+
+@app.route("/download/<photo_id>")
+def download_photo(photo_id):
+    """Sendet ein bestimmtes Foto als Download"""
+    entry = get_store().get_photo(photo_id)
+    if entry is None:
+        return jsonify({'error': 'Foto nicht gefunden'}), 404
+
+    return send_cached(
+        entry.path,
+        etags,
+        mimetype="image/jpeg",
+        immutable=is_immutable_name(Path(entry.path).name),
+        as_attachment=True,
+        download_name=f"photobox_{entry.id}.jpg"
+    )
+
 @app.route("/api/status")
 def status():
     """API-Endpunkt für Status-Check"""
-    latest_photo = get_latest_photo()
+    response = jsonify(photo_status(get_latest_photo()))
     
-    if latest_photo:
-        return jsonify({
-            'has_photo': True,
-            'filename': latest_photo.name,
-            'size_kb': latest_photo.stat().st_size / 1024,
-            'timestamp': latest_photo.stat().st_mtime
-        })
-    else:
-        return jsonify({
-            'has_photo': False
-        })
+    # Polling der Share-Seite: unverändert → 304 ohne Body
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route("/events")
+def events():
+    """
+    Server-Sent Events: meldet ein neues neuestes Foto (Original oder AI)
+    
+    Beim Verbinden wird der aktuelle Stand gesendet, danach nur noch bei
+    Änderungen. Kommentarzeilen alle EVENT_KEEPALIVE Sekunden halten die
+    Verbindung durch Proxys/WLAN-Router offen.
+    """
+    global event_clients
+    with event_clients_lock:
+        if event_clients >= MAX_EVENT_CLIENTS:
+            return jsonify({'error': 'Zu viele Verbindungen, bitte /api/status pollen'}), 503
+        event_clients += 1
+    
+    store = get_store()
+    
+    def stream():
+        yield "retry: 3000\n\n"
+        version = store.version
+        latest = store.latest()
+        sent_id = latest.id if latest else None
+        yield f"event: photo\ndata: {json.dumps(photo_status(latest))}\n\n"
+        
+        while True:
+            new_version = store.wait_for_change(version, timeout=EVENT_KEEPALIVE)
+            if new_version == version:
+                yield ": keepalive\n\n"
+                continue
+            version = new_version
+            
+            # Nur melden, wenn sich das neueste Foto tatsächlich geändert hat
+            latest = store.latest()
+            latest_id = latest.id if latest else None
+            if latest_id != sent_id:
+                sent_id = latest_id
+                yield f"event: photo\ndata: {json.dumps(photo_status(latest))}\n\n"
+
+    def release():
+        global event_clients
+        with event_clients_lock:
+            event_clients -= 1
+    
+    response = Response(stream(), mimetype="text/event-stream", headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    # Wird auch aufgerufen, wenn der Client vor dem ersten Event abbricht
+    response.call_on_close(release)
+    return response
+
+def serve(host="0.0.0.0", port=8080, threads=SHARE_THREADS):
+    """
+    Server starten: waitress mit Thread-Pool, sonst Werkzeug (threaded)
+    
+    Args:
+        host: Bind-Adresse
+        port: Port
+        threads: Anzahl Worker-Threads (= gleichzeitig bearbeitete Requests)
+    """
+    logging_setup.configure()
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        log.warning("'waitress' nicht installiert - nutze Werkzeug-Entwicklungsserver "
+                    "(installieren mit: pip3 install waitress)")
+        # threaded: jede SSE-Verbindung (/events) belegt einen Thread
+        app.run(host=host, port=port, debug=False, threaded=True)
+        return
+    
+    log.info(f"waitress mit {threads} Threads, max. {MAX_EVENT_CLIENTS} SSE-Verbindungen")
+    waitress_serve(
+        app,
+        host=host,
+        port=port,
+        threads=threads,
+        connection_limit=threads * 2,
+        channel_timeout=EVENT_KEEPALIVE * 4,
+        ident="PhotoBox"
+    )
 
 if __name__ == "__main__":
-    print("=" * 60)
-    print("📸 PhotoBox Image Share Server")
-    print("=" * 60)
-    print("🌐 Server läuft auf:")
-    print("   - http://127.0.0.1:8080 (localhost)")
-    print("   - http://0.0.0.0:8080 (alle Netzwerk-Interfaces)")
-    print("")
-    print("📱 Verbinde dich mit deinem Smartphone/Tablet über:")
-    print("   http://<JETSON-IP>:8080")
-    print("=" * 60)
-    
-    app.run(host="0.0.0.0", port=8080, debug=False)
\ No newline at end of file
+    logging_setup.configure()
+    log.info(f"PhotoBox Image Share Server auf http://0.0.0.0:8080 (Smartphone: http://<JETSON-IP>:8080), "
+             f"Log-Profil {logging_setup.LOG_PROFILE}")
+    
+    get_store()
+    serve()
\ No newline at end of file
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Logging für PhotoBox (Hauptserver und Share-Server)
+Log-Aufrufe auf heißen Pfaden (Aufnahme, Branding, AI, Druck) legen den
+Eintrag nur in eine Queue. Ein echter OS-Thread schreibt nach stdout - auch
+im gevent-Modus blockiert ein langsames Terminal oder eine volle Pipe weder
+Requests noch die Event-Loop.
+
+Strukturierte Felder über extra=...:
+    log.info("Foto aufgenommen", extra={'photo_id': photo_id, 'duration_ms': 140})
+
+Umgebung:
+    PHOTOBOX_LOG_PROFILE   development (Standard) | production
+    PHOTOBOX_LOG_LEVEL     DEBUG | INFO | WARNING | ERROR (Standard: INFO)
+    PHOTOBOX_LOG_FORMAT    text | json (Standard: text, im Profil production json)
+
+Das Profil production schaltet das Paket-Logging von Socket.IO/Engine.IO,
+das Request-Log von Werkzeug und den Debug-Modus des Servers ab.
+"""
+import atexit
+import importlib
+import json
+import logging
+import logging.handlers
+import os
+import sys
+from datetime import datetime
+
+LOG_PROFILES = ('development', 'production')
+LOG_FORMATS = ('text', 'json')
+
+# Felder, die beide Formatter aus extra=... übernehmen
+FIELDS = ('session', 'photo_id', 'trace_id', 'stage', 'duration_ms')
+
+# Logger von Bibliotheken, die pro Request/Paket schreiben
+CHATTY_LOGGERS = ('socketio', 'engineio', 'werkzeug')
+
+_STOP = object()
+_writer = None
+
+
+def _original(module, name):
+    # Nach gevent-Patchen wären _thread/_queue grün - der Schreib-Thread
+    # braucht die echten Primitive
+    try:
+        from gevent import monkey
+    except ImportError:
+        return getattr(importlib.import_module(module), name)
+    return monkey.get_original(module, name)
+
+
+def configured_profile():
+    """
+    Log-Profil aus PHOTOBOX_LOG_PROFILE lesen
+
+    Returns:
+        str: 'development' oder 'production'
+
+    Raises:
+        ValueError bei unbekanntem Profil
+    """
+    profile = os.environ.get("PHOTOBOX_LOG_PROFILE", "development").strip().lower() or "development"
+    if profile not in LOG_PROFILES:
+        raise ValueError(f"Unbekanntes PHOTOBOX_LOG_PROFILE: {profile} (erlaubt: {', '.join(LOG_PROFILES)})")
+    return profile
+
+
+LOG_PROFILE = configured_profile()
+
+
+def is_production():
+    """True im Profil 'production'"""
+    return LOG_PROFILE == 'production'
+
+
+def _structured_fields(record):
+    return {name: getattr(record, name) for name in FIELDS if getattr(record, name, None) is not None}
+
+
+class TextFormatter(logging.Formatter):
+    """Lesbare Zeile, strukturierte Felder als key=value angehängt"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _structured_fields(record)
+        if fields:
+            line += "  " + " ".join(f"{name}={value}" for name, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Eine JSON-Zeile pro Eintrag (für Log-Sammler)"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(_structured_fields(record))
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueWriter:
+    """Schreibt Einträge aus der Queue in einem echten OS-Thread"""
+
+    def __init__(self, handler):
+        # SimpleQueue.put() blockiert nie, auch nicht zwischen Greenlets und OS-Thread
+        self.queue = _original('_queue', 'SimpleQueue')()
+        self.handler = handler
+        self.done = _original('_thread', 'allocate_lock')()
+        self.done.acquire()
+        _original('_thread', 'start_new_thread')(self._run, ())
+
+    def _run(self):
+        try:
+            while True:
+                record = self.queue.get()
+                if record is _STOP:
+                    break
+                try:
+                    self.handler.handle(record)
+                except Exception:
+                    self.handler.handleError(record)
+        finally:
+            self.done.release()
+
+    def stop(self, timeout=2):
+        """Restliche Einträge schreiben und den Thread beenden"""
+        self.queue.put(_STOP)
+        if self.done.acquire(timeout=timeout):
+            self.done.release()
+        self.handler.flush()
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, der Felder und Exception unformatiert weitergibt"""
+
+    def createLock(self):
+        # put() ist threadsicher - keine (nach gevent-Patchen grüne) Handler-Sperre,
+        # auch Aufrufe aus OS-Threads von run_blocking() dürfen hier loggen
+        self.lock = None
+
+    def prepare(self, record):
+        # Nachricht jetzt auflösen (args können sich ändern), Formatierung
+        # (Zeit, Traceback, JSON) erst im Schreib-Thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure(stream=None):
+    """
+    Root-Logger auf Queue + Schreib-Thread umstellen (mehrfacher Aufruf ist harmlos)
+
+    Args:
+        stream: Ziel (Standard: sys.stdout)
+
+    Returns:
+        str: Aktives Log-Profil
+    """
+    global _writer
+    if _writer is not None:
+        return LOG_PROFILE
+
+    log_format = os.environ.get("PHOTOBOX_LOG_FORMAT", "json" if is_production() else "text").strip().lower()
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unbekanntes PHOTOBOX_LOG_FORMAT: {log_format} (erlaubt: {', '.join(LOG_FORMATS)})")
+    level = os.environ.get("PHOTOBOX_LOG_LEVEL", "INFO").strip().upper()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == 'json' else TextFormatter())
+    output.lock = _original('threading', 'RLock')()  # nur der Schreib-Thread benutzt sie
+    _writer = _QueueWriter(output)
+    atexit.register(_writer.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_EnqueueHandler(_writer.queue))
+    root.setLevel(level)
+
+    chatty_level = logging.WARNING if is_production() else logging.INFO
+    for name in CHATTY_LOGGERS:
+        logging.getLogger(name).setLevel(chatty_level)
+    return LOG_PROFILE
+
+
+def socketio_loggers():
+    """
+    Logger für SocketIO(...) - eigene Logger statt True, sonst hängen
+    python-socketio/engineio einen synchronen StreamHandler an
+
+    Returns:
+        dict: logger und engineio_logger für SocketIO()
+    """
+    return {
+        'logger': logging.getLogger('socketio'),
+        'engineio_logger': logging.getLogger('engineio'),
+    }
+
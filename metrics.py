@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Metriken für PhotoBox (Prometheus-Textformat unter /metrics)
+Kleine, abhängigkeitsfreie Registry mit Countern, Gauges und Histogrammen.
+Beide Server (app.py und image_server.py) sind eigene Prozesse und haben
+daher je eine eigene Registry und einen eigenen /metrics-Endpunkt.
+
+Hot Path: observe()/inc() kosten einen Lock und eine Bucket-Suche. Gauges
+für Zustände (Viewer, Warteschlangen, Plattenplatz) werden erst beim Abruf
+von /metrics über einen Callback gelesen und kosten vorher nichts.
+
+Verwendung:
+    CAPTURE_SECONDS = metrics.Histogram('photobox_capture_seconds', 'Aufnahme', ['stage'])
+    CAPTURE_SECONDS.labels('grab').observe(0.05)
+    with CAPTURE_SECONDS.labels('total').time():
+        ...
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Standard-Buckets in Sekunden (wie prometheus_client)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    """Sammlung aller Metriken eines Prozesses"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrik bereits registriert: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        """
+        Alle Metriken im Prometheus-Textformat (Version 0.0.4)
+
+        Returns:
+            str
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        """
+        Args:
+            name: Name der Metrik (z.B. 'photobox_capture_seconds')
+            documentation: Beschreibung für # HELP
+            labelnames: Namen der Labels (wenig verschiedene Werte, z.B. Endpunkt)
+            registry: Ziel-Registry (Standard: REGISTRY)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        (registry or REGISTRY).register(self)
+        if not self.labelnames:
+            self.labels()  # ohne Labels: Sample von Anfang an (Wert 0)
+
+    def labels(self, *values, **labelvalues):
+        """Kind-Metrik für eine Label-Kombination (wird gecacht)"""
+        if labelvalues:
+            values = tuple(str(labelvalues[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: erwartet Labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        """Liefert (Name, Labels, Wert) für alle Kind-Metriken"""
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            labels = tuple(zip(self.labelnames, values))
+            yield from child.samples(self.name, labels)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self._value
+
+
+class Counter(_Metric):
+    """Nur steigender Zähler (z.B. Fehler, Wiederholungen) - Name endet auf _total"""
+    kind = "counter"
+    _new_child = _CounterChild
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._function = None
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Wert erst beim Abruf von /metrics berechnen (kein Aufwand im Hot Path)"""
+        self._function = function
+
+    def samples(self, name, labels):
+        if self._function is None:
+            yield name, labels, self._value
+            return
+        try:
+            value = self._function()
+        except Exception:
+            return  # z.B. Komponente noch nicht initialisiert → Sample weglassen
+        if value is not None:
+            yield name, labels, value
+
+
+class Gauge(_Metric):
+    """Momentaufnahme (z.B. Viewer, Warteschlangenlänge, Plattenplatz)"""
+    kind = "gauge"
+    _new_child = _GaugeChild
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # letzter Eintrag: +Inf
+        self._sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """Dauer des with-Blocks messen (auch bei Exceptions)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float("inf"),), counts):
+            cumulative += count
+            yield f"{name}_bucket", labels + (("le", _format_value(bound)),), cumulative
+        yield f"{name}_sum", labels, total
+        yield f"{name}_count", labels, cumulative
+
+
+class Histogram(_Metric):
+    """Verteilung von Dauern in Sekunden (Buckets kumuliert wie bei Prometheus)"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+# ---------------------------------------------------------------------------
+# Gemeinsame Metriken (von mehreren Modulen benutzt)
+# ---------------------------------------------------------------------------
+
+FAILURES = Counter(
+    'photobox_failures_total',
+    'Fehlgeschlagene Vorgänge je Vorgang (capture, camera_read, ai, print, branding, ...)',
+    ['operation']
+)
+RETRIES = Counter(
+    'photobox_retries_total',
+    'Wiederholungen je Vorgang (camera_init, share_server, Idempotency-Replays je Endpunkt)',
+    ['operation']
+)
+
+
+# ---------------------------------------------------------------------------
+# Flask-Anbindung
+# ---------------------------------------------------------------------------
+
+def install(app, registry=None):
+    """
+    /metrics-Endpunkt und HTTP-Latenz je Endpunkt für eine Flask-App
+
+    Gemessen wird bis die Antwort erzeugt ist - bei Streams (MJPEG, SSE)
+    also bis zum Beginn des Streams, nicht bis zu seinem Ende.
+
+    Args:
+        app: Flask-App
+        registry: Registry (Standard: REGISTRY)
+    """
+    from flask import Response, g, request
+
+    registry = registry or REGISTRY
+    http_seconds = Histogram(
+        'photobox_http_request_duration_seconds',
+        'HTTP-Latenz je Endpunkt (Route-Muster), Methode und Status',
+        ['endpoint', 'method', 'status'],
+        registry=registry
+    )
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_latency(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Route-Muster statt Pfad: /foto/<photo_id> ist ein Endpunkt, nicht tausende
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            http_seconds.labels(endpoint, request.method, response.status_code).observe(
+                time.perf_counter() - started
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """Alle Metriken dieses Prozesses im Prometheus-Textformat"""
+        return Response(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Foto-Katalog für PhotoBox
+Hält alle Fotos aus static/photos im Speicher, sortiert nach Aufnahmezeit.
+Wird von app.py (beim Schreiben) und image_server.py (per inotify bzw.
+Verzeichnis-Polling) aktuell gehalten, damit nicht bei jedem Request
+das ganze Verzeichnis gelesen und jede Datei gestat'et werden muss.
+
+Dateinamen-Konventionen:
+    <uuid>.jpg          Original
+    <uuid>_ai.jpg       AI-Version
+    _print_<name>.jpg   Temporäre Druckdatei (wird ignoriert)
+    .<name>             Temporäre Datei während des Schreibens (wird ignoriert)
+"""
+import bisect
+import logging
+import os
+import threading
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # optional, sonst Verzeichnis-Polling
+    INotify = None
+
+KIND_ORIGINAL = 'original'
+KIND_AI = 'ai'
+
+
+class PhotoEntry:
+    """Ein Foto im Katalog"""
+
+    __slots__ = ('id', 'filename', 'path', 'kind', 'base_id', 'timestamp', 'size')
+
+    def __init__(self, path, timestamp, size):
+        self.path = Path(path)
+        self.filename = self.path.name
+        self.id = self.path.stem
+        self.kind = KIND_AI if self.id.endswith('_ai') else KIND_ORIGINAL
+        self.base_id = self.id.removesuffix('_ai')
+        self.timestamp = timestamp
+        self.size = size
+
+    @property
+    def sort_key(self):
+        return (self.timestamp, self.filename)
+
+    @property
+    def cursor(self):
+        """Cursor für die Paginierung (before/since in /api/photos)"""
+        return f"{self.timestamp!r}:{self.filename}"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'type': self.kind,
+            'base_id': self.base_id,
+            'url': f'/static/photos/{self.filename}',
+            'timestamp': self.timestamp,
+            'size': self.size,
+        }
+
+
+def is_catalog_file(filename):
+    """Gehört die Datei in den Katalog? (nur fertige Fotos, keine Temp-/Druckdateien)"""
+    return (
+        filename.endswith('.jpg')
+        and not filename.startswith('_print_')
+        and not filename.startswith('.')
+    )
+
+
+def parse_cursor(cursor):
+    """
+    Cursor aus PhotoEntry.cursor in einen Sortierschlüssel umwandeln
+
+    Raises:
+        ValueError bei ungültigem Cursor
+    """
+    timestamp, separator, filename = cursor.partition(':')
+    if not separator or not filename:
+        raise ValueError(f"Ungültiger Cursor: {cursor}")
+    return (float(timestamp), filename)
+
+
+class PhotoCatalog:
+    def __init__(self, photo_dir="static/photos", poll_interval=1.0):
+        """
+        Foto-Katalog initialisieren und Verzeichnis einmalig einlesen
+
+        Args:
+            photo_dir: Foto-Verzeichnis
+            poll_interval: Prüfintervall in Sekunden, falls kein inotify verfügbar
+        """
+        self.photo_dir = Path(photo_dir)
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._entries = {}     # Dateiname → PhotoEntry
+        self._ordered = []     # Sortierschlüssel (Zeit, Dateiname), aufsteigend
+        self._ordered_kind = {KIND_ORIGINAL: [], KIND_AI: []}  # dasselbe je Art
+        self._latest = {}      # None/KIND_* → neuester PhotoEntry
+        self.version = 0       # Wird bei jeder Änderung erhöht
+
+        self._watch_thread = None
+        self._stop_event = threading.Event()
+        self._dir_mtime = None
+
+        self.rescan()
+
+    # ------------------------------------------------------------------
+    # Änderungen
+    # ------------------------------------------------------------------
+
+    def add(self, path, timestamp=None, size=None):
+        """
+        Foto aufnehmen oder aktualisieren (nach dem Schreiben aufrufen)
+
+        Args:
+            path: Pfad zum Foto
+            timestamp: Aufnahmezeit (Standard: mtime der Datei)
+            size: Dateigröße in Bytes (Standard: aus stat)
+
+        Returns:
+            PhotoEntry oder None wenn die Datei nicht in den Katalog gehört
+        """
+        path = Path(path)
+        if not is_catalog_file(path.name):
+            return None
+
+        if timestamp is None or size is None:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                return None
+            timestamp = stat.st_mtime if timestamp is None else timestamp
+            size = stat.st_size if size is None else size
+
+        entry = PhotoEntry(path, timestamp, size)
+        with self._lock:
+            existing = self._entries.get(entry.filename)
+            if existing is not None and existing.sort_key == entry.sort_key and existing.size == size:
+                return existing  # z.B. app.py und inotify melden dieselbe Datei
+            self._insert(entry)
+            self._notify()
+        return entry
+
+    def remove(self, path):
+        """
+        Foto aus dem Katalog entfernen (nach dem Löschen aufrufen)
+
+        Returns:
+            PhotoEntry oder None wenn nicht im Katalog
+        """
+        filename = Path(path).name
+        with self._lock:
+            entry = self._discard(filename)
+            if entry is not None:
+                self._notify()
+        return entry
+
+    def rescan(self):
+        """Verzeichnis komplett neu einlesen (Start, Fallback ohne inotify)"""
+        try:
+            self._dir_mtime = self.photo_dir.stat().st_mtime_ns
+            names = {e.name: e for e in os.scandir(self.photo_dir) if is_catalog_file(e.name)}
+        except FileNotFoundError:
+            names = {}
+
+        with self._lock:
+            changed = False
+            for filename in list(self._entries):
+                if filename not in names:
+                    self._discard(filename)
+                    changed = True
+
+            for filename, dir_entry in names.items():
+                if filename in self._entries:
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                self._insert(PhotoEntry(dir_entry.path, stat.st_mtime, stat.st_size))
+                changed = True
+
+            if changed:
+                self._notify()
+
+    def _insert(self, entry):
+        """Eintrag einsortieren (Lock muss gehalten sein)"""
+        self._discard(entry.filename)
+        self._entries[entry.filename] = entry
+        bisect.insort(self._ordered, entry.sort_key)
+        bisect.insort(self._ordered_kind[entry.kind], entry.sort_key)
+
+        for kind in (None, entry.kind):
+            latest = self._latest.get(kind)
+            if latest is None or entry.sort_key > latest.sort_key:
+                self._latest[kind] = entry
+
+    def _discard(self, filename):
+        """Eintrag entfernen (Lock muss gehalten sein)"""
+        entry = self._entries.pop(filename, None)
+        if entry is None:
+            return None
+
+        for keys in (self._ordered, self._ordered_kind[entry.kind]):
+            index = bisect.bisect_left(keys, entry.sort_key)
+            if index < len(keys) and keys[index] == entry.sort_key:
+                del keys[index]
+
+        # Neuesten Eintrag nur neu bestimmen, wenn genau dieser gelöscht wurde
+        for kind in (None, entry.kind):
+            if self._latest.get(kind) is entry:
+                self._latest[kind] = self._find_latest(kind)
+        return entry
+
+    def _find_latest(self, kind):
+        """Neuesten Eintrag einer Art suchen (Lock muss gehalten sein)"""
+        keys = self._ordered if kind is None else self._ordered_kind[kind]
+        if not keys:
+            return None
+        return self._entries[keys[-1][1]]
+
+    def _notify(self):
+        """Wartende über Änderung informieren (Lock muss gehalten sein)"""
+        self.version += 1
+        self._changed.notify_all()
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def latest(self, kind=None):
+        """
+        Neuestes Foto in O(1)
+
+        Args:
+            kind: None (alle), 'original' oder 'ai'
+
+        Returns:
+            PhotoEntry oder None
+        """
+        with self._lock:
+            return self._latest.get(kind)
+
+    def get(self, photo_id):
+        """Foto per ID (Dateiname ohne .jpg) oder None"""
+        with self._lock:
+            return self._entries.get(f"{photo_id}.jpg")
+
+    def list(self, kind=None):
+        """
+        Alle Fotos, neueste zuerst
+
+        Args:
+            kind: None (alle), 'original' oder 'ai'
+
+        Returns:
+            list[PhotoEntry]
+        """
+        with self._lock:
+            keys = self._ordered if kind is None else self._ordered_kind[kind]
+            return [self._entries[filename] for _, filename in reversed(keys)]
+
+    def page(self, kind=None, limit=50, before=None, since=None):
+        """
+        Eine Seite Fotos, neueste zuerst - O(log n + limit), unabhängig von der Archivgröße
+
+        Args:
+            kind: None (alle), 'original' oder 'ai'
+            limit: Maximale Anzahl Einträge
+            before: Sortierschlüssel (parse_cursor) - nur ältere Fotos
+            since: Sortierschlüssel (parse_cursor) - nur neuere Fotos; ohne before
+                   werden die `limit` Fotos direkt nach dem Cursor geliefert
+
+        Returns:
+            tuple: (list[PhotoEntry], has_more)
+        """
+        with self._lock:
+            keys = self._ordered if kind is None else self._ordered_kind[kind]
+            low = bisect.bisect_right(keys, since) if since is not None else 0
+            high = bisect.bisect_left(keys, before) if before is not None else len(keys)
+
+            if since is not None and before is None:
+                start, end = low, min(high, low + limit)
+                has_more = end < high
+            else:
+                start, end = max(low, high - limit), high
+                has_more = start > low
+
+            entries = [self._entries[filename] for _, filename in reversed(keys[start:end])]
+        return entries, has_more
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def wait_for_change(self, version, timeout=None):
+        """
+        Blockiert bis sich der Katalog gegenüber `version` geändert hat
+
+        Returns:
+            int: Aktuelle Version (gleich `version` bei Timeout)
+        """
+        with self._lock:
+            self._changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    # ------------------------------------------------------------------
+    # Verzeichnis beobachten
+    # ------------------------------------------------------------------
+
+    def start_watching(self):
+        """Hintergrund-Thread starten, der Änderungen anderer Prozesse übernimmt"""
+        if self._watch_thread is not None:
+            return
+        target = self._watch_inotify if INotify is not None else self._watch_polling
+        self._watch_thread = threading.Thread(target=target, name="photo-catalog", daemon=True)
+        self._watch_thread.start()
+        mode = "inotify" if INotify is not None else f"Polling alle {self.poll_interval}s"
+        log.info(f"Foto-Katalog beobachtet {self.photo_dir} ({mode})")
+
+    def stop_watching(self):
+        self._stop_event.set()
+
+    def _watch_inotify(self):
+        """Änderungen per inotify übernehmen"""
+        inotify = INotify()
+        watch_flags = (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+                       | inotify_flags.DELETE | inotify_flags.MOVED_FROM)
+        inotify.add_watch(str(self.photo_dir), watch_flags)
+        # Änderungen zwischen erstem Scan und add_watch nicht verpassen
+        self.rescan()
+
+        while not self._stop_event.is_set():
+            for event in inotify.read(timeout=int(self.poll_interval * 1000)):
+                path = self.photo_dir / event.name
+                if event.mask & (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO):
+                    self.add(path)
+                else:
+                    self.remove(path)
+
+    def _watch_polling(self):
+        """Fallback: nur das Verzeichnis stat'en, bei Änderung neu einlesen"""
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                mtime = self.photo_dir.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime != self._dir_mtime:
+                self.rescan()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Print-Cache für PhotoBox
+Rendert die gebrandete Druckversion (1800x1200px) im Hintergrund vor,
+sobald ein Foto oder AI-Ergebnis existiert. Beim Drucken muss dann nur
+noch die fertige Datei an CUPS übergeben werden. Mehrfach-Layouts
+(Fotostreifen, 2-up, Original + AI) werden ebenfalls hier gecacht.
+Der QR-Code der Session fließt in den Cache-Schlüssel ein.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import metrics
+from image_pool import brand_image, compose_layout
+
+log = logging.getLogger(__name__)
+
+BRANDING_SECONDS = metrics.Histogram(
+    'photobox_branding_seconds',
+    'Rendern einer gebrandeten Druckversion je Layout (Cache-Miss, inkl. Worker-Warteschlange)',
+    ['layout']
+)
+
+
+class PrintCache:
+    def __init__(self, branding, cache_dir="static/print_cache", max_workers=2, pool=None,
+                 qr_for=None):
+        """
+        Print-Cache initialisieren
+
+        Args:
+            branding: ImageBranding-Instanz, die das Rendering übernimmt
+            cache_dir: Verzeichnis für die vorgerenderten Druckdateien
+            max_workers: Anzahl paralleler Render-Threads
+            pool: Optionaler ImageWorkerPool - dann läuft das Rendering in
+                  einem Worker-Prozess statt im Thread dieses Prozesses
+            qr_for: Optionaler Callback(Quellpfad) → Pfad zum gecachten QR-Code
+                    der Session oder None (dann statischer QR-Code)
+        """
+        self.branding = branding
+        self.pool = pool
+        self.qr_for = qr_for
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="prerender"
+        )
+        self._lock = threading.Lock()
+        self._pending = {}   # Quellpfad → Future
+        self._entries = {}   # Quellpfad → Menge von Cache-Pfaden
+        self._hashes = {}    # Quellpfad → ((mtime_ns, Größe), SHA1)
+
+        log.info(f"Print-Cache initialisiert: {self.cache_dir}")
+
+    @staticmethod
+    def _hash_file(path):
+        """SHA1 über den Dateiinhalt (Cache-Schlüssel)"""
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _source_hash(self, source):
+        """
+        SHA1 einer Quelldatei, gemerkt bis sich mtime oder Größe ändern
+
+        Beim Drucken wird die Quelle so nicht erneut komplett gelesen.
+        """
+        stat = os.stat(source)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            known = self._hashes.get(source)
+        if known is not None and known[0] == signature:
+            return known[1]
+        digest = self._hash_file(source)
+        with self._lock:
+            self._hashes[source] = (signature, digest)
+        return digest
+
+    def _qr_path(self, source):
+        """Gecachter QR-Code der Session eines Fotos (None = statischer QR-Code)"""
+        if self.qr_for is None:
+            return None
+        try:
+            qr_path = self.qr_for(source)
+        except Exception as e:
+            log.warning(f"QR-Code für {os.path.basename(source)} nicht verfügbar: {e}")
+            return None
+        return str(qr_path) if qr_path else None
+
+    def _single_path(self, source, qr_path):
+        """Cache-Pfad der Einzelbild-Version: Hash der Quelle + QR-Code"""
+        name = self._source_hash(source)
+        if qr_path:
+            name += f"_{Path(qr_path).stem}"
+        return self.cache_dir / f"{name}.jpg"
+
+    def _render(self, source):
+        """Rendert die Druckversion falls noch nicht im Cache vorhanden"""
+        try:
+            qr_path = self._qr_path(source)
+            cache_path = self._single_path(source, qr_path)
+
+            if not cache_path.exists():
+                # Erst in temporäre Datei schreiben, damit nie eine halbe Datei gedruckt wird
+                tmp_path = cache_path.with_name(f".{cache_path.stem}.{threading.get_ident()}.tmp.jpg")
+                try:
+                    with self._measure('single'):
+                        if self.pool is not None:
+                            self.pool.run(brand_image, source, str(tmp_path), qr_path)
+                        else:
+                            self.branding.add_branding(source, str(tmp_path), qr_path)
+                except Exception:
+                    tmp_path.unlink(missing_ok=True)
+                    raise
+                os.replace(tmp_path, cache_path)
+                log.debug(f"Druckversion vorgerendert: {cache_path.name}")
+        finally:
+            # Auch nach einem Fehler (Pool voll, Timeout): eine fehlgeschlagene Future
+            # bliebe sonst stehen, und get()/submit() würden nie neu rendern
+            with self._lock:
+                self._pending.pop(source, None)
+        self._register([source], cache_path)
+
+        return str(cache_path)
+
+    @contextmanager
+    def _measure(self, layout):
+        """Renderzeit verbuchen, Fehlschläge zählen"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            metrics.FAILURES.labels('branding').inc()
+            raise
+        BRANDING_SECONDS.labels(layout).observe(time.perf_counter() - started)
+
+    def _register(self, sources, cache_path):
+        """Verknüpft eine Cache-Datei mit ihren Quellfotos"""
+        with self._lock:
+            # Foto wurde während des Renderns gelöscht → Eintrag nicht behalten
+            if all(os.path.exists(source) for source in sources):
+                for source in sources:
+                    self._entries.setdefault(source, set()).add(cache_path)
+                return
+            still_used = self._in_use(cache_path)
+
+        if not still_used:
+            cache_path.unlink(missing_ok=True)
+
+    def _in_use(self, cache_path):
+        """Prüft ob noch ein Foto auf die Cache-Datei verweist (Lock muss gehalten sein)"""
+        return any(cache_path in paths for paths in self._entries.values())
+
+    def submit(self, image_path):
+        """
+        Startet das Vorrendern im Hintergrund
+
+        Args:
+            image_path: Pfad zum Foto oder AI-Ergebnis
+
+        Returns:
+            Future mit dem Pfad zur Druckversion
+        """
+        source = str(image_path)
+        with self._lock:
+            future = self._pending.get(source)
+            if future is None:
+                future = self._executor.submit(self._render, source)
+                self._pending[source] = future
+        return future
+
+    def get(self, image_path, timeout=60):
+        """
+        Liefert die Druckversion eines Fotos
+
+        Wartet auf ein laufendes Vorrendern, rendert bei einem Cache-Miss
+        synchron.
+
+        Args:
+            image_path: Pfad zum Foto
+            timeout: Maximale Wartezeit auf ein laufendes Rendering (Sekunden)
+
+        Returns:
+            str: Pfad zur gebrandeten Druckdatei
+        """
+        source = str(image_path)
+        with self._lock:
+            future = self._pending.get(source)
+
+        if future is not None:
+            return future.result(timeout=timeout)
+
+        # Einzelbild-Version liegt unter dem Hash der Quelle (+ QR-Code)
+        cache_path = self._single_path(source, self._qr_path(source))
+        if cache_path.exists():
+            self._register([source], cache_path)
+            return str(cache_path)
+
+        return self._render(source)
+
+    def get_layout(self, image_paths, layout):
+        """
+        Liefert einen Druckbogen mit mehreren Fotos (rendert bei Cache-Miss)
+
+        Args:
+            image_paths: Liste der Bildpfade in Layout-Reihenfolge
+            layout: Name des Layouts (siehe image_branding.LAYOUTS)
+
+        Returns:
+            str: Pfad zum gebrandeten Druckbogen
+        """
+        if layout == 'single':
+            return self.get(image_paths[0])
+
+        sources = [str(path) for path in image_paths]
+        qr_path = self._qr_path(sources[0])
+        key = hashlib.sha1(layout.encode())
+        for source in sources:
+            key.update(self._source_hash(source).encode())
+        if qr_path:
+            key.update(Path(qr_path).stem.encode())
+        cache_path = self.cache_dir / f"{key.hexdigest()}.jpg"
+
+        if not cache_path.exists():
+            tmp_path = cache_path.with_name(f".{cache_path.stem}.{threading.get_ident()}.tmp.jpg")
+            with self._measure(layout):
+                if self.pool is not None:
+                    self.pool.run(compose_layout, sources, layout, str(tmp_path), qr_path)
+                else:
+                    self.branding.compose_layout(sources, layout, str(tmp_path), qr_path)
+            os.replace(tmp_path, cache_path)
+
+        self._register(sources, cache_path)
+        return str(cache_path)
+
+    def evict(self, image_path):
+        """
+        Entfernt den Cache-Eintrag eines Fotos (z.B. wenn das Foto gelöscht wird)
+
+        Args:
+            image_path: Pfad zum Foto
+        """
+        source = str(image_path)
+        with self._lock:
+            future = self._pending.pop(source, None)
+            cache_paths = self._entries.pop(source, set())
+            self._hashes.pop(source, None)
+            unused = [path for path in cache_paths if not self._in_use(path)]
+
+        if future is not None:
+            future.cancel()
+
+        for cache_path in unused:
+            cache_path.unlink(missing_ok=True)
+
+    def pending(self):
+        """Anzahl laufender/wartender Vorrender-Aufträge"""
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self):
+        """Hintergrund-Threads beenden"""
+        self._executor.shutdown(wait=False)
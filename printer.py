@@ -3,31 +3,52 @@
 Canon SELPHY CP1500 Printer Integration für PhotoBox
 MIT automatischem Branding (Logo + QR-Code)
 """
+import logging
 import subprocess
 import os
+import time
 from PIL import Image
 from pathlib import Path
 from image_branding import ImageBranding
+from print_cache import PrintCache
+from printer_backend import CupsBackend
+import metrics
+import tracing
+
+log = logging.getLogger(__name__)
+
+PRINT_SUBMIT_SECONDS = metrics.Histogram(
+    'photobox_print_submit_seconds',
+    'Übergabe einer fertigen Druckdatei an das Drucker-Backend (lp)'
+)
 
 class Printer:
-    def __init__(self, printer_name="Canon_SELPHY_CP1500", enable_branding=True):
+    def __init__(self, printer_name="Canon_SELPHY_CP1500", enable_branding=True, backend=None,
+                 image_pool=None, qr_for=None):
         """
         Drucker initialisieren
         
         Args:
             printer_name: Name des Druckers in CUPS (Standard: Canon_SELPHY_CP1500)
             enable_branding: Logo + QR-Code automatisch hinzufügen
+            backend: PrinterBackend (Standard: CupsBackend, für Benchmarks SimulatedBackend)
+            image_pool: Optionaler ImageWorkerPool für das Branding-Rendering
+            qr_for: Optionaler Callback(Bildpfad) → gecachter QR-Code der Session
+                    (ohne: statischer QR-Code auf jedem Druck)
         """
         self.printer_name = printer_name
         self.enable_branding = enable_branding
+        self.backend = backend or CupsBackend(printer_name)
+        self.print_cache = None
         
         # Branding-Modul initialisieren
         if self.enable_branding:
             try:
                 self.branding = ImageBranding()
-                print(f"✓ Branding aktiviert (Logo + QR-Code)")
+                self.print_cache = PrintCache(self.branding, pool=image_pool, qr_for=qr_for)
+                log.info("Branding aktiviert (Logo + QR-Code)")
             except Exception as e:
-                print(f"⚠ Warnung: Branding konnte nicht geladen werden: {e}")
+                log.warning(f"Branding konnte nicht geladen werden: {e}")
                 self.enable_branding = False
         
         self._check_printer_available()
@@ -35,23 +56,37 @@ class Printer:
     def _check_printer_available(self):
         """Prüft ob Drucker verfügbar ist"""
         try:
-            result = subprocess.run(
-                ['lpstat', '-p', self.printer_name],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                print(f"✓ Drucker '{self.printer_name}' gefunden und bereit")
+            if self.backend.status()['available']:
+                log.info(f"Drucker '{self.printer_name}' gefunden und bereit")
                 return True
             else:
-                print(f"⚠ Warnung: Drucker '{self.printer_name}' nicht gefunden")
+                log.warning(f"Drucker '{self.printer_name}' nicht gefunden")
                 return False
         except Exception as e:
-            print(f"⚠ Warnung: Drucker-Status konnte nicht geprüft werden: {e}")
+            log.warning(f"Drucker-Status konnte nicht geprüft werden: {e}")
             return False
     
-    def print_image(self, image_path, media="photo-4x6", fit_to_page=True):
+    def prerender(self, image_path):
+        """
+        Startet das Vorrendern der gebrandeten Druckversion im Hintergrund
+        
+        Args:
+            image_path: Pfad zum Foto oder AI-Ergebnis
+        """
+        if self.enable_branding and self.print_cache is not None:
+            self.print_cache.submit(image_path)
+    
+    def evict(self, image_path):
+        """
+        Entfernt die vorgerenderte Druckversion eines gelöschten Fotos
+        
+        Args:
+            image_path: Pfad zum Foto
+        """
+        if self.print_cache is not None:
+            self.print_cache.evict(image_path)
+    
+    def print_image(self, image_path, media="photo-4x6", fit_to_page=True, trace_id=None):
         """
         Druckt ein Bild auf dem Canon SELPHY CP1500
         WICHTIG: Fügt automatisch Logo + QR-Code hinzu!
@@ -60,6 +95,7 @@ class Printer:
             image_path: Pfad zum Bild
             media: Papierformat (z.B. "photo-4x6", "postcard")
             fit_to_page: Bild an Seite anpassen
+            trace_id: Trace der Session (Spans 'print_render' und 'print_submit')
             
         Returns:
             dict: {'success': bool, 'message': str, 'job_id': str oder None}
@@ -72,32 +108,110 @@ class Printer:
                 'job_id': None
             }
         
-        # Bild-Info laden
-        try:
-            img = Image.open(image_path)
-            print(f"Drucke Bild: {os.path.basename(image_path)} ({img.size[0]}x{img.size[1]}px)")
-        except Exception as e:
-            print(f"Warnung: Bild konnte nicht geladen werden: {e}")
+        # Bild-Info nur fürs Debug-Log laden (Image.open liest den Header)
+        if log.isEnabledFor(logging.DEBUG):
+            try:
+                img = Image.open(image_path)
+                log.debug(f"Drucke Bild: {os.path.basename(image_path)} ({img.size[0]}x{img.size[1]}px)")
+            except Exception as e:
+                log.warning(f"Bild konnte nicht geladen werden: {e}")
         
         # BRANDING HINZUFÜGEN (falls aktiviert)
         print_path = image_path
         
         if self.enable_branding:
             try:
-                # Temporäre Kopie mit Branding erstellen
-                branded_path = str(Path(image_path).parent / f"_print_{Path(image_path).name}")
-                
-                print(f"\n🎨 Füge Branding hinzu...")
-                self.branding.add_branding(image_path, branded_path)
-                
-                # Diese gebrandete Version drucken
-                print_path = branded_path
-                print(f"✓ Branding erfolgreich hinzugefügt")
+                # Vorgerenderte Druckversion aus dem Cache holen
+                # (rendert synchron, falls noch nicht vorhanden)
+                with tracing.tracer.span(trace_id, 'print_render', layout='single'):
+                    print_path = self.print_cache.get(image_path)
+                log.debug(f"Gebrandete Druckversion bereit: {os.path.basename(print_path)}")
                 
             except Exception as e:
-                print(f"⚠ Warnung: Branding fehlgeschlagen, drucke Original: {e}")
+                log.warning(f"Branding fehlgeschlagen, drucke Original: {e}", extra={'trace_id': trace_id})
                 print_path = image_path
         
+        return self._submit(print_path, media, fit_to_page, trace_id)
+    
+    def print_layout(self, image_paths, layout, media="photo-4x6", fit_to_page=True, trace_id=None):
+        """
+        Druckt mehrere Fotos auf einem Bogen (Fotostreifen, 2-up, Original + AI)
+        
+        Args:
+            image_paths: Liste der Bildpfade in Layout-Reihenfolge
+            layout: Name des Layouts (siehe image_branding.LAYOUTS)
+            media: Papierformat (z.B. "photo-4x6", "postcard")
+            fit_to_page: Bild an Seite anpassen
+            trace_id: Trace der Session (Spans 'print_render' und 'print_submit')
+            
+        Returns:
+            dict: {'success': bool, 'message': str, 'job_id': str oder None}
+        """
+        if layout == 'single':
+            return self.print_image(image_paths[0], media, fit_to_page, trace_id)
+        
+        missing = [path for path in image_paths if not os.path.exists(path)]
+        if missing:
+            return {
+                'success': False,
+                'message': f"Datei '{missing[0]}' nicht gefunden",
+                'job_id': None
+            }
+        
+        if not self.enable_branding:
+            return {
+                'success': False,
+                'message': f"Layout '{layout}' benötigt aktiviertes Branding",
+                'job_id': None
+            }
+        
+        try:
+            with tracing.tracer.span(trace_id, 'print_render', layout=layout):
+                print_path = self.print_cache.get_layout(image_paths, layout)
+            log.debug(f"Druckbogen '{layout}' bereit: {os.path.basename(print_path)}")
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e),
+                'job_id': None
+            }
+        except Exception as e:
+            log.error(f"Layout fehlgeschlagen: {e}", extra={'trace_id': trace_id, 'stage': 'print_render'})
+            return {
+                'success': False,
+                'message': f'Layout fehlgeschlagen: {str(e)}',
+                'job_id': None
+            }
+        
+        return self._submit(print_path, media, fit_to_page, trace_id)
+    
+    def _submit(self, print_path, media, fit_to_page, trace_id=None):
+        """
+        Übergibt eine fertige Druckdatei an das Drucker-Backend
+        
+        Args:
+            print_path: Pfad zur (gebrandeten) Druckdatei
+            media: Papierformat
+            fit_to_page: Bild an Seite anpassen
+            trace_id: Trace der Session (Span 'print_submit')
+            
+        Returns:
+            dict: {'success': bool, 'message': str, 'job_id': str oder None}
+        """
+        # Der Trace endet hier - wann der Drucker fertig ist, meldet CUPS nicht zurück
+        started = time.perf_counter()
+        with tracing.tracer.span(trace_id, 'print_submit') as span:
+            result = self._send(print_path, media, fit_to_page)
+            if not result['success']:
+                span['status'] = 'error'
+        if result['success']:
+            log.info(f"Druckauftrag gesendet, Job-ID: {result['job_id']}",
+                     extra={'trace_id': trace_id, 'stage': 'print_submit',
+                            'duration_ms': round((time.perf_counter() - started) * 1000, 1)})
+        return result
+    
+    def _send(self, print_path, media, fit_to_page):
+        """Druckauftrag an das Backend übergeben (ohne Tracing)"""
         # Druckoptionen zusammenstellen
         options = []
         if media:
@@ -105,31 +219,11 @@ class Printer:
         if fit_to_page:
             options.extend(['-o', 'fit-to-page'])
         
-        # Druckbefehl ausführen
+        # Druckauftrag übergeben
+        started = time.perf_counter()
         try:
-            cmd = ['lp', '-d', self.printer_name] + options + [print_path]
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=10
-            )
-            
-            # Job-ID aus Ausgabe extrahieren
-            job_id = None
-            if "request id is" in result.stdout:
-                job_id = result.stdout.split("request id is")[-1].strip()
-            
-            print(f"✓ Druckauftrag erfolgreich gesendet! Job-ID: {job_id}")
-            
-            # Temporäre gebrandete Datei löschen
-            if self.enable_branding and print_path != image_path:
-                try:
-                    os.remove(print_path)
-                    print(f"✓ Temporäre Druckdatei gelöscht")
-                except:
-                    pass
+            job_id = self.backend.submit(print_path, options)
+            PRINT_SUBMIT_SECONDS.observe(time.perf_counter() - started)
             
             return {
                 'success': True,
@@ -138,6 +232,7 @@ class Printer:
             }
             
         except subprocess.TimeoutExpired:
+            metrics.FAILURES.labels('print').inc()
             return {
                 'success': False,
                 'message': 'Druckbefehl hat zu lange gedauert (Timeout)',
@@ -145,14 +240,16 @@ class Printer:
             }
         except subprocess.CalledProcessError as e:
             error_msg = e.stderr if e.stderr else str(e)
-            print(f"✗ Druckfehler: {error_msg}")
+            log.error(f"Druckfehler: {error_msg}")
+            metrics.FAILURES.labels('print').inc()
             return {
                 'success': False,
                 'message': f'Druckfehler: {error_msg}',
                 'job_id': None
             }
         except Exception as e:
-            print(f"✗ Unerwarteter Fehler: {e}")
+            log.exception(f"Unerwarteter Fehler beim Drucken: {e}")
+            metrics.FAILURES.labels('print').inc()
             return {
                 'success': False,
                 'message': f'Unerwarteter Fehler: {str(e)}',
@@ -167,30 +264,7 @@ class Printer:
             dict: {'available': bool, 'status': str}
         """
         try:
-            result = subprocess.run(
-                ['lpstat', '-p', self.printer_name],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode == 0:
-                # Status-Text parsen
-                status_text = result.stdout.strip()
-                is_idle = 'idle' in status_text.lower()
-                
-                return {
-                    'available': True,
-                    'status': 'Bereit' if is_idle else 'Beschäftigt',
-                    'details': status_text
-                }
-            else:
-                return {
-                    'available': False,
-                    'status': 'Nicht verfügbar',
-                    'details': result.stderr
-                }
-                
+            return self.backend.status()
         except Exception as e:
             return {
                 'available': False,
@@ -209,13 +283,7 @@ class Printer:
             dict: {'success': bool, 'message': str}
         """
         try:
-            subprocess.run(
-                ['cancel', job_id],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=5
-            )
+            self.backend.cancel(job_id)
             return {
                 'success': True,
                 'message': f'Druckauftrag {job_id} abgebrochen'
@@ -229,6 +297,7 @@ class Printer:
 
 # Test-Funktion
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     printer = Printer()
     
     # Status prüfen
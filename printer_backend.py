@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Drucker-Backends für PhotoBox
+CupsBackend spricht über lp/lpstat/cancel mit CUPS,
+SimulatedBackend bildet Spool- und Druckzeit nach (Benchmarks ohne Drucker)
+"""
+import itertools
+import subprocess
+import threading
+import time
+
+
+class PrinterBackend:
+    """Schnittstelle, die Printer von einem Backend erwartet"""
+
+    name = "base"
+
+    def submit(self, print_path, options):
+        """
+        Druckauftrag übergeben
+
+        Args:
+            print_path: Pfad zur fertigen Druckdatei
+            options: Liste von lp-Optionen (z.B. ['-o', 'media=photo-4x6'])
+
+        Returns:
+            str: Job-ID oder None
+
+        Raises:
+            subprocess.TimeoutExpired, subprocess.CalledProcessError
+        """
+        raise NotImplementedError
+
+    def status(self):
+        """
+        Drucker-Status abfragen
+
+        Returns:
+            dict: {'available': bool, 'status': str, 'details': str}
+        """
+        raise NotImplementedError
+
+    def cancel(self, job_id):
+        """
+        Druckauftrag abbrechen
+
+        Raises:
+            Exception wenn der Auftrag nicht abgebrochen werden konnte
+        """
+        raise NotImplementedError
+
+
+class CupsBackend(PrinterBackend):
+    """Echter Drucker über die CUPS-Kommandozeilentools"""
+
+    name = "cups"
+
+    def __init__(self, printer_name):
+        self.printer_name = printer_name
+
+    def submit(self, print_path, options):
+        cmd = ['lp', '-d', self.printer_name] + options + [print_path]
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=10
+        )
+
+        # Job-ID aus Ausgabe extrahieren
+        job_id = None
+        if "request id is" in result.stdout:
+            job_id = result.stdout.split("request id is")[-1].strip()
+        return job_id
+
+    def status(self):
+        result = subprocess.run(
+            ['lpstat', '-p', self.printer_name],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+
+        if result.returncode == 0:
+            # Status-Text parsen
+            status_text = result.stdout.strip()
+            is_idle = 'idle' in status_text.lower()
+
+            return {
+                'available': True,
+                'status': 'Bereit' if is_idle else 'Beschäftigt',
+                'details': status_text
+            }
+        else:
+            return {
+                'available': False,
+                'status': 'Nicht verfügbar',
+                'details': result.stderr
+            }
+
+    def cancel(self, job_id):
+        subprocess.run(
+            ['cancel', job_id],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5
+        )
+
+
+class SimulatedBackend(PrinterBackend):
+    """
+    Simulierter Drucker
+
+    Jeder Auftrag blockiert submit() für die Spool-Zeit (wie lp) und
+    belegt den Drucker danach für print_time Sekunden. Aufträge werden
+    nacheinander abgearbeitet, die Warteschlange wird rein rechnerisch
+    geführt - es wird nicht real auf den Druck gewartet.
+    """
+
+    name = "simulated"
+
+    def __init__(self, printer_name="Simulated_SELPHY", spool_time=0.5, print_time=60.0):
+        """
+        Args:
+            printer_name: Anzeigename des simulierten Druckers
+            spool_time: Dauer von submit() in Sekunden (lp + Spooler)
+            print_time: Druckzeit pro Bogen in Sekunden (SELPHY CP1500: ca. 60s)
+        """
+        self.printer_name = printer_name
+        self.spool_time = spool_time
+        self.print_time = print_time
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}           # Job-ID → Job-Info
+        self._busy_until = 0.0    # Zeitpunkt, an dem der letzte Auftrag fertig ist
+
+    def submit(self, print_path, options):
+        time.sleep(self.spool_time)
+
+        with self._lock:
+            job_id = f"{self.printer_name}-{next(self._ids)}"
+            queued_at = time.time()
+            started_at = max(queued_at, self._busy_until)
+            finished_at = started_at + self.print_time
+            self._busy_until = finished_at
+            self._jobs[job_id] = {
+                'path': print_path,
+                'options': list(options),
+                'queued_at': queued_at,
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'queue_wait': started_at - queued_at,
+            }
+        return job_id
+
+    def job_info(self, job_id):
+        """Zeitstempel eines simulierten Auftrags"""
+        with self._lock:
+            return dict(self._jobs[job_id])
+
+    def status(self):
+        with self._lock:
+            now = time.time()
+            pending = sum(1 for job in self._jobs.values() if job['finished_at'] > now)
+
+        return {
+            'available': True,
+            'status': 'Beschäftigt' if pending else 'Bereit',
+            'details': f"printer {self.printer_name} (simuliert), {pending} Auftrag/Aufträge in der Warteschlange"
+        }
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['finished_at'] <= time.time():
+                raise ValueError(f"Auftrag {job_id} nicht in der Warteschlange")
+
+            # Nachfolgende Aufträge rücken um die freigewordene Druckzeit auf
+            freed = job['finished_at'] - max(job['started_at'], time.time())
+            del self._jobs[job_id]
+            for other in self._jobs.values():
+                if other['started_at'] >= job['started_at']:
+                    other['started_at'] -= freed
+                    other['finished_at'] -= freed
+                    other['queue_wait'] = other['started_at'] - other['queued_at']
+            self._busy_until -= freed
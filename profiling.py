@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Profiling einzelner Requests für PhotoBox (cProfile, pstats-Dateien je Endpunkt)
+Für beide Flask-Apps: wird ein Endpunkt bei der Veranstaltung langsam, zeigt
+das Profil, wo in Python die Zeit bleibt.
+
+Einschalten:
+    PHOTOBOX_PROFILE=/api/capture,/api/print/<photo_id>,/bild   Route-Muster (oder *)
+    PHOTOBOX_PROFILE_RATE=0.1       Anteil der Requests dieser Endpunkte (Standard: 0.1)
+    Header "X-Profile: 1"           profiliert genau diesen Request - nur von localhost
+
+Ablage: PHOTOBOX_PROFILE_DIR (Standard: logs/profiles)/<endpunkt>/<zeit>_<ms>ms.pstats
+Auswerten:
+    python3 profiling.py summary --endpoint /api/capture
+    snakeviz logs/profiles/api_capture/<datei>.pstats
+
+Ausgeschaltet (PHOTOBOX_PROFILE leer und PHOTOBOX_PROFILE_HEADER=0) werden
+keine Hooks registriert - null Overhead. Mit Header-Freigabe (Standard)
+kostet jeder Request nur einen Header-Lookup.
+
+Es läuft höchstens ein Profil gleichzeitig. Im gevent-Modus enthält das
+Profil auch Greenlets, die während des Requests auf demselben Thread laufen.
+Bei Streams (MJPEG, SSE) endet das Profil mit dem Beginn des Streams.
+"""
+import argparse
+import cProfile
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_DIR = Path(os.environ.get("PHOTOBOX_PROFILE_DIR", "logs/profiles"))
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+log = logging.getLogger(__name__)
+
+
+def configured_endpoints():
+    """
+    Zu profilierende Route-Muster aus PHOTOBOX_PROFILE
+
+    Returns:
+        set: Route-Muster ('*' = alle), leer wenn ausgeschaltet
+    """
+    return {rule.strip() for rule in os.environ.get("PHOTOBOX_PROFILE", "").split(",") if rule.strip()}
+
+
+def endpoint_slug(rule):
+    """Route-Muster als Verzeichnisname (/api/print/<photo_id> → api_print_photo_id)"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', rule).strip('_') or 'root'
+
+
+class RequestProfiler:
+    def __init__(self, endpoints=(), rate=0.1, allow_header=True, profile_dir=PROFILE_DIR):
+        """
+        Profiler für ausgewählte Requests
+
+        Args:
+            endpoints: Route-Muster, deren Requests mit rate profiliert werden ('*' = alle)
+            rate: Anteil der Requests (0..1)
+            allow_header: Header X-Profile von localhost erzwingt ein Profil
+            profile_dir: Zielverzeichnis (Unterverzeichnis je Endpunkt)
+        """
+        self.endpoints = set(endpoints)
+        self.rate = rate
+        self.allow_header = allow_header
+        self.profile_dir = Path(profile_dir)
+        self._busy = threading.Lock()  # cProfile: ein aktives Profil pro Prozess
+
+    @property
+    def enabled(self):
+        return bool(self.endpoints) or self.allow_header
+
+    def wants(self, rule, headers, remote_addr):
+        """
+        Soll dieser Request profiliert werden?
+
+        Args:
+            rule: Route-Muster des Requests (None wenn keine Route passt)
+            headers: Request-Header
+            remote_addr: Client-Adresse
+
+        Returns:
+            bool
+        """
+        if self.allow_header and headers.get(PROFILE_HEADER) == '1' and remote_addr in LOCAL_ADDRESSES:
+            return True
+        if rule is None or not self.endpoints:
+            return False
+        if '*' not in self.endpoints and rule not in self.endpoints:
+            return False
+        return random.random() < self.rate
+
+    def start(self):
+        """
+        Profil starten (None, wenn gerade ein anderer Request profiliert wird)
+
+        Returns:
+            cProfile.Profile oder None
+        """
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Anderes Profiling-Werkzeug aktiv (z.B. Debugger)
+            self._busy.release()
+            return None
+        return profiler
+
+    def stop(self, profiler, rule, duration):
+        """
+        Profil beenden und den Zielpfad festlegen (geschrieben wird mit write())
+
+        Returns:
+            Path: Ziel der pstats-Datei
+        """
+        profiler.disable()
+        self._busy.release()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return self.profile_dir / endpoint_slug(rule or 'unmatched') / f"{stamp}_{duration * 1000:.0f}ms.pstats"
+
+    def write(self, profiler, path):
+        """pstats-Datei schreiben (Fehler verhindern nie eine Antwort)"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(path))
+        except OSError as e:
+            log.warning(f"Profil nicht schreibbar: {e}")
+
+
+def install(app, profiler=None):
+    """
+    Profiling-Hooks für eine Flask-App registrieren (nur wenn eingeschaltet)
+
+    Args:
+        app: Flask-App
+        profiler: RequestProfiler (Standard: aus PHOTOBOX_PROFILE*)
+
+    Returns:
+        RequestProfiler oder None wenn ausgeschaltet
+    """
+    if profiler is None:
+        profiler = RequestProfiler(
+            endpoints=configured_endpoints(),
+            rate=float(os.environ.get("PHOTOBOX_PROFILE_RATE", "0.1")),
+            allow_header=os.environ.get("PHOTOBOX_PROFILE_HEADER", "1") != "0"
+        )
+    if not profiler.enabled:
+        return None
+
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        if profiler.wants(rule, request.headers, request.remote_addr):
+            g.profile = profiler.start()
+            g.profile_started = time.perf_counter()
+
+    @app.after_request
+    def _stop_profile(response):
+        active = g.pop('profile', None)
+        if active is None:
+            return response
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        path = profiler.stop(active, rule, time.perf_counter() - g.pop('profile_started'))
+        # Im Hintergrund schreiben - der profilierte Request wartet nicht auf die Platte
+        # (call_on_close greift bei send_file/direct_passthrough nicht)
+        threading.Thread(target=profiler.write, args=(active, path), name="profile-writer", daemon=True).start()
+        response.headers['X-Profile-File'] = str(path)
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exc):
+        # Exception ohne after_request: Profil trotzdem beenden
+        active = g.pop('profile', None)
+        if active is not None:
+            profiler.stop(active, None, 0)
+
+    if profiler.endpoints:
+        log.info(f"Profiling aktiv: {', '.join(sorted(profiler.endpoints))} "
+                 f"({profiler.rate:.0%} der Requests) → {profiler.profile_dir}")
+    return profiler
+
+
+# ---------------------------------------------------------------------------
+# Auswertung
+# ---------------------------------------------------------------------------
+
+def profile_files(profile_dir=PROFILE_DIR, endpoint=None):
+    """
+    pstats-Dateien je Endpunkt
+
+    Args:
+        profile_dir: Ablageverzeichnis
+        endpoint: Nur dieser Endpunkt (Route-Muster oder Verzeichnisname)
+
+    Returns:
+        dict: Verzeichnisname → Liste der Dateien (älteste zuerst)
+    """
+    profile_dir = Path(profile_dir)
+    if not profile_dir.is_dir():
+        return {}
+    wanted = endpoint_slug(endpoint) if endpoint else None
+    files = {}
+    for directory in sorted(profile_dir.iterdir()):
+        if directory.is_dir() and (wanted is None or directory.name == wanted):
+            found = sorted(directory.glob("*.pstats"))
+            if found:
+                files[directory.name] = found
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PhotoBox-Request-Profile auswerten")
+    parser.add_argument('--dir', default=str(PROFILE_DIR), help="Ablageverzeichnis der Profile")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    summary = commands.add_parser('summary', help="Profile je Endpunkt zusammenfassen")
+    summary.add_argument('--endpoint', help="Nur dieser Endpunkt, z.B. /api/capture")
+    summary.add_argument('--sort', default='cumulative', help="pstats-Sortierung (cumulative, tottime, ncalls)")
+    summary.add_argument('--top', type=int, default=25, help="Anzahl Funktionen je Endpunkt")
+    summary.add_argument('--last', type=int, help="Nur die letzten N Profile je Endpunkt")
+
+    commands.add_parser('list', help="Anzahl Profile je Endpunkt")
+
+    args = parser.parse_args()
+    files = profile_files(args.dir, getattr(args, 'endpoint', None))
+    if not files:
+        print(f"❌ Keine Profile gefunden in {args.dir}")
+        sys.exit(1)
+
+    if args.command == 'list':
+        for name, paths in files.items():
+            print(f"{name:<30}{len(paths):>6} Profile   letztes: {paths[-1].name}")
+        return
+
+    for name, paths in files.items():
+        if args.last:
+            paths = paths[-args.last:]
+        print("=" * 60)
+        print(f"🔎 {name}: {len(paths)} Profile")
+        print("=" * 60)
+        stats = pstats.Stats(str(paths[0]))
+        for path in paths[1:]:
+            stats.add(str(path))
+        stats.strip_dirs().sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
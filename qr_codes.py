@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+QR-Codes für PhotoBox
+Jede Session (Original + AI-Version) bekommt eine eigene Share-URL auf dem
+Image-Share-Server. Der QR-Code dazu wird einmal bei der Aufnahme gerendert
+und als PNG gecacht - Branding und Kiosk-Oberfläche verwenden nur noch die
+fertige Datei.
+
+Benötigt das Paket 'qrcode'. Ohne das Paket liefert ensure() None und das
+Branding fällt auf den statischen QR-Code zurück.
+"""
+import logging
+import os
+import socket
+import threading
+from pathlib import Path
+
+from session_store import session_id_for
+
+log = logging.getLogger(__name__)
+
+try:
+    import qrcode
+    from qrcode.constants import ERROR_CORRECT_M
+except ImportError:
+    qrcode = None
+
+
+def local_share_url(port=8080):
+    """
+    Basis-URL des Share-Servers aus der IP im lokalen Netz
+
+    Der UDP-connect() sendet nichts, er wählt nur das Interface mit der
+    Standardroute aus.
+
+    Returns:
+        str: z.B. 'http://192.168.1.20:8080'
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.connect(("10.255.255.255", 1))
+        ip = sock.getsockname()[0]
+    except OSError:
+        ip = "127.0.0.1"
+    finally:
+        sock.close()
+    return f"http://{ip}:{port}"
+
+
+class QRCodeCache:
+    def __init__(self, qr_dir="static/qr", base_url=None):
+        """
+        QR-Code-Cache initialisieren
+
+        Args:
+            qr_dir: Verzeichnis für die gerenderten QR-Codes
+            base_url: Basis-URL des Share-Servers (Standard: PHOTOBOX_SHARE_URL
+                      oder http://<lokale IP>:8080)
+        """
+        self.qr_dir = Path(qr_dir)
+        self.qr_dir.mkdir(parents=True, exist_ok=True)
+        self.base_url = (base_url or os.environ.get("PHOTOBOX_SHARE_URL") or local_share_url()).rstrip('/')
+        self.available = qrcode is not None
+        self._lock = threading.Lock()
+
+        log.info(f"QR-Codes: {self.base_url}/p/<id>")
+        if not self.available:
+            log.warning("'qrcode' nicht installiert - Drucke verwenden den statischen QR-Code "
+                        "(installieren mit: pip3 install qrcode[pil])")
+
+    def share_url(self, photo_id):
+        """Share-URL der Session eines Fotos (Original und AI teilen sich eine Seite)"""
+        return f"{self.base_url}/p/{session_id_for(photo_id)}"
+
+    def path_for(self, photo_id):
+        """Pfad des QR-Codes einer Session"""
+        return self.qr_dir / f"{session_id_for(photo_id)}.png"
+
+    def get(self, photo_id):
+        """
+        Gecachten QR-Code liefern, ohne zu rendern
+
+        Returns:
+            Path oder None
+        """
+        path = self.path_for(photo_id)
+        return path if path.exists() else None
+
+    def ensure(self, photo_id):
+        """
+        QR-Code rendern, falls noch nicht im Cache
+
+        Args:
+            photo_id: ID des Fotos (oder der AI-Version)
+
+        Returns:
+            Path zum PNG oder None wenn 'qrcode' fehlt
+        """
+        path = self.path_for(photo_id)
+        if path.exists():
+            return path
+        if not self.available:
+            return None
+
+        with self._lock:
+            if path.exists():
+                return path
+            qr = qrcode.QRCode(error_correction=ERROR_CORRECT_M, box_size=10, border=2)
+            qr.add_data(self.share_url(photo_id))
+            qr.make(fit=True)
+            image = qr.make_image(fill_color="black", back_color="white")
+
+            # Über Temp-Datei schreiben, damit das Branding nie ein halbes PNG liest
+            tmp_path = path.with_name(f".{path.name}")
+            image.save(tmp_path, "PNG")
+            os.replace(tmp_path, path)
+        return path
+
+    def remove(self, photo_id):
+        """QR-Code einer gelöschten Session entfernen"""
+        self.path_for(photo_id).unlink(missing_ok=True)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Retention-Engine für PhotoBox
+Hält den Speicherplatz auf der Jetson-SSD im Rahmen: löscht Fotos nach
+Alter, Speicher-Quota und freiem Platz. Die Reihenfolge richtet sich
+danach, was sich am leichtesten wiederherstellen lässt:
+
+    1. Druckversionen (jederzeit neu renderbar)
+    2. Derivate (aus dem Original neu erzeugbar)
+    3. Originale, am längsten nicht abgerufene zuerst (LRU)
+    4. AI-Ergebnisse (teuer in der Erzeugung, werden länger behalten)
+
+Fotos können vor dem Löschen in Tages-ZIPs archiviert werden.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+from photo_catalog import KIND_AI
+
+log = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+
+
+class RetentionEngine:
+    def __init__(self, catalog, derivatives, print_cache_dir="static/print_cache",
+                 max_age=24 * 3600, ai_max_age=48 * 3600, max_bytes=0, min_free_bytes=2 * GB,
+                 print_max_age=3600, protect_recent=300, archive_dir=None,
+                 interval=60.0, on_delete=None):
+        """
+        Retention-Engine initialisieren
+
+        Args:
+            catalog: PhotoCatalog
+            derivatives: DerivativeGenerator
+            print_cache_dir: Verzeichnis der Druckversionen
+            max_age: Originale älter als so viele Sekunden löschen (0 = nie)
+            ai_max_age: AI-Ergebnisse älter als so viele Sekunden löschen (0 = nie)
+            max_bytes: Obergrenze für Fotos + Derivate + Druckversionen (0 = keine)
+            min_free_bytes: So viel Platz muss auf dem Laufwerk frei bleiben (0 = egal)
+            print_max_age: Druckversionen älter als so viele Sekunden löschen
+            protect_recent: Jüngere Fotos werden nie gelöscht (laufende AI/Druck-Jobs)
+            archive_dir: Fotos vor dem Löschen in <archive_dir>/photobox_<Datum>.zip
+                         sichern (None = nicht archivieren). Sollte auf einem
+                         anderen Laufwerk liegen, sonst wird kein Platz frei.
+            interval: Prüfintervall des Hintergrund-Threads in Sekunden
+            on_delete: Callback(PhotoEntry) nach dem Löschen eines Fotos
+                       (z.B. Print-Cache und ETags aufräumen)
+        """
+        self.catalog = catalog
+        self.derivatives = derivatives
+        self.print_cache_dir = Path(print_cache_dir)
+        self.max_age = max_age
+        self.ai_max_age = ai_max_age
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self.print_max_age = print_max_age
+        self.protect_recent = protect_recent
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.interval = interval
+        self.on_delete = on_delete
+
+        self.last_report = None
+        self._access = {}      # Foto-ID → letzter Abruf (Download, Druck, AI)
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Zugriffe (LRU)
+    # ------------------------------------------------------------------
+
+    def touch(self, photo_id):
+        """Abruf eines Fotos vermerken (verschiebt es in der LRU-Reihenfolge nach hinten)"""
+        with self._lock:
+            self._access[photo_id] = time.time()
+
+    def last_access(self, entry):
+        """Letzter Abruf, ohne Abruf die Aufnahmezeit"""
+        with self._lock:
+            return max(self._access.get(entry.id, 0), entry.timestamp)
+
+    # ------------------------------------------------------------------
+    # Hintergrund-Thread
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Regelmäßige Prüfung im Hintergrund starten"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                log.exception(f"Retention-Lauf fehlgeschlagen: {e}")
+
+    # ------------------------------------------------------------------
+    # Ein Durchlauf
+    # ------------------------------------------------------------------
+
+    def run_once(self):
+        """
+        Alle Regeln einmal anwenden
+
+        Returns:
+            dict: Bericht mit gelöschten Dateien, freigegebenen Bytes und Belegung
+        """
+        with self._run_lock:
+            started = time.time()
+            report = {
+                'deleted_photos': 0,
+                'deleted_ai': 0,
+                'deleted_derivatives': 0,
+                'deleted_print_files': 0,
+                'archived': 0,
+                'reclaimed_bytes': 0,
+            }
+
+            self._expire_photos(report, started)
+            self._expire_print_cache(report, started)
+            self._enforce_space(report, started)
+
+            report['usage_bytes'] = self._usage()
+            report['free_bytes'] = self._free_bytes()
+            report['duration_s'] = time.time() - started
+            report['finished_at'] = time.time()
+            self.last_report = report
+
+        if report['reclaimed_bytes']:
+            log.info(f"Retention: {report['deleted_photos'] + report['deleted_ai']} Fotos, "
+                     f"{report['deleted_derivatives']} Derivate, {report['deleted_print_files']} Druckversionen "
+                     f"gelöscht - {report['reclaimed_bytes'] / 1024 / 1024:.1f} MB frei")
+        return report
+
+    def _protected(self, entry, now, latest):
+        """Jüngste Fotos und das aktuell geteilte Foto nie löschen"""
+        return entry is latest or now - entry.timestamp < self.protect_recent
+
+    def _expire_photos(self, report, now):
+        """Fotos über dem Höchstalter löschen"""
+        latest = self.catalog.latest()
+        for entry in self.catalog.list():
+            limit = self.ai_max_age if entry.kind == KIND_AI else self.max_age
+            if limit and now - entry.timestamp > limit and not self._protected(entry, now, latest):
+                self._delete_photo(entry, report)
+
+    def _expire_print_cache(self, report, now):
+        """Alte Druckversionen und liegengebliebene Temp-Dateien löschen"""
+        for path, stat in self._print_files():
+            if now - stat.st_mtime > self.print_max_age:
+                self._delete_file(path, stat.st_size, report, 'deleted_print_files')
+
+    def _enforce_space(self, report, now):
+        """Quota und freien Platz einhalten, leicht Wiederherstellbares zuerst"""
+        # Belegung einmal messen, danach um die freigegebenen Bytes verringern
+        usage = self._usage()
+        baseline = report['reclaimed_bytes']
+
+        def over_limit():
+            if self.min_free_bytes and self._free_bytes() < self.min_free_bytes:
+                return True
+            return bool(self.max_bytes) and usage - (report['reclaimed_bytes'] - baseline) > self.max_bytes
+
+        if not over_limit():
+            return
+
+        # 1. Druckversionen, älteste zuerst
+        for path, stat in sorted(self._print_files(), key=lambda item: item[1].st_mtime):
+            if now - stat.st_mtime < self.protect_recent:
+                continue
+            self._delete_file(path, stat.st_size, report, 'deleted_print_files')
+            if not over_limit():
+                return
+
+        latest = self.catalog.latest()
+        candidates = [entry for entry in self.catalog.list() if not self._protected(entry, now, latest)]
+        candidates.sort(key=self.last_access)
+
+        # 2. Derivate, am längsten nicht abgerufene Fotos zuerst
+        for entry in candidates:
+            freed = self.derivatives.remove(entry.id)
+            if freed:
+                report['deleted_derivatives'] += 1
+                report['reclaimed_bytes'] += freed
+                if not over_limit():
+                    return
+
+        # 3. Originale, dann 4. AI-Ergebnisse (jeweils LRU)
+        for kinds in ((entry for entry in candidates if entry.kind != KIND_AI),
+                      (entry for entry in candidates if entry.kind == KIND_AI)):
+            for entry in kinds:
+                self._delete_photo(entry, report)
+                if not over_limit():
+                    return
+
+    # ------------------------------------------------------------------
+    # Hilfsfunktionen
+    # ------------------------------------------------------------------
+
+    def _print_files(self):
+        """(Pfad, stat) aller Dateien im Print-Cache"""
+        files = []
+        try:
+            with os.scandir(self.print_cache_dir) as entries:
+                for dir_entry in entries:
+                    if dir_entry.is_file():
+                        try:
+                            files.append((Path(dir_entry.path), dir_entry.stat()))
+                        except FileNotFoundError:
+                            pass
+        except FileNotFoundError:
+            pass
+        return files
+
+    def _usage(self):
+        """Belegter Platz: Fotos (aus dem Katalog) + Derivate + Druckversionen"""
+        total = sum(entry.size for entry in self.catalog.list())
+        for directory in (self.derivatives.derivative_dir, self.print_cache_dir):
+            try:
+                with os.scandir(directory) as entries:
+                    for dir_entry in entries:
+                        try:
+                            total += dir_entry.stat().st_size
+                        except FileNotFoundError:
+                            pass
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _free_bytes(self):
+        return shutil.disk_usage(self.catalog.photo_dir).free
+
+    def _delete_file(self, path, size, report, counter):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        report[counter] += 1
+        report['reclaimed_bytes'] += size
+
+    def _archive(self, entry):
+        """Foto in das Tages-ZIP seines Aufnahmedatums schreiben"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        day = datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d")
+        bundle = self.archive_dir / f"photobox_{day}.zip"
+        with zipfile.ZipFile(bundle, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+            try:
+                archive.getinfo(entry.filename)
+            except KeyError:
+                archive.write(entry.path, arcname=entry.filename)
+
+    def _delete_photo(self, entry, report):
+        """Foto samt Derivaten löschen (vorher archivieren, falls aktiviert)"""
+        if self.archive_dir is not None:
+            try:
+                self._archive(entry)
+                report['archived'] += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                # Lieber behalten als ohne Sicherung löschen
+                log.warning(f"Archivierung von {entry.filename} fehlgeschlagen: {e}")
+                return
+
+        try:
+            entry.path.unlink()
+            report['reclaimed_bytes'] += entry.size
+        except FileNotFoundError:
+            pass
+        self.catalog.remove(entry.path)
+        report['reclaimed_bytes'] += self.derivatives.remove(entry.id)
+        report['deleted_ai' if entry.kind == KIND_AI else 'deleted_photos'] += 1
+
+        with self._lock:
+            self._access.pop(entry.id, None)
+        if self.on_delete is not None:
+            try:
+                self.on_delete(entry)
+            except Exception as e:
+                log.warning(f"Aufräumen nach Löschen fehlgeschlagen: {e}")
+
+    def get_status(self):
+        """
+        Konfiguration und letzter Bericht
+
+        Returns:
+            dict
+        """
+        return {
+            'max_age_s': self.max_age,
+            'ai_max_age_s': self.ai_max_age,
+            'max_bytes': self.max_bytes,
+            'min_free_bytes': self.min_free_bytes,
+            'archive_dir': str(self.archive_dir) if self.archive_dir else None,
+            'last_report': self.last_report,
+        }
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Session-Store für PhotoBox
+SQLite-Datenbank (WAL) mit allen Metadaten einer Aufnahme-Session:
+Original, AI-Jobs (Theme, Seed, Dauer), Derivate und Druckaufträge.
+Beziehungen stehen damit in Tabellen statt nur in Dateinamen-Konventionen,
+Listen und Lookups laufen über Indizes statt über das Dateisystem.
+
+app.py schreibt, image_server.py liest (WAL erlaubt Leser parallel zum
+Schreiber, auch aus einem anderen Prozess).
+
+Eine Session ist eine Aufnahme, ihre ID ist die UUID des Originals.
+"""
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from photo_catalog import KIND_AI, PhotoEntry
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id            TEXT PRIMARY KEY,
+    created_at    REAL NOT NULL,
+    grab_ms       REAL,
+    encode_ms     REAL
+);
+CREATE TABLE IF NOT EXISTS photos (
+    id            TEXT PRIMARY KEY,
+    session_id    TEXT NOT NULL REFERENCES sessions(id),
+    kind          TEXT NOT NULL,
+    filename      TEXT NOT NULL,
+    path          TEXT NOT NULL,
+    timestamp     REAL NOT NULL,
+    size          INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS photos_time ON photos (timestamp, filename);
+CREATE INDEX IF NOT EXISTS photos_kind_time ON photos (kind, timestamp, filename);
+CREATE INDEX IF NOT EXISTS photos_session ON photos (session_id);
+CREATE TABLE IF NOT EXISTS ai_jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id    TEXT NOT NULL,
+    photo_id      TEXT,
+    theme         TEXT,
+    seed          INTEGER,
+    started_at    REAL NOT NULL,
+    duration_s    REAL,
+    success       INTEGER NOT NULL,
+    message       TEXT
+);
+CREATE INDEX IF NOT EXISTS ai_jobs_session ON ai_jobs (session_id);
+CREATE INDEX IF NOT EXISTS ai_jobs_time ON ai_jobs (started_at);
+CREATE TABLE IF NOT EXISTS derivatives (
+    photo_id      TEXT NOT NULL,
+    size          TEXT NOT NULL,
+    format        TEXT NOT NULL,
+    path          TEXT NOT NULL,
+    bytes         INTEGER NOT NULL,
+    PRIMARY KEY (photo_id, size, format)
+);
+CREATE TABLE IF NOT EXISTS print_jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id    TEXT NOT NULL,
+    photo_ids     TEXT NOT NULL,
+    layout        TEXT NOT NULL,
+    job_id        TEXT,
+    submitted_at  REAL NOT NULL,
+    duration_s    REAL,
+    success       INTEGER NOT NULL,
+    message       TEXT
+);
+CREATE INDEX IF NOT EXISTS print_jobs_session ON print_jobs (session_id);
+CREATE INDEX IF NOT EXISTS print_jobs_time ON print_jobs (submitted_at);
+"""
+
+
+def session_id_for(photo_id):
+    """Session einer Foto-ID (<uuid> oder <uuid>_ai → <uuid>)"""
+    return photo_id.removesuffix('_ai')
+
+
+class SessionStore:
+    def __init__(self, db_path="data/photobox.db", poll_interval=0.5):
+        """
+        Session-Store öffnen (legt Datenbank und Schema bei Bedarf an)
+
+        Args:
+            db_path: Pfad zur SQLite-Datei
+            poll_interval: Prüfintervall für Änderungen anderer Prozesse (Sekunden)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+
+        # Eine Verbindung pro Thread (sqlite3-Verbindungen sind nicht thread-safe)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        self._changed = threading.Condition()
+        self.version = 0
+        self._watch_thread = None
+        self._stop_event = threading.Event()
+
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """Verbindung des aktuellen Threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, statements):
+        """
+        Mehrere Statements in einer Transaktion ausführen
+
+        Args:
+            statements: Liste von (SQL, Parameter)
+        """
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._notify()
+
+    # ------------------------------------------------------------------
+    # Schreiben (app.py)
+    # ------------------------------------------------------------------
+
+    def _photo_statements(self, entry, grab_ms=None, encode_ms=None):
+        session_id = entry.base_id
+        return [
+            ("INSERT INTO sessions (id, created_at, grab_ms, encode_ms) VALUES (?, ?, ?, ?) "
+             "ON CONFLICT(id) DO UPDATE SET grab_ms = COALESCE(excluded.grab_ms, grab_ms), "
+             "encode_ms = COALESCE(excluded.encode_ms, encode_ms)",
+             (session_id, entry.timestamp, grab_ms, encode_ms)),
+            ("INSERT OR REPLACE INTO photos (id, session_id, kind, filename, path, timestamp, size) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?)",
+             (entry.id, session_id, entry.kind, entry.filename, str(entry.path), entry.timestamp, entry.size)),
+        ]
+
+    def add_photo(self, entry, grab_ms=None, encode_ms=None):
+        """
+        Foto (Original oder AI-Ergebnis) eintragen, legt die Session bei Bedarf an
+
+        Args:
+            entry: PhotoEntry (z.B. Rückgabe von PhotoCatalog.add)
+            grab_ms: Zeit für das Kamera-Frame (nur Original)
+            encode_ms: Zeit für das JPEG-Encoding (nur Original)
+        """
+        self._write(self._photo_statements(entry, grab_ms, encode_ms))
+
+    def remove_photo(self, photo_id):
+        """Foto und seine Derivate austragen (Session, AI- und Druck-Historie bleiben)"""
+        self._write([
+            ("DELETE FROM derivatives WHERE photo_id = ?", (photo_id,)),
+            ("DELETE FROM photos WHERE id = ?", (photo_id,)),
+        ])
+
+    def sync(self, entries):
+        """
+        Datenbank mit den Dateien auf der Platte abgleichen (Start, Katalog-Rescan)
+
+        Args:
+            entries: Alle PhotoEntry des Katalogs
+        """
+        entries = {entry.id: entry for entry in entries}
+        known = {row['id'] for row in self._conn().execute("SELECT id FROM photos")}
+
+        statements = []
+        for photo_id in known - entries.keys():
+            statements.append(("DELETE FROM derivatives WHERE photo_id = ?", (photo_id,)))
+            statements.append(("DELETE FROM photos WHERE id = ?", (photo_id,)))
+        for photo_id in entries.keys() - known:
+            statements.extend(self._photo_statements(entries[photo_id]))
+        if statements:
+            self._write(statements)
+            log.info(f"Session-Store abgeglichen: {len(entries.keys() - known)} neu, "
+                     f"{len(known - entries.keys())} entfernt")
+
+    def add_ai_job(self, photo_id, result, started_at):
+        """
+        AI-Job eintragen
+
+        Args:
+            photo_id: ID des Originals
+            result: Ergebnis-Dict von AIProcessor.process_image
+            started_at: Startzeit (time.time())
+        """
+        self._write([(
+            "INSERT INTO ai_jobs (session_id, photo_id, theme, seed, started_at, duration_s, success, message) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (session_id_for(photo_id), f"{photo_id}_ai" if result['success'] else None,
+             result.get('theme'), result.get('seed'), started_at, result.get('duration'),
+             int(result['success']), result.get('message'))
+        )])
+
+    def add_derivatives(self, photo_id, outputs):
+        """
+        Erzeugte Derivate eintragen
+
+        Args:
+            photo_id: ID des Fotos
+            outputs: Liste von (Größe, Format, Pfad, Bytes)
+        """
+        self._write([
+            ("INSERT OR REPLACE INTO derivatives (photo_id, size, format, path, bytes) VALUES (?, ?, ?, ?, ?)",
+             (photo_id, size, fmt, str(path), nbytes))
+            for size, fmt, path, nbytes in outputs
+        ])
+
+    def add_print_job(self, photo_ids, layout, result, submitted_at, duration_s=None):
+        """
+        Druckauftrag eintragen
+
+        Args:
+            photo_ids: Gedruckte Foto-IDs (in Layout-Reihenfolge)
+            layout: Name des Layouts
+            result: Ergebnis-Dict von Printer.print_image/print_layout
+            submitted_at: Zeitpunkt des Auftrags
+            duration_s: Dauer bis zur Übergabe an CUPS
+        """
+        self._write([(
+            "INSERT INTO print_jobs (session_id, photo_ids, layout, job_id, submitted_at, duration_s, success, message) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (session_id_for(photo_ids[0]), json.dumps(photo_ids), layout, result.get('job_id'),
+             submitted_at, duration_s, int(result['success']), result.get('message'))
+        )])
+
+    # ------------------------------------------------------------------
+    # Abfragen (app.py, image_server.py)
+    # ------------------------------------------------------------------
+
+    def recent_print_job(self, photo_ids, layout, since):
+        """
+        Letzter erfolgreicher Druck desselben Bogens (gleiches Layout, gleiche Fotos)
+
+        Args:
+            photo_ids: Foto-IDs in Layout-Reihenfolge
+            layout: Name des Layouts
+            since: Nur Aufträge ab diesem Zeitpunkt
+
+        Returns:
+            dict: {'job_id', 'submitted_at'} oder None
+        """
+        row = self._conn().execute(
+            "SELECT job_id, submitted_at FROM print_jobs "
+            "WHERE session_id = ? AND layout = ? AND photo_ids = ? AND success = 1 AND submitted_at >= ? "
+            "ORDER BY submitted_at DESC LIMIT 1",
+            (session_id_for(photo_ids[0]), layout, json.dumps(photo_ids), since)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    @staticmethod
+    def _entry(row):
+        if row is None:
+            return None
+        return PhotoEntry(row['path'], row['timestamp'], row['size'])
+
+    def get_photo(self, photo_id):
+        """Foto per ID als PhotoEntry oder None"""
+        row = self._conn().execute(
+            "SELECT path, timestamp, size FROM photos WHERE id = ?", (photo_id,)
+        ).fetchone()
+        return self._entry(row)
+
+    def latest(self, kind=None):
+        """
+        Neuestes Foto
+
+        Args:
+            kind: None (alle), 'original' oder 'ai'
+
+        Returns:
+            PhotoEntry oder None
+        """
+        if kind is None:
+            row = self._conn().execute(
+                "SELECT path, timestamp, size FROM photos ORDER BY timestamp DESC, filename DESC LIMIT 1"
+            ).fetchone()
+        else:
+            row = self._conn().execute(
+                "SELECT path, timestamp, size FROM photos WHERE kind = ? "
+                "ORDER BY timestamp DESC, filename DESC LIMIT 1", (kind,)
+            ).fetchone()
+        return self._entry(row)
+
+    def page(self, kind=None, limit=50, before=None, since=None):
+        """
+        Eine Seite Fotos, neueste zuerst (gleiche Semantik wie PhotoCatalog.page)
+
+        Args:
+            kind: None (alle), 'original' oder 'ai'
+            limit: Maximale Anzahl Einträge
+            before: Sortierschlüssel (parse_cursor) - nur ältere Fotos
+            since: Sortierschlüssel (parse_cursor) - nur neuere Fotos; ohne before
+                   werden die `limit` Fotos direkt nach dem Cursor geliefert
+
+        Returns:
+            tuple: (list[PhotoEntry], has_more)
+        """
+        conditions, params = [], []
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+        if before is not None:
+            conditions.append("(timestamp, filename) < (?, ?)")
+            params.extend(before)
+        if since is not None:
+            conditions.append("(timestamp, filename) > (?, ?)")
+            params.extend(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # Ein Eintrag mehr als nötig verrät, ob es weitere Seiten gibt
+        ascending = since is not None and before is None
+        order = "ASC" if ascending else "DESC"
+        rows = self._conn().execute(
+            f"SELECT path, timestamp, size FROM photos {where} "
+            f"ORDER BY timestamp {order}, filename {order} LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+
+        has_more = len(rows) > limit
+        entries = [self._entry(row) for row in rows[:limit]]
+        if ascending:
+            entries.reverse()
+        return entries, has_more
+
+    def select_photos(self, start=None, end=None, session_ids=None, kinds=None):
+        """
+        Fotos nach Zeitraum, Sessions und Art auswählen (z.B. für den Export)
+
+        Args:
+            start: Nur Fotos ab diesem Zeitpunkt (Unix-Zeit)
+            end: Nur Fotos vor diesem Zeitpunkt (Unix-Zeit)
+            session_ids: Nur Fotos dieser Sessions
+            kinds: Nur diese Arten ('original', 'ai')
+
+        Returns:
+            list[PhotoEntry], älteste zuerst
+        """
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(end)
+        if session_ids:
+            conditions.append(f"session_id IN ({','.join('?' * len(session_ids))})")
+            params.extend(session_ids)
+        if kinds:
+            conditions.append(f"kind IN ({','.join('?' * len(kinds))})")
+            params.extend(kinds)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._conn().execute(
+            f"SELECT path, timestamp, size FROM photos {where} ORDER BY timestamp, filename", params
+        ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def derivatives_for(self, photo_ids, size=None):
+        """
+        Derivate von Fotos
+
+        Args:
+            photo_ids: Foto-IDs
+            size: Nur diese Größe ('thumb', 'screen', 'full') oder None für alle
+
+        Returns:
+            list: (photo_id, Pfad)
+        """
+        rows = []
+        photo_ids = list(photo_ids)
+        # SQLite-Limit für Parameter pro Statement beachten
+        for offset in range(0, len(photo_ids), 500):
+            batch = photo_ids[offset:offset + 500]
+            sql = f"SELECT photo_id, path FROM derivatives WHERE photo_id IN ({','.join('?' * len(batch))})"
+            params = list(batch)
+            if size is not None:
+                sql += " AND size = ?"
+                params.append(size)
+            rows.extend(self._conn().execute(sql + " ORDER BY photo_id, size, format", params))
+        return [(row['photo_id'], row['path']) for row in rows]
+
+    def get_session(self, session_id):
+        """
+        Alles zu einer Session
+
+        Returns:
+            dict: {'id', 'created_at', 'grab_ms', 'encode_ms', 'photos', 'ai_jobs',
+                   'derivatives', 'print_jobs'} oder None
+        """
+        conn = self._conn()
+        session = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if session is None:
+            return None
+
+        result = dict(session)
+        result['photos'] = [
+            self._entry(row).to_dict()
+            for row in conn.execute(
+                "SELECT path, timestamp, size FROM photos WHERE session_id = ? ORDER BY timestamp",
+                (session_id,))
+        ]
+        photo_ids = [photo['id'] for photo in result['photos']]
+        result['ai_jobs'] = [
+            dict(row) for row in conn.execute(
+                "SELECT theme, seed, started_at, duration_s, success, message FROM ai_jobs "
+                "WHERE session_id = ? ORDER BY started_at", (session_id,))
+        ]
+        result['derivatives'] = [
+            dict(row) for row in conn.execute(
+                f"SELECT photo_id, size, format, bytes FROM derivatives "
+                f"WHERE photo_id IN ({','.join('?' * len(photo_ids))})", photo_ids)
+        ] if photo_ids else []
+        result['print_jobs'] = [
+            dict(row, photo_ids=json.loads(row['photo_ids'])) for row in conn.execute(
+                "SELECT photo_ids, layout, job_id, submitted_at, duration_s, success, message "
+                "FROM print_jobs WHERE session_id = ? ORDER BY submitted_at", (session_id,))
+        ]
+        return result
+
+    def stats(self):
+        """
+        Kennzahlen des Events
+
+        Returns:
+            dict: {'sessions', 'photos', 'ai_photos', 'ai_jobs', 'ai_avg_s', 'print_jobs'}
+        """
+        conn = self._conn()
+        ai = conn.execute(
+            "SELECT COUNT(*) AS jobs, AVG(duration_s) AS avg_s FROM ai_jobs WHERE success = 1"
+        ).fetchone()
+        return {
+            'sessions': conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0],
+            'photos': conn.execute("SELECT COUNT(*) FROM photos").fetchone()[0],
+            'ai_photos': conn.execute("SELECT COUNT(*) FROM photos WHERE kind = ?", (KIND_AI,)).fetchone()[0],
+            'ai_jobs': ai['jobs'],
+            'ai_avg_s': ai['avg_s'],
+            'print_jobs': conn.execute("SELECT COUNT(*) FROM print_jobs WHERE success = 1").fetchone()[0],
+        }
+
+    # ------------------------------------------------------------------
+    # Änderungen beobachten (image_server.py)
+    # ------------------------------------------------------------------
+
+    def _notify(self):
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, version, timeout=None):
+        """
+        Blockiert bis sich die Datenbank gegenüber `version` geändert hat
+
+        Returns:
+            int: Aktuelle Version (gleich `version` bei Timeout)
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    def start_watching(self):
+        """Hintergrund-Thread starten, der Schreibzugriffe anderer Prozesse erkennt"""
+        if self._watch_thread is not None:
+            return
+        self._watch_thread = threading.Thread(target=self._watch, name="session-store", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._stop_event.set()
+
+    def _watch(self):
+        """PRAGMA data_version ändert sich, sobald eine andere Verbindung committet"""
+        conn = self._conn()
+        last = conn.execute("PRAGMA data_version").fetchone()[0]
+        while not self._stop_event.wait(self.poll_interval):
+            current = conn.execute("PRAGMA data_version").fetchone()[0]
+            if current != last:
+                last = current
+                self._notify()
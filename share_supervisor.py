@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Supervisor für den Image-Share-Server
+Startet image_server.py als Kindprozess, schreibt dessen Ausgabe in eine
+Logdatei (statt in nie gelesene Pipes, die irgendwann volllaufen und den
+Server einfrieren) und startet ihn nach einem Absturz neu.
+"""
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+
+class ShareServerSupervisor:
+    def __init__(self, command=None, log_path="logs/image_server.log",
+                 max_log_bytes=10 * 1024 * 1024, min_uptime=10.0,
+                 max_backoff=30.0, max_quick_failures=5):
+        """
+        Supervisor initialisieren
+
+        Args:
+            command: Startbefehl (Standard: aktueller Python-Interpreter + image_server.py)
+            log_path: Logdatei für stdout/stderr des Servers
+            max_log_bytes: Ab dieser Größe wird das Log beim (Neu-)Start nach .1 rotiert
+            min_uptime: Läuft der Server kürzer, gilt das Ende als Fehlstart
+            max_backoff: Maximale Wartezeit vor einem Neustart (Sekunden)
+            max_quick_failures: Nach so vielen Fehlstarten in Folge wird aufgegeben
+                                (z.B. Port 8080 bereits belegt)
+        """
+        self.command = command or [sys.executable, "image_server.py"]
+        self.log_path = Path(log_path)
+        self.max_log_bytes = max_log_bytes
+        self.min_uptime = min_uptime
+        self.max_backoff = max_backoff
+        self.max_quick_failures = max_quick_failures
+
+        self.process = None
+        self.restarts = 0
+        self.last_exit_code = None
+        self.gave_up = False
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Server starten und im Hintergrund überwachen"""
+        if self._thread is not None:
+            return
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._supervise, name="share-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Server beenden und Überwachung stoppen"""
+        self._stop_event.set()
+        with self._lock:
+            process = self.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _rotate_log(self):
+        """Zu großes Log nach <log>.1 verschieben"""
+        try:
+            if self.log_path.stat().st_size > self.max_log_bytes:
+                os.replace(self.log_path, self.log_path.with_name(self.log_path.name + ".1"))
+        except FileNotFoundError:
+            pass
+
+    def _spawn(self):
+        """Kindprozess mit Ausgabe in die Logdatei starten"""
+        self._rotate_log()
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        with open(self.log_path, "ab") as log:
+            return subprocess.Popen(
+                self.command,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env=env
+            )
+
+    def _supervise(self):
+        backoff = 1.0
+        quick_failures = 0
+
+        while not self._stop_event.is_set():
+            try:
+                process = self._spawn()
+            except Exception as e:
+                log.error(f"Image-Share-Server konnte nicht gestartet werden: {e}")
+                self.gave_up = True
+                return
+
+            with self._lock:
+                self.process = process
+            log.info(f"Image-Share-Server gestartet (PID {process.pid}, Log: {self.log_path})")
+
+            started_at = time.time()
+            exit_code = process.wait()
+            uptime = time.time() - started_at
+            self.last_exit_code = exit_code
+
+            if self._stop_event.is_set():
+                return
+
+            if uptime < self.min_uptime:
+                quick_failures += 1
+                backoff = min(backoff * 2, self.max_backoff)
+            else:
+                quick_failures = 0
+                backoff = 1.0
+
+            if quick_failures >= self.max_quick_failures:
+                log.error(f"Image-Share-Server startet nicht (Exit-Code {exit_code}), "
+                          f"gebe nach {quick_failures} Versuchen auf - siehe {self.log_path}")
+                self.gave_up = True
+                return
+
+            self.restarts += 1
+            metrics.RETRIES.labels('share_server').inc()
+            log.warning(f"Image-Share-Server beendet (Exit-Code {exit_code}), Neustart in {backoff:.0f}s...")
+            if self._stop_event.wait(backoff):
+                return
+
+    def get_status(self):
+        """
+        Status des Share-Servers
+
+        Returns:
+            dict: {'available', 'status', 'pid', 'restarts', 'last_exit_code', 'log'}
+        """
+        with self._lock:
+            process = self.process
+        running = process is not None and process.poll() is None
+        if running:
+            status = 'Läuft'
+        elif self.gave_up:
+            status = 'Aufgegeben'
+        else:
+            status = 'Gestoppt'
+        return {
+            'available': running,
+            'status': status,
+            'pid': process.pid if running else None,
+            'restarts': self.restarts,
+            'last_exit_code': self.last_exit_code,
+            'log': str(self.log_path),
+        }
@@ -121,14 +121,18 @@ ip_model = IPAdapterFull(
 
 print("✅ Modelle geladen!\n")
 
-# Bild croppen
+# Bild croppen (PhotoBox liefert mit PHOTOBOX_AI_PRECROP=1 schon 512x512 zugeschnitten)
 print("📸 Verarbeite Input-Bild...")
-cropper = SimpleFaceCropper()
-input_image = cropper.crop_face_plus(
-    INPUT_IMAGE,
-    output_size=(512, 512),
-    face_scale=FACE_SCALE
-)
+input_image = Image.open(INPUT_IMAGE).convert("RGB")
+if input_image.size == (512, 512):
+    print("   ✅ Input bereits zugeschnitten (512x512)")
+else:
+    cropper = SimpleFaceCropper()
+    input_image = cropper.crop_face_plus(
+        INPUT_IMAGE,
+        output_size=(512, 512),
+        face_scale=FACE_SCALE
+    )
 
 # Zufälligen Prompt wählen
 selected_name = random.choice(list(PROMPTS.keys()))
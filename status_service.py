@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Status-Service für PhotoBox
+Fragt Kamera-, Drucker- und AI-Status im Hintergrund ab und hält das
+Ergebnis im Speicher. Die /api/*/status Endpunkte lesen nur noch den
+Cache, Änderungen werden per Callback (Socket.IO) verteilt.
+"""
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Ändern sich bei jeder Abfrage und zählen nicht als Statusänderung
+# (Kamera: statt last_frame_age vergleicht das grobe 'stale')
+VOLATILE_FIELDS = frozenset({'updated_at', 'last_frame_age'})
+
+
+class StatusService:
+    def __init__(self, interval=5.0, on_change=None):
+        """
+        Status-Service initialisieren
+
+        Args:
+            interval: Abfrage-Intervall in Sekunden
+            on_change: Callback(name, status) bei jeder Statusänderung
+        """
+        self.interval = interval
+        self.on_change = on_change
+
+        self._providers = {}   # Name → Callable, das ein Status-Dict liefert
+        self._snapshot = {}    # Name → letzter Status
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def register(self, name, provider):
+        """
+        Status-Quelle registrieren
+
+        Args:
+            name: Name der Quelle (z.B. 'camera', 'printer', 'ai')
+            provider: Funktion ohne Argumente, die ein Status-Dict liefert
+        """
+        with self._lock:
+            self._providers[name] = provider
+
+    def _poll(self, name, provider):
+        """Fragt eine Quelle ab, Fehler werden zu einem Status-Dict"""
+        try:
+            status = dict(provider())
+        except Exception as e:
+            status = {
+                'available': False,
+                'status': 'Fehler',
+                'details': str(e)
+            }
+        status['updated_at'] = time.time()
+        return status
+
+    def refresh(self, name=None):
+        """
+        Status einer oder aller Quellen neu abfragen
+
+        Args:
+            name: Name der Quelle oder None für alle
+        """
+        with self._lock:
+            if name is None:
+                providers = list(self._providers.items())
+            else:
+                providers = [(name, self._providers[name])]
+
+        for source, provider in providers:
+            status = self._poll(source, provider)
+
+            with self._lock:
+                previous = self._snapshot.get(source)
+                self._snapshot[source] = status
+
+            if self.on_change and not self._same(previous, status):
+                try:
+                    self.on_change(source, status)
+                except Exception as e:
+                    log.warning(f"Status-Benachrichtigung fehlgeschlagen: {e}")
+
+    @staticmethod
+    def _same(previous, current):
+        """Vergleicht zwei Status-Dicts ohne Zeitstempel und Timer (VOLATILE_FIELDS)"""
+        if previous is None:
+            return False
+        strip = lambda s: {k: v for k, v in s.items() if k not in VOLATILE_FIELDS}
+        return strip(previous) == strip(current)
+
+    def get(self, name):
+        """
+        Liefert den gecachten Status einer Quelle
+
+        Beim allerersten Zugriff (vor dem ersten Hintergrund-Durchlauf)
+        wird die Quelle einmalig synchron abgefragt.
+
+        Args:
+            name: Name der Quelle
+
+        Returns:
+            dict: Status der Quelle
+        """
+        with self._lock:
+            status = self._snapshot.get(name)
+            known = name in self._providers
+
+        if status is None:
+            if not known:
+                raise KeyError(name)
+            self.refresh(name)
+            with self._lock:
+                status = self._snapshot[name]
+
+        return status
+
+    def snapshot(self):
+        """Liefert den Status aller Quellen"""
+        with self._lock:
+            return dict(self._snapshot)
+
+    def _run(self):
+        """Hintergrund-Schleife"""
+        while not self._stop_event.is_set():
+            self.refresh()
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        """Hintergrund-Thread starten"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="status-service", daemon=True)
+        self._thread.start()
+        log.info(f"Status-Service gestartet (Intervall: {self.interval}s)")
+
+    def stop(self):
+        """Hintergrund-Thread stoppen"""
+        self._stop_event.set()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Session-Tracing für PhotoBox
+Ein Trace beginnt beim Knopfdruck (bzw. bei /api/capture) und begleitet das
+Foto durch Countdown, Aufnahme, AI und Druck. Jeder Schritt (Span) wird als
+eine Zeile in ein lokales JSONL-Log geschrieben - so lässt sich bei "hat ewig
+gedauert" nachsehen, wo die Zeit geblieben ist.
+
+- Trace-ID: beim Knopfdruck/Aufnahme erzeugt, danach über die Session des
+  Fotos gefunden (oder vom Client per Header X-Trace-Id mitgeschickt)
+- An den SD1.5-Worker geht sie als Umgebungsvariable PHOTOBOX_TRACE_ID
+
+Auswertung (p50/p95 je Schritt über einen Zeitraum, z.B. eine Veranstaltung):
+    python3 tracing.py summary --from 2025-06-14T18:00 --to 2025-06-15T02:00
+    python3 tracing.py show <trace_id oder photo_id>
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+TRACE_LOG = Path(os.environ.get("PHOTOBOX_TRACE_LOG", "logs/traces.jsonl"))
+TRACE_HEADER = "X-Trace-Id"
+TRACE_ENV = "PHOTOBOX_TRACE_ID"
+
+# Reihenfolge der Schritte in der Auswertung
+STAGES = ('countdown', 'capture', 'ai', 'ai_queue', 'ai_run', 'print', 'print_render', 'print_submit')
+
+
+def new_trace_id():
+    """Neue Trace-ID (16 Hex-Zeichen)"""
+    return uuid.uuid4().hex[:16]
+
+
+class Tracer:
+    def __init__(self, log_path=TRACE_LOG, max_log_bytes=10 * 1024 * 1024, max_sessions=1024):
+        """
+        Tracer initialisieren
+
+        Args:
+            log_path: JSONL-Datei für die Spans
+            max_log_bytes: Ab dieser Größe wird das Log nach <log>.1 rotiert
+            max_sessions: So viele Session → Trace-Zuordnungen werden gemerkt
+        """
+        self.log_path = Path(log_path)
+        self.max_log_bytes = max_log_bytes
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._file = None
+        self._sessions = OrderedDict()  # Session-ID → Trace-ID
+
+    # ------------------------------------------------------------------
+    # Session → Trace
+    # ------------------------------------------------------------------
+
+    def bind(self, session_id, trace_id):
+        """Session eines Fotos einem Trace zuordnen (AI und Druck finden ihn darüber)"""
+        with self._lock:
+            self._sessions[session_id] = trace_id
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def trace_for(self, session_id, trace_id=None):
+        """
+        Trace-ID für einen Folge-Schritt einer Session
+
+        Args:
+            session_id: Session des Fotos
+            trace_id: Vom Client mitgeschickte Trace-ID (hat Vorrang)
+
+        Returns:
+            str: Trace-ID (neu, falls die Session unbekannt ist - z.B. nach Neustart)
+        """
+        if trace_id:
+            self.bind(session_id, trace_id)
+            return trace_id
+        with self._lock:
+            known = self._sessions.get(session_id)
+        if known is not None:
+            return known
+        trace_id = new_trace_id()
+        self.bind(session_id, trace_id)
+        return trace_id
+
+    # ------------------------------------------------------------------
+    # Spans
+    # ------------------------------------------------------------------
+
+    def record(self, trace_id, stage, start, duration, **attrs):
+        """
+        Span schreiben, dessen Zeiten bereits bekannt sind
+
+        Args:
+            trace_id: Trace-ID (None → nichts schreiben)
+            stage: Name des Schritts (siehe STAGES)
+            start: Beginn als Unix-Zeit
+            duration: Dauer in Sekunden
+            **attrs: Weitere Felder (z.B. session_id, status, layout)
+        """
+        if not trace_id:
+            return
+        span = {
+            'trace_id': trace_id,
+            'stage': stage,
+            'start': round(start, 3),
+            'duration_ms': round(duration * 1000, 1),
+        }
+        span.update(attrs)
+        self._write(span)
+
+    @contextmanager
+    def span(self, trace_id, stage, **attrs):
+        """
+        Dauer des with-Blocks als Span schreiben
+
+        Yields:
+            dict: Zusätzliche Felder, die der Block noch setzen kann
+                  (z.B. span['status'] = 'error')
+        """
+        started_wall = time.time()
+        started = time.perf_counter()
+        fields = dict(attrs)
+        try:
+            yield fields
+        except BaseException as e:
+            fields['status'] = 'error'
+            fields.setdefault('error', str(e)[:200])
+            raise
+        finally:
+            fields.setdefault('status', 'ok')
+            self.record(trace_id, stage, started_wall, time.perf_counter() - started, **fields)
+
+    def _write(self, span):
+        line = json.dumps(span, ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._open()
+                self._file.write(line)
+                self._file.flush()
+                if self._file.tell() > self.max_log_bytes:
+                    self._file.close()
+                    os.replace(self.log_path, self.log_path.with_name(self.log_path.name + ".1"))
+                    self._open()
+        except OSError as e:
+            # Tracing darf nie eine Aufnahme oder einen Druck verhindern
+            log.warning(f"Trace-Log nicht schreibbar: {e}")
+
+    def _open(self):
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.log_path, "a", encoding="utf-8")
+
+
+# Tracer dieses Prozesses
+tracer = Tracer()
+
+
+# ---------------------------------------------------------------------------
+# Auswertung
+# ---------------------------------------------------------------------------
+
+def read_spans(log_path=TRACE_LOG, start=None, end=None):
+    """
+    Spans aus dem Log (inkl. rotiertem <log>.1) lesen
+
+    Args:
+        start, end: Zeitraum als Unix-Zeit ('end' exklusiv), None = offen
+
+    Returns:
+        list: Spans (dicts), nach Beginn sortiert
+    """
+    log_path = Path(log_path)
+    spans = []
+    for path in (log_path.with_name(log_path.name + ".1"), log_path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        span = json.loads(line)
+                    except ValueError:
+                        continue  # z.B. abgeschnittene letzte Zeile
+                    if start is not None and span['start'] < start:
+                        continue
+                    if end is not None and span['start'] >= end:
+                        continue
+                    spans.append(span)
+        except FileNotFoundError:
+            pass
+    spans.sort(key=lambda span: span['start'])
+    return spans
+
+
+def summarize(spans):
+    """
+    p50/p95 je Schritt und Dauer der Traces (erster Beginn bis letztes Ende)
+
+    Returns:
+        dict: {'stages': {Schritt: {'count', 'errors', 'p50_ms', 'p95_ms', 'max_ms'}},
+               'traces': {'count', 'p50_ms', 'p95_ms', 'max_ms'}, 'slowest': [...]}
+    """
+    from benchmarks.stats import percentile  # nur für die Auswertung gebraucht
+
+    by_stage = {}
+    by_trace = {}
+    for span in spans:
+        by_stage.setdefault(span['stage'], []).append(span)
+        by_trace.setdefault(span['trace_id'], []).append(span)
+
+    order = {stage: index for index, stage in enumerate(STAGES)}
+    stages = {}
+    for stage in sorted(by_stage, key=lambda name: (order.get(name, len(order)), name)):
+        durations = [span['duration_ms'] for span in by_stage[stage]]
+        stages[stage] = {
+            'count': len(durations),
+            'errors': sum(1 for span in by_stage[stage] if span.get('status') == 'error'),
+            'p50_ms': percentile(durations, 50),
+            'p95_ms': percentile(durations, 95),
+            'max_ms': max(durations),
+        }
+
+    totals = []
+    for trace_id, trace_spans in by_trace.items():
+        first = min(span['start'] for span in trace_spans)
+        last = max(span['start'] + span['duration_ms'] / 1000 for span in trace_spans)
+        totals.append({
+            'trace_id': trace_id,
+            'session_id': next((span['session_id'] for span in trace_spans if span.get('session_id')), None),
+            'start': first,
+            'total_ms': round((last - first) * 1000, 1),
+            'stages': [span['stage'] for span in trace_spans],
+        })
+    totals.sort(key=lambda trace: trace['total_ms'], reverse=True)
+    values = [trace['total_ms'] for trace in totals]
+
+    return {
+        'stages': stages,
+        'traces': {
+            'count': len(totals),
+            'p50_ms': percentile(values, 50) if values else None,
+            'p95_ms': percentile(values, 95) if values else None,
+            'max_ms': values[0] if values else None,
+        },
+        'slowest': totals[:5],
+    }
+
+
+def parse_time(value):
+    """Zeitpunkt aus Unix-Zeit oder ISO 8601 (z.B. 2025-06-14T18:00)"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PhotoBox-Traces auswerten")
+    parser.add_argument('--log', default=str(TRACE_LOG), help="Trace-Log (JSONL)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    summary = commands.add_parser('summary', help="p50/p95 je Schritt über einen Zeitraum")
+    summary.add_argument('--from', dest='start', help="Beginn (Unix-Zeit oder ISO 8601)")
+    summary.add_argument('--to', dest='end', help="Ende, exklusiv (Unix-Zeit oder ISO 8601)")
+    summary.add_argument('--json', action='store_true', help="Ergebnis als JSON ausgeben")
+
+    show = commands.add_parser('show', help="Alle Spans eines Traces")
+    show.add_argument('id', help="Trace-ID, Photo-ID oder Session-ID")
+
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        start = parse_time(args.start) if args.start else None
+        end = parse_time(args.end) if args.end else None
+        result = summarize(read_spans(args.log, start, end))
+        if args.json:
+            print(json.dumps(result, indent=2))
+            return
+
+        print("=" * 60)
+        print(f"🔎 {result['traces']['count']} Traces")
+        print("=" * 60)
+        print(f"{'Schritt':<14}{'Anzahl':>8}{'Fehler':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        for stage, stats in result['stages'].items():
+            print(f"{stage:<14}{stats['count']:>8}{stats['errors']:>8}"
+                  f"{stats['p50_ms']:>10.0f}{stats['p95_ms']:>10.0f}{stats['max_ms']:>10.0f}")
+        traces = result['traces']
+        if traces['count']:
+            print(f"{'gesamt':<14}{traces['count']:>8}{'':>8}"
+                  f"{traces['p50_ms']:>10.0f}{traces['p95_ms']:>10.0f}{traces['max_ms']:>10.0f}")
+            print("\nLangsamste Traces:")
+            for trace in result['slowest']:
+                print(f"  {trace['trace_id']}  {_format_time(trace['start'])}  "
+                      f"{trace['total_ms'] / 1000:.1f}s  {' → '.join(trace['stages'])}")
+        return
+
+    spans = [span for span in read_spans(args.log)
+             if args.id in (span['trace_id'], span.get('session_id'), span.get('photo_id'))]
+    trace_ids = {span['trace_id'] for span in spans}
+    if not spans:
+        print(f"❌ Kein Trace gefunden: {args.id}")
+        sys.exit(1)
+    spans = [span for span in read_spans(args.log) if span['trace_id'] in trace_ids]
+    first = spans[0]['start']
+    for span in spans:
+        extra = {key: value for key, value in span.items()
+                 if key not in ('trace_id', 'stage', 'start', 'duration_ms')}
+        print(f"{span['trace_id']}  +{span['start'] - first:7.1f}s  {span['stage']:<14}"
+              f"{span['duration_ms']:>10.0f} ms  {json.dumps(extra, ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()